@@ -1,7 +1,14 @@
-from .api import arcstack_api
+from .api import arcstack_api, get_api
 from .decorators import api_endpoint
 from .endpoint import Endpoint
-from .errors import APIError, InternalServerError, UnauthorizedError, ValidationError
+from .errors import (
+    APIError,
+    InternalServerError,
+    PayloadTooLargeError,
+    UnauthorizedError,
+    ValidationError,
+)
+from .handlers import exception_handler
 
 
 # isort: off
@@ -10,10 +17,13 @@ __version__ = '0.0.0'
 
 __all__ = [
     'arcstack_api',
+    'get_api',
     'Endpoint',
     'APIError',
     'ValidationError',
     'UnauthorizedError',
     'InternalServerError',
+    'PayloadTooLargeError',
     'api_endpoint',
+    'exception_handler',
 ]
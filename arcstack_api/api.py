@@ -1,19 +1,76 @@
+import threading
+import weakref
 from collections.abc import Callable
 from functools import wraps
 from typing import Annotated
 
+from asgiref.sync import iscoroutinefunction
 from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.signals import setting_changed
 from django.http import HttpRequest, HttpResponse
 from django.utils.module_loading import import_string
 from typing_extensions import Doc
 
 from .conf import settings
+from .executor import FlatMiddlewareExecutor, is_flattenable_middleware
+from .handlers import ExceptionHandlerRegistry
+from .instrumentation import Instrumentation, TimedLayer
 from .logger import logger
 from .meta import ArcStackRequestMeta
+from .payload import RequestPayload
+from .plan import EndpointPlan, get_endpoint_options
 from .responses import InternalServerErrorResponse
+from .signature import EndpointSignature
+from .utils import adapt_method_mode, get_middleware_hook
+from .validation import compile_validator
+
+
+DEFAULT_GROUP = 'default'
+
+# The `API_*` settings a group can override. The settings of the middleware are
+# read by the middleware themselves and are the same for every group.
+GROUP_SETTINGS = frozenset(
+    {
+        'MIDDLEWARE',
+        'MIDDLEWARE_EXECUTOR',
+        'TIMING',
+        'DEFAULT_LOGIN_REQUIRED',
+        'VALIDATE_INPUT',
+        'MAX_BODY_SIZE',
+    }
+)
+
+# The generation of the plans compiled before the middleware are loaded.
+PENDING_GENERATION = -1
 
 
 class ArcStackAPI:
+    """Builds the middleware chains of a group of endpoints and serves them.
+
+    The default group uses the `API_*` settings. A named group is declared in
+    `API_GROUPS`, and any setting it declares overrides the `API_*` setting
+    for its endpoints, e.g. its own `MIDDLEWARE`.
+    """
+
+    group: Annotated[
+        str,
+        Doc(
+            """
+            The name of the group, `API_GROUPS` key of its settings.
+            """
+        ),
+    ] = DEFAULT_GROUP
+
+    exception_handlers: Annotated[
+        ExceptionHandlerRegistry,
+        Doc(
+            """
+            Exception handlers of the group. They take precedence over the
+            `process_exception` hooks of the middleware and the global handlers.
+            """
+        ),
+    ] = None
+
     _endpoint_middleware: Annotated[
         list[Callable],
         Doc(
@@ -49,18 +106,216 @@ class ArcStackAPI:
         ),
     ] = None
 
-    def __init__(self):
-        self.load_middleware()
+    _async_endpoint_middleware: Annotated[
+        list[Callable],
+        Doc(
+            """
+            Coroutine versions of `_endpoint_middleware` used by async endpoints.
+            """
+        ),
+    ] = []
+
+    _async_exception_middleware: Annotated[
+        list[Callable],
+        Doc(
+            """
+            Coroutine versions of `_exception_middleware` used by async endpoints.
+            """
+        ),
+    ] = []
+
+    _async_middleware_chain: Annotated[
+        Callable,
+        Doc(
+            """
+            The middleware chain for async endpoints. Every middleware is called
+            in async mode unless it is not `async_capable`.
+            """
+        ),
+    ] = None
+
+    _endpoint_middleware_filters: Annotated[
+        dict[Callable, Callable],
+        Doc(
+            """
+            `applies_to_endpoint` methods of the middleware, keyed by their
+            `process_endpoint` hook. Used to leave the middleware out of the
+            plans of the endpoints it does not apply to.
+            """
+        ),
+    ] = {}
+
+    _generation: Annotated[
+        int,
+        Doc(
+            """
+            Incremented every time the middleware are loaded. Endpoint plans
+            compiled for an older generation are recompiled on their next call.
+            """
+        ),
+    ] = 0
+
+    _instrumentation: Annotated[
+        Instrumentation | None,
+        Doc(
+            """
+            Times the requests when `API_TIMING` is enabled, otherwise `None`.
+            """
+        ),
+    ] = None
+
+    _loaded: Annotated[
+        bool,
+        Doc(
+            """
+            Whether the middleware chains are loaded and up to date with the
+            settings.
+            """
+        ),
+    ] = False
+
+    def __init__(self, group: str = DEFAULT_GROUP, lazy: bool = False):
+        """
+        A `lazy` API loads its middleware on its first request, or with
+        `ensure_loaded()`, instead of when it is created.
+        """
+        self.group = group
+        self.exception_handlers = ExceptionHandlerRegistry()
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+        if lazy:
+            # Fail early if the group is not declared.
+            self.get_group_settings()
+        else:
+            self.load_middleware()
+
+    def get_setting(self, name: str):
+        """Return the setting of the group, or the `API_` setting."""
+        overrides = self.get_group_settings()
+        if name in overrides:
+            return overrides[name]
+        return getattr(settings, f'API_{name}')
+
+    def get_group_settings(self) -> dict:
+        if self.group == DEFAULT_GROUP:
+            return {}
+
+        try:
+            overrides = settings.API_GROUPS[self.group]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'The API group {self.group!r} is not declared in API_GROUPS.'
+            ) from None
+
+        unknown = overrides.keys() - GROUP_SETTINGS
+        if unknown:
+            raise ImproperlyConfigured(
+                f'The API group {self.group!r} can not override '
+                f'{", ".join(sorted(unknown))}. The settings of a group are '
+                f'{", ".join(sorted(GROUP_SETTINGS))}.'
+            )
+        return overrides
+
+    def exception_handler(self, exception_type: type[Exception]):
+        """Register the decorated function as a handler of this group only."""
+        return self.exception_handlers.register(exception_type)
 
     def load_middleware(self):
-        self._endpoint_middleware = []
-        self._exception_middleware = []
-        handler = self._get_response
-        for middleware_path in reversed(settings.API_MIDDLEWARE):
+        """Build the sync and the async middleware chains.
+
+        Sync endpoints are served by the sync chain and async endpoints by the
+        async chain, so a chain of async capable middleware never needs a
+        thread to serve an async endpoint.
+        """
+        self._endpoint_middleware_filters = {}
+        self._instrumentation = (
+            Instrumentation() if self.get_setting('TIMING') else None
+        )
+        (
+            self._middleware_chain,
+            self._endpoint_middleware,
+            self._exception_middleware,
+        ) = self._build_middleware_chain(is_async=False)
+        (
+            self._async_middleware_chain,
+            self._async_endpoint_middleware,
+            self._async_exception_middleware,
+        ) = self._build_middleware_chain(is_async=True)
+        self._generation += 1
+        self._loaded = True
+
+    def ensure_loaded(self):
+        """Load the middleware if they are not loaded yet."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load_middleware()
+
+    def invalidate(self):
+        """Reload the middleware and recompile the plans on the next request.
+
+        Called when an `API_` setting changes, e.g. in the tests.
+        """
+        self._loaded = False
+        self._generation += 1
+
+    def prepare(self, wrapper: Callable) -> EndpointPlan:
+        """Load the middleware and compile the plan of an endpoint wrapper.
+
+        Used to warm up the endpoints before serving requests, so the first
+        request does not pay for it.
+        """
+        self.ensure_loaded()
+        plan = wrapper.arcstack_plan
+        if plan.generation != self._generation:
+            plan = wrapper.arcstack_plan = self.compile_plan(plan.endpoint)
+        return plan
+
+    def _build_middleware_chain(self, is_async: bool):
+        endpoint_middleware = []
+        exception_middleware = []
+
+        executor = self.get_setting('MIDDLEWARE_EXECUTOR')
+        if executor not in ('nested', 'flat'):
+            raise ImproperlyConfigured(
+                f'API_MIDDLEWARE_EXECUTOR must be "nested" or "flat", not {executor!r}.'
+            )
+
+        # `MiddlewareMixin` middleware waiting to be flattened, outermost first.
+        flat_middleware = []
+
+        handler = self._get_response_async if is_async else self._get_response
+        handler_is_async = is_async
+        if self._instrumentation is not None:
+            handler = TimedLayer('endpoint', handler, is_async)
+        for middleware_path in reversed(self.get_setting('MIDDLEWARE')):
             middleware = import_string(middleware_path)
+            flattenable = executor == 'flat' and is_flattenable_middleware(middleware)
+
+            if flat_middleware and not flattenable:
+                handler = self._create_flat_executor(
+                    flat_middleware, handler, handler_is_async
+                )
+                flat_middleware = []
+
+            middleware_can_sync = getattr(middleware, 'sync_capable', True)
+            middleware_can_async = getattr(middleware, 'async_capable', False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise ImproperlyConfigured(
+                    f'Middleware {middleware_path} must have at least one of '
+                    'sync_capable/async_capable set to True.'
+                )
+            elif not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
 
             try:
-                mw_instance = middleware(handler)
+                adapted_handler = adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async
+                )
+                mw_instance = middleware(adapted_handler)
             except MiddlewareNotUsed as e:
                 if settings.DEBUG:
                     if str(e):
@@ -69,26 +324,126 @@ class ArcStackAPI:
                         logger.debug(f'MiddlewareNotUsed({middleware_path})')
                 continue
             else:
-                handler = mw_instance
+                if flattenable:
+                    flat_middleware.insert(0, mw_instance)
+                else:
+                    handler = mw_instance
+                    handler_is_async = middleware_is_async
+                    if self._instrumentation is not None:
+                        handler = TimedLayer(
+                            middleware_path.rsplit('.', 1)[-1],
+                            handler,
+                            handler_is_async,
+                        )
 
             if mw_instance is None:
                 raise ImproperlyConfigured(
                     f'Middleware factory {middleware_path} returned None.'
                 )
 
-            if hasattr(mw_instance, 'process_endpoint'):
-                self._endpoint_middleware.insert(0, mw_instance.process_endpoint)
-            if hasattr(mw_instance, 'process_exception'):
-                self._exception_middleware.append(mw_instance.process_exception)
-        self._middleware_chain = handler
+            process_endpoint = get_middleware_hook(
+                mw_instance, 'process_endpoint', is_async
+            )
+            if process_endpoint is not None:
+                endpoint_middleware.insert(0, process_endpoint)
+                if hasattr(mw_instance, 'applies_to_endpoint'):
+                    self._endpoint_middleware_filters[process_endpoint] = (
+                        mw_instance.applies_to_endpoint
+                    )
+
+            process_exception = get_middleware_hook(
+                mw_instance, 'process_exception', is_async
+            )
+            if process_exception is not None:
+                exception_middleware.append(process_exception)
+
+        if flat_middleware:
+            handler = self._create_flat_executor(
+                flat_middleware, handler, handler_is_async
+            )
+
+        handler = adapt_method_mode(is_async, handler, handler_is_async)
+
+        return handler, endpoint_middleware, exception_middleware
+
+    def _create_flat_executor(self, middleware, handler, is_async):
+        executor = FlatMiddlewareExecutor(middleware, handler, is_async)
+        if self._instrumentation is not None:
+            # The hooks of a flattened group are timed together.
+            return TimedLayer('flat', executor, is_async)
+        return executor
 
     def __call__(self, endpoint: Callable):
         return self._create_wrapper(endpoint)
 
+    def compile_plan(self, endpoint: Callable) -> EndpointPlan:
+        """Compile the per-endpoint plan.
+
+        Resolves the signature, the login policy, the declared options and the
+        `process_endpoint` middleware that apply to the endpoint so none of
+        them are computed per request.
+        """
+        options = get_endpoint_options(endpoint)
+        is_async = iscoroutinefunction(endpoint)
+
+        login_required = options.get('LOGIN_REQUIRED')
+        if not isinstance(login_required, bool):
+            login_required = self.get_setting('DEFAULT_LOGIN_REQUIRED')
+
+        signature = EndpointSignature(endpoint)
+
+        plan = EndpointPlan(
+            endpoint=endpoint,
+            signature=signature,
+            is_async=is_async,
+            login_required=login_required,
+            options=options,
+            endpoint_middleware=(),
+            validator=(
+                compile_validator(signature)
+                if self.get_setting('VALIDATE_INPUT')
+                else None
+            ),
+            max_body_size=options.get(
+                'MAX_BODY_SIZE', self.get_setting('MAX_BODY_SIZE')
+            ),
+            generation=self._generation,
+        )
+
+        if not self._loaded:
+            # Compiled again with the middleware on the first request.
+            return plan._replace(generation=PENDING_GENERATION)
+
+        endpoint_middleware = (
+            self._async_endpoint_middleware if is_async else self._endpoint_middleware
+        )
+        filters = self._endpoint_middleware_filters
+
+        return plan._replace(
+            endpoint_middleware=tuple(
+                middleware
+                for middleware in endpoint_middleware
+                if middleware not in filters or filters[middleware](plan)
+            )
+        )
+
     def _create_wrapper(self, endpoint: Callable):
+        plan = self.compile_plan(endpoint)
+
+        if plan.is_async:
+            return self._create_async_wrapper(plan)
+
         @wraps(endpoint)
         def wrapper(request, *args, **kwargs):
-            request._arcstack_meta = ArcStackRequestMeta(endpoint, args, kwargs)
+            plan = wrapper.arcstack_plan
+            if plan.generation != self._generation:
+                plan = self.prepare(wrapper)
+
+            request._arcstack_meta = ArcStackRequestMeta(plan, args, kwargs)
+            request.payload = RequestPayload(request, plan.max_body_size)
+
+            if self._instrumentation is not None:
+                return self._instrumentation.run(self, request, plan)
 
             try:
                 response = self._middleware_chain(request)
@@ -97,9 +452,39 @@ class ArcStackAPI:
 
             return response
 
+        wrapper.arcstack_plan = plan
+        wrapper.arcstack_api = self
+
         return wrapper
 
-    def _get_response(self, request):
+    def _create_async_wrapper(self, plan: EndpointPlan):
+        endpoint = plan.endpoint
+
+        @wraps(endpoint)
+        async def wrapper(request, *args, **kwargs):
+            plan = wrapper.arcstack_plan
+            if plan.generation != self._generation:
+                plan = self.prepare(wrapper)
+
+            request._arcstack_meta = ArcStackRequestMeta(plan, args, kwargs)
+            request.payload = RequestPayload(request, plan.max_body_size)
+
+            if self._instrumentation is not None:
+                return await self._instrumentation.arun(self, request, plan)
+
+            try:
+                response = await self._async_middleware_chain(request)
+            except Exception as e:
+                response = await self._process_exception_async(e, request)
+
+            return response
+
+        wrapper.arcstack_plan = plan
+        wrapper.arcstack_api = self
+
+        return wrapper
+
+    def _pop_request_meta(self, request) -> ArcStackRequestMeta:
         if not hasattr(request, '_arcstack_meta'):
             raise ImproperlyConfigured(
                 'The request object must have an `_arcstack_meta` attribute. '
@@ -107,28 +492,57 @@ class ArcStackAPI:
                 'subclass `Endpoint`.'
             )
 
-        endpoint = request._arcstack_meta.endpoint
-        args = request._arcstack_meta.args
-        kwargs = request._arcstack_meta.kwargs
+        meta = request._arcstack_meta
         del request._arcstack_meta
+        return meta
+
+    def _get_response(self, request):
+        meta = self._pop_request_meta(request)
+        endpoint = meta.plan.endpoint
+        args = meta.args
+        kwargs = meta.kwargs
 
         response = None
 
-        for middleware in self._endpoint_middleware:
+        for middleware in meta.plan.endpoint_middleware:
             response = middleware(request, endpoint, *args, **kwargs)
             if response is not None:
                 break
 
         if response is None:
+            if meta.plan.validator is not None:
+                args, kwargs = meta.plan.validator(request, args, kwargs)
             response = endpoint(request, *args, **kwargs)
 
         return response
 
+    async def _get_response_async(self, request):
+        meta = self._pop_request_meta(request)
+        endpoint = meta.plan.endpoint
+        args = meta.args
+        kwargs = meta.kwargs
+
+        response = None
+
+        for middleware in meta.plan.endpoint_middleware:
+            response = await middleware(request, endpoint, *args, **kwargs)
+            if response is not None:
+                break
+
+        if response is None:
+            if meta.plan.validator is not None:
+                args, kwargs = meta.plan.validator(request, args, kwargs)
+            response = await endpoint(request, *args, **kwargs)
+
+        return response
+
     def _process_exception(
         self, exception: Exception, request: HttpRequest
     ) -> HttpResponse | None:
         """Process the exception through the middleware."""
-        response = None
+        response = self.exception_handlers.handle(exception, request)
+        if response is not None:
+            return response
 
         for middleware in self._exception_middleware:
             try:
@@ -149,6 +563,27 @@ class ArcStackAPI:
 
         return response
 
+    async def _process_exception_async(
+        self, exception: Exception, request: HttpRequest
+    ) -> HttpResponse | None:
+        """Async version of `_process_exception`."""
+        response = self.exception_handlers.handle(exception, request)
+        if response is not None:
+            return response
+
+        for middleware in self._async_exception_middleware:
+            try:
+                response = await middleware(exception, request)
+                if response is not None:
+                    break
+            except Exception as e:
+                response = self._process_unhandled_exception(e)
+
+        if response is None:
+            response = self._process_unhandled_exception(exception)
+
+        return response
+
     def _process_unhandled_exception(self, exception: Exception):
         """Process the unhandled exception."""
         if settings.DEBUG:
@@ -158,4 +593,36 @@ class ArcStackAPI:
             return InternalServerErrorResponse()
 
 
-arcstack_api = ArcStackAPI()
+_instances: weakref.WeakSet[ArcStackAPI] = weakref.WeakSet()
+
+arcstack_api = ArcStackAPI(lazy=True)
+
+_groups: dict[str, ArcStackAPI] = {}
+
+
+def get_api(group: str | None = None) -> ArcStackAPI:
+    """Return the `ArcStackAPI` of the group, the default one if `None`.
+
+    The API of a group is created when its first endpoint is declared.
+    """
+    if group is None or group == DEFAULT_GROUP:
+        return arcstack_api
+
+    api = _groups.get(group)
+    if api is None:
+        api = _groups.setdefault(group, ArcStackAPI(group, lazy=True))
+    return api
+
+
+def get_apis() -> list[ArcStackAPI]:
+    """Return the default API and the APIs of the groups in use."""
+    return [arcstack_api, *_groups.values()]
+
+
+def _setting_changed(setting: str, **kwargs):
+    if setting.startswith('API_'):
+        for api in list(_instances):
+            api.invalidate()
+
+
+setting_changed.connect(_setting_changed, dispatch_uid='arcstack_api.api')
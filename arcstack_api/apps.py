@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+from .conf import settings
+
+
+class ArcStackAPIConfig(AppConfig):
+    name = 'arcstack_api'
+    verbose_name = 'ArcStack API'
+
+    def ready(self):
+        if settings.API_WARMUP:
+            from .warmup import warmup
+
+            warmup()
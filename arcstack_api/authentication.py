@@ -0,0 +1,180 @@
+import base64
+import binascii
+import copy
+import hashlib
+import os
+import threading
+from collections.abc import Callable
+
+from django.contrib.auth import authenticate
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+
+from .cache import LRUCache
+from .conf import settings
+
+
+class CredentialCache:
+    """In-process cache of the users of verified credentials.
+
+    Verifying a credential may query the database (tokens) or hash a password
+    (Basic, hundreds of milliseconds with PBKDF2). The user of a verified
+    credential is kept for `API_AUTH_CACHE_TTL` seconds so the following
+    requests with the same credential skip the verification.
+
+    The credentials are never stored, only a keyed hash of them. The cache is
+    per process, so revoked credentials must also be invalidated with
+    `invalidate` or `invalidate_user` in every process, or expire with the TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.ttl = ttl
+        self._entries = LRUCache(max_entries)
+        # The keys of the credentials of every user, to invalidate them all.
+        self._keys_by_user: dict = {}
+        self._lock = threading.Lock()
+        self._secret = os.urandom(32)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_key(self, scheme: str, credentials: str) -> bytes:
+        return hashlib.blake2b(
+            f'{scheme.lower()} {credentials}'.encode(), key=self._secret
+        ).digest()
+
+    def get(self, scheme: str, credentials: str):
+        user = self._entries.get(self.get_key(scheme, credentials))
+        # Every request gets its own instance of the user.
+        return None if user is None else copy.copy(user)
+
+    def set(self, scheme: str, credentials: str, user):
+        key = self.get_key(scheme, credentials)
+        self._entries.set(key, copy.copy(user), self.ttl)
+        with self._lock:
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            if len(self._keys_by_user) > 2 * self._entries.max_entries:
+                self._prune()
+
+    def invalidate(self, scheme: str, credentials: str):
+        """Forget a credential, e.g. a revoked token."""
+        self._entries.delete(self.get_key(scheme, credentials))
+
+    def invalidate_user(self, user_pk):
+        """Forget every credential of the user."""
+        with self._lock:
+            keys = self._keys_by_user.pop(user_pk, ())
+        for key in keys:
+            self._entries.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self._keys_by_user.clear()
+
+    def _prune(self):
+        # Drop the keys evicted from the LRU cache.
+        self._keys_by_user = {
+            user_pk: live
+            for user_pk, keys in self._keys_by_user.items()
+            if (live := {key for key in keys if key in self._entries})
+        }
+
+
+_credential_caches: dict[tuple[int, float], CredentialCache] = {}
+
+
+def get_credential_cache() -> CredentialCache:
+    """Return the credential cache configured in the settings."""
+    key = (settings.API_AUTH_CACHE_MAX_ENTRIES, settings.API_AUTH_CACHE_TTL)
+    cache = _credential_caches.get(key)
+    if cache is None:
+        cache = _credential_caches[key] = CredentialCache(*key)
+    return cache
+
+
+def invalidate_credentials(scheme: str, credentials: str):
+    """Forget a credential in the credential caches of this process."""
+    for cache in _credential_caches.values():
+        cache.invalidate(scheme, credentials)
+
+
+def invalidate_user_credentials(user_pk):
+    """Forget every credential of the user in the caches of this process."""
+    for cache in _credential_caches.values():
+        cache.invalidate_user(user_pk)
+
+
+def parse_authorization(header: str) -> tuple[str, str] | None:
+    """Split an `Authorization` header into its scheme and credentials."""
+    scheme, _, credentials = header.strip().partition(' ')
+    credentials = credentials.strip()
+    if not scheme or not credentials:
+        return None
+    return scheme.lower(), credentials
+
+
+def verify_basic(request, credentials: str):
+    """Return the active user of `Basic` credentials, or `None`."""
+    try:
+        decoded = base64.b64decode(credentials, validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+
+    username, separator, password = decoded.partition(':')
+    if not separator:
+        return None
+
+    return authenticate(request, username=username, password=password)
+
+
+def get_verifiers() -> dict[str, Callable]:
+    """Return the verifiers of the `API_AUTH_SCHEMES` by lower case scheme.
+
+    A verifier is called with the request and the credentials, and returns
+    the user or `None` if the credentials are not valid.
+    """
+    verifiers = {}
+
+    for scheme in settings.API_AUTH_SCHEMES:
+        scheme = scheme.lower()
+        if scheme == 'basic':
+            verifiers[scheme] = verify_basic
+        elif scheme == 'bearer':
+            verifier = settings.API_AUTH_TOKEN_VERIFIER
+            if verifier is None:
+                raise ImproperlyConfigured(
+                    'The `Bearer` scheme requires `API_AUTH_TOKEN_VERIFIER`.'
+                )
+            if isinstance(verifier, str):
+                verifier = import_string(verifier)
+            verifiers[scheme] = _token_verifier(verifier)
+        else:
+            raise ImproperlyConfigured(f'Unsupported authentication scheme: {scheme}')
+
+    return verifiers
+
+
+def _token_verifier(verifier: Callable) -> Callable:
+    def verify_bearer(request, credentials: str):
+        return verifier(credentials)
+
+    return verify_bearer
+
+
+def _invalidate_user(sender, instance, **kwargs):
+    # A saved user may have a new password or be deactivated.
+    invalidate_user_credentials(instance.pk)
+
+
+post_save.connect(
+    _invalidate_user,
+    sender=settings.AUTH_USER_MODEL,
+    dispatch_uid='arcstack_api.authentication.post_save',
+)
+post_delete.connect(
+    _invalidate_user,
+    sender=settings.AUTH_USER_MODEL,
+    dispatch_uid='arcstack_api.authentication.post_delete',
+)
@@ -0,0 +1,381 @@
+import asyncio
+import io
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, NamedTuple
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+from django.http import HttpRequest, HttpResponse, QueryDict
+from django.http.response import HttpResponseBase
+from django.urls import Resolver404, resolve
+
+from .conf import settings
+from .endpoint import Endpoint
+from .errors import APIError, ValidationError
+from .logger import logger
+from .payload import get_payload
+from .responses import InternalServerErrorResponse
+from .serializers import JsonSerializer
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+ALLOWED_METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Headers of the batch request that do not apply to the sub-requests. The
+# results are embedded in the batch response, so they are never compressed.
+EXCLUDED_META_KEYS = (
+    'CONTENT_LENGTH',
+    'CONTENT_TYPE',
+    'HTTP_CONTENT_ENCODING',
+    'HTTP_ACCEPT_ENCODING',
+    'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE',
+)
+
+
+class SubRequest(NamedTuple):
+    method: str
+    path: str
+    query: str
+    body: bytes | None
+    headers: dict[str, str]
+
+
+class BatchItemError(Exception):
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the thread pool shared by the batch endpoints.
+
+    The pool is created on first use with `API_BATCH_MAX_WORKERS` threads.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.API_BATCH_MAX_WORKERS,
+                    thread_name_prefix='arcstack-batch',
+                )
+
+    return _executor
+
+
+class BatchMixin:
+    """Executes many sub-requests of the API in a single request.
+
+    The body of the request lists the sub-requests:
+
+    ```json
+    {"requests": [{"method": "GET", "path": "/api/items/1"}, ...]}
+    ```
+
+    Every sub-request is resolved once and calls the endpoint, which runs it
+    through the middleware chain of the API with its own request meta. The
+    consecutive safe (`GET`, `HEAD`, `OPTIONS`) sub-requests are independent
+    and run concurrently. The other sub-requests run one at a time, in order.
+    """
+
+    def parse_batch(self, request) -> list[SubRequest | BatchItemError]:
+        try:
+            data = get_payload(request).json() or {}
+        except ValidationError:
+            raise APIError({'detail': 'Invalid JSON'}) from None
+
+        items = data.get('requests') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            raise APIError({'detail': '`requests` must be a list'})
+
+        if len(items) > settings.API_BATCH_MAX_SIZE:
+            raise APIError(
+                {
+                    'detail': f'A batch can have at most '
+                    f'{settings.API_BATCH_MAX_SIZE} requests'
+                },
+                status_code=413,
+            )
+
+        return [self._parse_item(item) for item in items]
+
+    def _parse_item(self, item) -> SubRequest | BatchItemError:
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            return BatchItemError('`path` is required')
+
+        method = str(item.get('method', 'GET')).upper()
+        if method not in ALLOWED_METHODS:
+            return BatchItemError(f'Method {method} is not allowed')
+
+        path, _, query = item['path'].partition('?')
+        if not path.startswith('/'):
+            return BatchItemError('`path` must be absolute')
+
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict):
+            return BatchItemError('`headers` must be an object')
+
+        body = item.get('body')
+        try:
+            body = None if body is None else JsonSerializer.encode(body)
+        except TypeError:
+            return BatchItemError('`body` is not valid JSON')
+
+        return SubRequest(method, path, query, body, headers)
+
+    def get_groups(self, items: list) -> list[list[int]]:
+        """Group the indexes of the sub-requests that can run concurrently."""
+        groups = []
+        concurrent = None
+
+        for index, item in enumerate(items):
+            if isinstance(item, SubRequest) and item.method not in SAFE_METHODS:
+                groups.append([index])
+                concurrent = None
+            elif concurrent is None:
+                concurrent = [index]
+                groups.append(concurrent)
+            else:
+                concurrent.append(index)
+
+        return groups
+
+    def resolve_endpoint(self, request, item: SubRequest) -> tuple[Callable, Any]:
+        try:
+            match = resolve(item.path, getattr(request, 'urlconf', None))
+        except Resolver404:
+            raise BatchItemError('Not found', status_code=404) from None
+
+        plan = getattr(match.func, 'arcstack_plan', None)
+        if plan is None:
+            # Only the API endpoints can be called, not the other views.
+            raise BatchItemError('Not found', status_code=404)
+
+        view_class = getattr(plan.endpoint, 'view_class', None)
+        if view_class is not None and issubclass(view_class, BatchMixin):
+            raise BatchItemError('Batches can not be nested')
+
+        return match.func, match
+
+    def build_request(self, request, item: SubRequest, match) -> HttpRequest:
+        sub_request = HttpRequest()
+        sub_request.method = item.method
+        sub_request.path = sub_request.path_info = item.path
+        sub_request.resolver_match = match
+
+        meta = {
+            key: value
+            for key, value in request.META.items()
+            if key not in EXCLUDED_META_KEYS
+        }
+        meta.update(
+            REQUEST_METHOD=item.method,
+            PATH_INFO=item.path,
+            QUERY_STRING=item.query,
+        )
+        for name, value in item.headers.items():
+            meta[f'HTTP_{name.upper().replace("-", "_")}'] = str(value)
+
+        body = item.body or b''
+        if item.body is not None:
+            meta['CONTENT_TYPE'] = 'application/json'
+            meta['CONTENT_LENGTH'] = str(len(body))
+
+        sub_request.META = meta
+        sub_request.GET = QueryDict(item.query)
+        sub_request.COOKIES = request.COOKIES
+        sub_request._body = body
+        sub_request._stream = io.BytesIO(body)
+        sub_request._get_scheme = request._get_scheme
+
+        # The user and session of the batch request are shared.
+        for name in ('user', 'auser', 'session', 'urlconf'):
+            if hasattr(request, name):
+                setattr(sub_request, name, getattr(request, name))
+
+        return sub_request
+
+    def render(self, results: list[bytes]) -> HttpResponse:
+        # The results are already JSON, so they are joined without decoding.
+        return HttpResponse(
+            content=b'{"responses":[' + b','.join(results) + b']}',
+            content_type='application/json',
+        )
+
+    def render_result(self, response: HttpResponseBase, content: bytes) -> bytes:
+        content_type = response.get('Content-Type', '')
+
+        if not content:
+            body = b'null'
+        elif content_type.startswith('application/json'):
+            body = content
+        else:
+            body = JsonSerializer.encode(content.decode(response.charset, 'replace'))
+
+        head = JsonSerializer.encode(
+            {'status': response.status_code, 'headers': dict(response.items())}
+        )
+        return head[:-1] + b',"body":' + body + b'}'
+
+    def render_error(self, error: BatchItemError) -> bytes:
+        return JsonSerializer.encode(
+            {
+                'status': error.status_code,
+                'headers': {},
+                'body': {'detail': error.detail},
+            }
+        )
+
+    def render_timeout(self) -> bytes:
+        return self.render_error(BatchItemError('Batch timeout', status_code=504))
+
+
+class BatchEndpoint(BatchMixin, Endpoint):
+    """Batch endpoint for WSGI. The sub-requests run in a thread pool.
+
+    ```py
+    urlpatterns = [path('api/batch', BatchEndpoint.as_endpoint())]
+    ```
+    """
+
+    def post(self, request):
+        items = self.parse_batch(request)
+        results: list[bytes | None] = [None] * len(items)
+        deadline = time.monotonic() + settings.API_BATCH_TIMEOUT
+
+        for group in self.get_groups(items):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if len(group) == 1:
+                results[group[0]] = self.execute(request, items[group[0]])
+                continue
+
+            executor = get_executor()
+            futures = {
+                executor.submit(self._execute_in_thread, request, items[index]): index
+                for index in group
+            }
+            done, not_done = wait(futures, timeout=remaining)
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                results[futures[future]] = future.result()
+
+        return self.render(
+            [self.render_timeout() if result is None else result for result in results]
+        )
+
+    def execute(self, request, item: SubRequest | BatchItemError) -> bytes:
+        if isinstance(item, BatchItemError):
+            return self.render_error(item)
+
+        try:
+            endpoint, match = self.resolve_endpoint(request, item)
+            if iscoroutinefunction(endpoint):
+                raise BatchItemError('Async endpoints need an `AsyncBatchEndpoint`')
+
+            sub_request = self.build_request(request, item, match)
+            response = endpoint(sub_request, *match.args, **match.kwargs)
+            content = read_content(response)
+        except BatchItemError as e:
+            return self.render_error(e)
+        except Exception as e:
+            logger.error(f'Batch sub-request {item.method} {item.path} failed: {e}')
+            response = InternalServerErrorResponse()
+            content = response.content
+
+        return self.render_result(response, content)
+
+    def _execute_in_thread(self, request, item) -> bytes:
+        try:
+            return self.execute(request, item)
+        finally:
+            # The threads of the pool outlive the request.
+            connections.close_all()
+
+
+class AsyncBatchEndpoint(BatchMixin, Endpoint):
+    """Batch endpoint for ASGI. The sub-requests run with `asyncio.gather`.
+
+    Sync endpoints are called in the thread pool of the batch endpoints.
+    """
+
+    async def post(self, request):
+        items = self.parse_batch(request)
+        results: list[bytes | None] = [None] * len(items)
+        deadline = time.monotonic() + settings.API_BATCH_TIMEOUT
+
+        for group in self.get_groups(items):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            tasks = {
+                asyncio.ensure_future(self.execute(request, items[index])): index
+                for index in group
+            }
+            done, not_done = await asyncio.wait(tasks, timeout=remaining)
+            for task in not_done:
+                task.cancel()
+            for task in done:
+                results[tasks[task]] = task.result()
+
+        return self.render(
+            [self.render_timeout() if result is None else result for result in results]
+        )
+
+    async def execute(self, request, item: SubRequest | BatchItemError) -> bytes:
+        if isinstance(item, BatchItemError):
+            return self.render_error(item)
+
+        try:
+            endpoint, match = self.resolve_endpoint(request, item)
+            sub_request = self.build_request(request, item, match)
+
+            if iscoroutinefunction(endpoint):
+                response = await endpoint(sub_request, *match.args, **match.kwargs)
+                content = await aread_content(response)
+            else:
+                response, content = await asyncio.get_running_loop().run_in_executor(
+                    get_executor(), self._call_in_thread, endpoint, sub_request, match
+                )
+        except BatchItemError as e:
+            return self.render_error(e)
+        except Exception as e:
+            logger.error(f'Batch sub-request {item.method} {item.path} failed: {e}')
+            response = InternalServerErrorResponse()
+            content = response.content
+
+        return self.render_result(response, content)
+
+    def _call_in_thread(self, endpoint, sub_request, match):
+        try:
+            response = endpoint(sub_request, *match.args, **match.kwargs)
+            return response, read_content(response)
+        finally:
+            connections.close_all()
+
+
+def read_content(response: HttpResponseBase) -> bytes:
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+async def aread_content(response: HttpResponseBase) -> bytes:
+    if response.streaming and response.is_async:
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return read_content(response)
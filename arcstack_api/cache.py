@@ -0,0 +1,198 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.http.response import HttpResponseBase
+
+from .conf import settings
+
+
+class LRUCache:
+    """A thread-safe, size bounded LRU cache with per-entry expiration."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[Any, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_request_key(
+    request,
+    name: str,
+    args: tuple,
+    kwargs: dict,
+    vary: Iterable[str],
+    per_user: bool,
+    user_pk=None,
+) -> str:
+    """Return a hash of what identifies the response of an endpoint.
+
+    `name` identifies the endpoint. The URL args and kwargs, the query string,
+    the `vary` headers and, if `per_user`, the user are part of the key.
+    """
+    key = hashlib.sha256()
+    key.update(name.encode())
+    key.update(repr((args, sorted(kwargs.items()))).encode())
+    key.update(repr(sorted(request.GET.lists())).encode())
+    for header in vary:
+        key.update(f'{header}:{request.headers.get(header, "")}'.encode())
+    if per_user:
+        key.update(f'user:{user_pk}'.encode())
+
+    return key.hexdigest()
+
+
+# The headers describing the request that rendered a response, they are not
+# replayed to the other requests.
+PER_REQUEST_HEADERS = frozenset(
+    {
+        'ratelimit-limit',
+        'ratelimit-policy',
+        'ratelimit-remaining',
+        'ratelimit-reset',
+        'retry-after',
+        'server-timing',
+        'set-cookie',
+        'x-query-count',
+        'x-query-time',
+    }
+)
+
+
+class CachedResponse(NamedTuple):
+    """A rendered response stored in the `ResponseCache`."""
+
+    status_code: int
+    content: bytes
+    headers: tuple[tuple[str, str], ...]
+    etag: str
+
+    @classmethod
+    def from_response(
+        cls, response: HttpResponseBase, etag: str, content: bytes | None = None
+    ) -> 'CachedResponse':
+        """`content` is the content of a streaming response, read beforehand."""
+        return cls(
+            status_code=response.status_code,
+            content=response.content if content is None else content,
+            headers=tuple(
+                (header, value)
+                for header, value in response.items()
+                if header.lower() not in PER_REQUEST_HEADERS
+            ),
+            etag=etag,
+        )
+
+    def to_response(self) -> HttpResponse:
+        response = HttpResponse(content=self.content, status=self.status_code)
+        for header, value in self.headers:
+            response[header] = value
+        return response
+
+
+class ResponseCache:
+    """Two tier cache of rendered responses.
+
+    The in-process LRU tier is always used. If `backend` is the alias of a
+    Django cache, it is used as the second tier so the responses are shared
+    between the workers.
+    """
+
+    def __init__(self, max_entries: int, backend: str | None = None):
+        self.local = LRUCache(max_entries)
+        self.backend = caches[backend] if backend else None
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self.local.get(key)
+        if entry is None and self.backend is not None:
+            entry = self._from_backend(key, self.backend.get(key))
+        return entry
+
+    async def aget(self, key: str) -> CachedResponse | None:
+        entry = self.local.get(key)
+        if entry is None and self.backend is not None:
+            entry = self._from_backend(key, await self.backend.aget(key))
+        return entry
+
+    def set(self, key: str, entry: CachedResponse, ttl: int):
+        self.local.set(key, entry, ttl)
+        if self.backend is not None:
+            self.backend.set(key, (time.time() + ttl, tuple(entry)), ttl)
+
+    async def aset(self, key: str, entry: CachedResponse, ttl: int):
+        self.local.set(key, entry, ttl)
+        if self.backend is not None:
+            await self.backend.aset(key, (time.time() + ttl, tuple(entry)), ttl)
+
+    def clear(self):
+        self.local.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _from_backend(self, key: str, value) -> CachedResponse | None:
+        if value is None:
+            return None
+
+        expires_at, fields = value
+        entry = CachedResponse(*fields)
+        # Keep the entry locally until it expires in the shared tier.
+        self.local.set(key, entry, max(expires_at - time.time(), 0))
+        return entry
+
+
+_response_caches: dict[tuple[int, str | None], ResponseCache] = {}
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the response cache configured in the settings.
+
+    The cache is shared by every middleware instance using the same settings,
+    so it can be cleared from anywhere with `get_response_cache().clear()`.
+    """
+    key = (settings.API_CACHE_MAX_ENTRIES, settings.API_CACHE_BACKEND)
+    cache = _response_caches.get(key)
+    if cache is None:
+        cache = _response_caches[key] = ResponseCache(*key)
+    return cache
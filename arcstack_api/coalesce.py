@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+from .cache import CachedResponse
+
+
+class Flight:
+    """A request in flight, whose response is shared with identical requests.
+
+    The requests waiting for it can be sync, in threads, or async, in any event
+    loop.
+    """
+
+    __slots__ = ('response', 'done', '_event', '_async_waiters', '_lock')
+
+    def __init__(self):
+        self.response: CachedResponse | None = None
+        self.done = False
+        self._event = threading.Event()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+
+    def wait(self, timeout: float) -> CachedResponse | None:
+        """Wait for the shared response, `None` if there is none."""
+        self._event.wait(timeout)
+        return self.response
+
+    async def await_response(self, timeout: float) -> CachedResponse | None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.done:
+                return self.response
+            future = loop.create_future()
+            self._async_waiters.append((loop, future))
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def land(self, response: CachedResponse | None):
+        """Share the response with the waiting requests."""
+        with self._lock:
+            self.response = response
+            self.done = True
+            waiters, self._async_waiters = self._async_waiters, []
+
+        self._event.set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_set_result, future, response)
+            except RuntimeError:
+                # The loop is closed, nobody is waiting anymore.
+                pass
+
+
+def _set_result(future: asyncio.Future, response):
+    if not future.done():
+        future.set_result(response)
+
+
+class SingleFlight:
+    """Tracks the flights by request key, one at a time per key.
+
+    A flight is removed as soon as it lands, so the requests arriving after
+    the response is rendered start a new flight and never get a stale
+    response.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, Flight] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flights)
+
+    def join(self, key: str) -> tuple[Flight, bool]:
+        """Return the flight of the key, and whether the caller leads it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def land(self, key: str, flight: Flight, response: CachedResponse | None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.land(response)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
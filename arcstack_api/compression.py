@@ -0,0 +1,162 @@
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class Encoding:
+    """A content coding of the `Accept-Encoding` header.
+
+    `compress` compresses a whole payload. `stream` compresses the chunks of a
+    streaming response one by one and flushes after every chunk, so the client
+    receives the data as soon as it is produced.
+    """
+
+    name: str
+    default_level: int
+
+    def __init__(self, level: int | None = None):
+        self.level = self.default_level if level is None else level
+
+    def compressobj(self):
+        raise NotImplementedError
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+    def _flush_chunk(self, compressor) -> bytes:
+        raise NotImplementedError
+
+    def stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = self.compressobj()
+        for chunk in chunks:
+            if data := compressor.compress(chunk) + self._flush_chunk(compressor):
+                yield data
+        yield compressor.flush()
+
+    async def astream(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        compressor = self.compressobj()
+        async for chunk in chunks:
+            if data := compressor.compress(chunk) + self._flush_chunk(compressor):
+                yield data
+        yield compressor.flush()
+
+
+class DeflateEncoding(Encoding):
+    """`deflate`, which is the zlib format in HTTP."""
+
+    name = 'deflate'
+    default_level = 6
+    wbits = zlib.MAX_WBITS
+
+    def compressobj(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+
+    def _flush_chunk(self, compressor) -> bytes:
+        return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class GzipEncoding(DeflateEncoding):
+    """`gzip`, compressed with zlib so the output has no timestamp."""
+
+    name = 'gzip'
+    wbits = 16 + zlib.MAX_WBITS
+
+
+class ZstdEncoding(Encoding):
+    """`zstd`, requires the `zstandard` package.
+
+    `ZstdCompressor` instances are not thread safe, one is created per payload
+    and per stream.
+    """
+
+    name = 'zstd'
+    default_level = 3
+
+    def compressobj(self):
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def _flush_chunk(self, compressor) -> bytes:
+        return compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+ENCODINGS: dict[str, type[Encoding]] = {
+    'zstd': ZstdEncoding,
+    'gzip': GzipEncoding,
+    'deflate': DeflateEncoding,
+}
+
+
+def is_available(name: str) -> bool:
+    return name != 'zstd' or zstandard is not None
+
+
+def get_encodings(names: Iterable[str], levels: dict[str, int]) -> list[Encoding]:
+    """Create the encodings in the order of preference of the server.
+
+    `zstd` is left out if `zstandard` is not installed.
+    """
+    encodings = []
+
+    for name in names:
+        if name not in ENCODINGS:
+            raise ImproperlyConfigured(
+                f'Unknown compression encoding {name!r}. '
+                f'Choices are: {", ".join(ENCODINGS)}.'
+            )
+        if is_available(name):
+            encodings.append(ENCODINGS[name](levels.get(name)))
+
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Return the quality value of every coding in the `Accept-Encoding` header."""
+    accepted = {}
+
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        accepted[name] = quality
+
+    return accepted
+
+
+def negotiate_encoding(header: str, encodings: Iterable[Encoding]) -> Encoding | None:
+    """Return the encoding to use for the `Accept-Encoding` header.
+
+    The encoding with the highest quality value wins, the first one of
+    `encodings` between equal quality values. `None` means no compression.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding.name, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import threading
+from collections import deque
+from typing import NamedTuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+
+
+class BulkheadConfig(NamedTuple):
+    # The maximum number of requests in flight, the upper bound of the adaptive
+    # limit.
+    limit: int
+    # The number of requests waiting for a slot, the others are rejected.
+    queue_size: int
+    # Seconds a request waits for a slot before it is rejected.
+    timeout: float
+    adaptive: bool
+
+
+class GradientLimit:
+    """Adapts a concurrency limit to the latency of the requests.
+
+    A long term average of the latency is compared to the latency of every
+    request. When the latency grows, the requests are queuing somewhere, e.g.
+    in the database, and the limit shrinks. While it is stable, the limit grows
+    by its square root. This is the gradient algorithm of Netflix's
+    concurrency-limits.
+    """
+
+    __slots__ = (
+        'limit',
+        'min_limit',
+        'max_limit',
+        'smoothing',
+        'tolerance',
+        'window',
+        'long_latency',
+    )
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        window: int = 100,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.window = window
+        self.long_latency: float | None = None
+
+    def update(self, latency: float, in_flight: int) -> int:
+        """Record the latency of a request and return the new limit."""
+        if self.long_latency is None:
+            self.long_latency = latency
+        else:
+            self.long_latency += (latency - self.long_latency) / self.window
+
+        # Recover faster once the latency is back to normal after a long
+        # period of high latency.
+        if latency > 0 and self.long_latency / latency > 2:
+            self.long_latency *= 0.95
+
+        # Far from the limit, the latency does not depend on it.
+        if in_flight < self.limit / 2 or latency <= 0:
+            return int(self.limit)
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / latency))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+        return int(self.limit)
+
+
+class _Waiter:
+    __slots__ = ('event',)
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def grant(self) -> bool:
+        self.event.set()
+        return True
+
+
+class _AsyncWaiter:
+    __slots__ = ('loop', 'future')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def grant(self) -> bool:
+        try:
+            # Slots are released from any thread.
+            self.loop.call_soon_threadsafe(self._set_result)
+        except RuntimeError:
+            # The loop is closed, nobody is waiting anymore.
+            return False
+        return True
+
+    def _set_result(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Bulkhead:
+    """Limits the number of requests in flight, with a bounded wait queue.
+
+    The sync and the async requests share the same slots. A released slot is
+    handed over to the oldest waiting request, so the waiting requests are
+    served in order.
+    """
+
+    def __init__(self, name: str, config: BulkheadConfig):
+        self.name = name
+        self.config = config
+        self.limit = config.limit
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+        self._gradient = (
+            GradientLimit(config.limit, 1, config.limit) if config.adaptive else None
+        )
+
+    def acquire(self) -> bool:
+        """Wait for a slot, returns `False` if the request is rejected."""
+        with self._lock:
+            if self._try_acquire():
+                return True
+            if len(self._waiters) >= self.config.queue_size:
+                return False
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+
+        if waiter.event.wait(self.config.timeout):
+            return True
+        return self._cancel(waiter)
+
+    async def aacquire(self) -> bool:
+        with self._lock:
+            if self._try_acquire():
+                return True
+            if len(self._waiters) >= self.config.queue_size:
+                return False
+            waiter = _AsyncWaiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.config.timeout)
+        except asyncio.TimeoutError:
+            return self._cancel(waiter)
+        except asyncio.CancelledError:
+            if self._cancel(waiter):
+                self.release()
+            raise
+        return True
+
+    def release(self, latency: float | None = None):
+        """Release a slot, `latency` is the duration of the request in seconds."""
+        with self._lock:
+            if self._gradient is not None and latency is not None:
+                self.limit = self._gradient.update(latency, self.in_flight)
+
+            self.in_flight -= 1
+            while self._waiters and self.in_flight < self.limit:
+                if self._waiters.popleft().grant():
+                    self.in_flight += 1
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        return False
+
+    def _cancel(self, waiter) -> bool:
+        """Remove a waiter that gave up, `True` if it got a slot meanwhile."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return True
+            return False
+
+
+_bulkheads: dict[str, Bulkhead] = {}
+# The configuration declared by every endpoint of a pool.
+_pools: dict[str, dict[str, BulkheadConfig]] = {}
+_bulkheads_lock = threading.Lock()
+
+
+def register_pool(name: str, endpoint: str, config: BulkheadConfig):
+    """Declare the configuration of an endpoint of the pool.
+
+    The pools are shared by the sync and the async chains and by the APIs, so
+    the endpoints are checked against all the other endpoints of the pool.
+
+    :raises ImproperlyConfigured: If another endpoint of the pool declares
+        different limits.
+    """
+    with _bulkheads_lock:
+        endpoints = _pools.setdefault(name, {})
+        for other, other_config in endpoints.items():
+            if other != endpoint and other_config != config:
+                raise ImproperlyConfigured(
+                    f'The endpoints of the {name!r} concurrency pool declare '
+                    f'different limits: {endpoint} and {other}.'
+                )
+        endpoints[endpoint] = config
+
+
+def get_bulkhead(name: str, config: BulkheadConfig) -> Bulkhead:
+    """Return the bulkhead of the pool, shared by the sync and async chains.
+
+    A new bulkhead replaces the previous one when the configuration changes,
+    e.g. when the middleware are reloaded.
+    """
+    with _bulkheads_lock:
+        bulkhead = _bulkheads.get(name)
+        if bulkhead is None or bulkhead.config != config:
+            bulkhead = _bulkheads[name] = Bulkhead(name, config)
+        return bulkhead
+
+
+def clear_bulkheads():
+    with _bulkheads_lock:
+        _bulkheads.clear()
+        _pools.clear()
+
+
+def _setting_changed(setting: str, **kwargs):
+    # The APIs reload their middleware, the endpoints register their pools
+    # again with the new settings.
+    if setting.startswith('API_'):
+        with _bulkheads_lock:
+            _pools.clear()
+
+
+setting_changed.connect(_setting_changed, dispatch_uid='arcstack_api.concurrency')
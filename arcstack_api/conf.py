@@ -6,9 +6,107 @@ from appconf import AppConf
 class ArcStackAPIConf(AppConf):
     MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
 
+    MIDDLEWARE_EXECUTOR = 'nested'
+
     JSON_ENCODER = 'django.core.serializers.json.DjangoJSONEncoder'
 
+    JSON_BACKEND = 'arcstack_api.serializers.StdlibJsonBackend'
+
+    STREAM_CHUNK_SIZE = 1000
+
     DEFAULT_LOGIN_REQUIRED = False
 
+    VALIDATE_INPUT = True
+
+    MAX_BODY_SIZE = 2621440
+
+    GROUPS = {}
+
+    WARMUP = False
+
+    OPENAPI_INFO = {'title': 'API', 'version': '1.0.0'}
+
+    AUTH_SCHEMES = ['Basic']
+
+    AUTH_TOKEN_VERIFIER = None
+
+    AUTH_CACHE_TTL = 300
+
+    AUTH_CACHE_MAX_ENTRIES = 10000
+
+    PAGE_SIZE = 100
+
+    MAX_PAGE_SIZE = 1000
+
+    FIELDS_QUERY_PARAM = 'fields'
+
+    EXCLUDED_FIELDS = ['password']
+
+    TIMING = False
+
+    TIMING_HEADER = True
+
+    TIMING_SINKS = []
+
+    TIMING_STATSD = {}
+
+    COMPRESSION_MIN_SIZE = 1024
+
+    COMPRESSION_ENCODINGS = ['zstd', 'gzip', 'deflate']
+
+    COMPRESSION_LEVELS = {}
+
+    BULK_CHUNK_SIZE = 500
+
+    BATCH_MAX_SIZE = 20
+
+    BATCH_TIMEOUT = 10
+
+    BATCH_MAX_WORKERS = 8
+
+    QUERY_BUDGET = None
+
+    QUERY_BUDGET_STRICT = False
+
+    QUERY_REPEAT_THRESHOLD = 3
+
+    QUERY_HEADERS = True
+
+    RATE_LIMIT = None
+
+    RATE_LIMIT_KEY = 'user'
+
+    RATE_LIMIT_BACKEND = None
+
+    RATE_LIMIT_SHARDS = 16
+
+    RATE_LIMIT_KEY_PREFIX = 'arcstack_api:ratelimit:'
+
+    CONCURRENCY_LIMIT = None
+
+    CONCURRENCY_QUEUE_SIZE = 10
+
+    CONCURRENCY_QUEUE_TIMEOUT = 1.0
+
+    CONCURRENCY_ADAPTIVE = False
+
+    CONCURRENCY_RETRY_AFTER = 1
+
+    COALESCE = False
+
+    COALESCE_TIMEOUT = 10
+
+    COALESCE_VARY_HEADERS = ['Accept', 'Accept-Language']
+
+    COALESCE_MAX_STREAM_SIZE = 262144
+
+    CACHE_MAX_ENTRIES = 1024
+
+    CACHE_BACKEND = None
+
+    CACHE_KEY_PREFIX = 'arcstack_api:response:'
+
+    CACHE_VARY_HEADERS = ['Accept', 'Accept-Language']
+
     class Meta:
         prefix = 'api'
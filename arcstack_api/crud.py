@@ -0,0 +1,446 @@
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, router, transaction
+from django.db.models import Model, QuerySet
+from django.http import Http404, HttpResponse
+
+from .conf import settings
+from .endpoint import Endpoint
+from .errors import ValidationError
+from .modelserializer import get_default_fields
+from .parsers import JsonStreamReader
+from .payload import get_payload
+from .serializers import JsonSerializer
+
+
+CONSTRAINT_ERROR = 'Violates a database constraint'
+
+
+class BulkErrors:
+    """Collects the errors of the items of a bulk request."""
+
+    def __init__(self):
+        self.errors: list[dict] = []
+
+    def __bool__(self):
+        return bool(self.errors)
+
+    def add(self, index: int | None, msg: str, type: str, field: str | None = None):
+        loc = ['body']
+        if index is not None:
+            loc.append(index)
+        if field is not None:
+            loc.append(field)
+        self.errors.append({'loc': loc, 'msg': msg, 'type': type})
+
+    def has_errors(self, index: int | None) -> bool:
+        """Whether an error is reported for the item."""
+        loc = ['body'] if index is None else ['body', index]
+        return any(error['loc'][: len(loc)] == loc for error in self.errors)
+
+    def add_validation_error(self, index: int | None, error: DjangoValidationError):
+        for field, messages in error.message_dict.items():
+            for message in messages:
+                self.add(index, message, 'invalid', field=field)
+
+    def raise_if_any(self):
+        if self.errors:
+            raise ValidationError('Invalid input', errors=self.errors)
+
+
+class ModelEndpointMixin:
+    """Configuration shared by the model endpoints.
+
+    `fields` are the fields returned by the endpoint and also the `FIELDS`
+    whitelist of the sparse fieldsets, the concrete fields of the model but the
+    `API_EXCLUDED_FIELDS` by default. `write_fields` are the fields that can
+    be set by the requests, all the returned fields but the primary key by
+    default.
+    """
+
+    model: type[Model] | None = None
+    queryset: QuerySet | None = None
+    fields: Sequence[str] = ()
+    write_fields: Sequence[str] | None = None
+    # Number of rows written per query. `API_BULK_CHUNK_SIZE` by default.
+    chunk_size: int | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.fields and 'FIELDS' not in vars(cls):
+            cls.FIELDS = tuple(cls.fields)
+
+    def get_queryset(self) -> QuerySet:
+        if self.queryset is not None:
+            return self.queryset.all()
+        if self.model is not None:
+            return self.model._default_manager.all()
+
+        raise ImproperlyConfigured(
+            f'{self.__class__.__name__} must define `model` or `queryset`.'
+        )
+
+    def get_model(self) -> type[Model]:
+        return self.queryset.model if self.queryset is not None else self.model
+
+    def get_fields(self) -> tuple[str, ...]:
+        if self.fields:
+            return tuple(self.fields)
+        return get_default_fields(self.get_model())
+
+    def get_write_fields(self) -> frozenset[str]:
+        if self.write_fields is not None:
+            return frozenset(self.write_fields)
+
+        pk = self.get_model()._meta.pk
+        return frozenset(self.get_fields()) - {'pk', pk.name, pk.attname}
+
+    def get_chunk_size(self) -> int:
+        return self.chunk_size or settings.API_BULK_CHUNK_SIZE
+
+    def get_body_reader(self, request) -> JsonStreamReader:
+        """Read the body as a stream, within the `MAX_BODY_SIZE` of the endpoint."""
+        try:
+            return JsonStreamReader(get_payload(request).stream())
+        except ValueError as e:
+            raise _invalid_json(e) from None
+
+    def build_instance(
+        self,
+        data,
+        index: int | None,
+        errors: BulkErrors,
+        instance: Model | None = None,
+        partial: bool = False,
+    ) -> Model | None:
+        """Set the fields of the instance from the data and validate them.
+
+        Only the field validation is done, without any query. The constraints
+        are checked by the database when the rows are written. A `partial`
+        update validates only the given fields.
+        """
+        if not isinstance(data, dict):
+            errors.add(index, 'Expected an object', 'object_type')
+            return None
+
+        write_fields = self.get_write_fields()
+        unknown = [name for name in data if name not in write_fields]
+        for name in unknown:
+            errors.add(index, 'Unknown field', 'extra_forbidden', field=name)
+        if unknown:
+            return None
+
+        if instance is None:
+            instance = self.get_model()()
+
+        for name, value in data.items():
+            try:
+                setattr(instance, name, value)
+            except ValueError as e:
+                # E.g. a primary key given to a foreign key by its name.
+                errors.add(index, f'{e}', 'invalid', field=name)
+        if errors.has_errors(index):
+            return None
+
+        exclude = None
+        if partial:
+            exclude = [
+                field.name
+                for field in instance._meta.concrete_fields
+                if field.name not in data and field.attname not in data
+            ]
+
+        try:
+            instance.clean_fields(exclude=exclude)
+        except DjangoValidationError as e:
+            errors.add_validation_error(index, e)
+            return None
+
+        return instance
+
+    def save_instance(
+        self,
+        instance: Model,
+        index: int | None,
+        errors: BulkErrors,
+        update_fields: list[str] | None = None,
+    ) -> bool:
+        """Save the instance in a savepoint, reporting a constraint violation."""
+        try:
+            with transaction.atomic(using=self.using()):
+                instance.save(using=self.using(), update_fields=update_fields)
+        except IntegrityError:
+            errors.add(index, CONSTRAINT_ERROR, 'integrity_error')
+            return False
+        return True
+
+    def get_keys(
+        self, chunk: list[tuple[int, object]], errors: BulkErrors
+    ) -> dict[int, object]:
+        """Convert the primary keys of the items, by the index of the item."""
+        pk = self.get_model()._meta.pk
+        keys = {}
+
+        for index, key in chunk:
+            try:
+                keys[index] = pk.to_python(key)
+            except DjangoValidationError:
+                errors.add(index, 'Invalid primary key', 'pk_invalid')
+
+        return keys
+
+    def values(self, instance: Model) -> dict:
+        data = {}
+        for name in self.get_fields():
+            value = getattr(instance, name)
+            data[name] = value.pk if isinstance(value, Model) else value
+        return data
+
+    def using(self) -> str:
+        return router.db_for_write(self.get_model())
+
+
+class ModelListEndpoint(ModelEndpointMixin, Endpoint):
+    """Lists, creates, updates and deletes the records of a model in bulk.
+
+    - `GET` returns the rows, streamed or paginated by `CommonMiddleware`.
+    - `POST` creates one object or an array of objects.
+    - `PATCH` updates an array of objects, identified by their primary keys.
+    - `DELETE` deletes the objects with the primary keys in the array.
+
+    The arrays are read from the request body one item at a time and written
+    with `bulk_create`, `bulk_update` and filtered deletes in chunks of
+    `chunk_size` rows, inside a single transaction. If any item is invalid,
+    nothing is written and every error is reported with its index.
+    """
+
+    def get(self, request):
+        return self.get_queryset().values(*self.get_fields())
+
+    def post(self, request):
+        reader = self.get_body_reader(request)
+
+        if not reader.is_array:
+            errors = BulkErrors()
+            instance = self.build_instance(_read_value(reader), None, errors)
+            errors.raise_if_any()
+            self.save_instance(instance, None, errors)
+            errors.raise_if_any()
+            return _json_response(self.values(instance), status=201)
+
+        errors = BulkErrors()
+        ids = []
+
+        with transaction.atomic(using=self.using()):
+            for chunk in _chunks(_iter_items(reader), self.get_chunk_size()):
+                instances = [
+                    self.build_instance(data, index, errors) for index, data in chunk
+                ]
+                if errors:
+                    # Keep reading to report the errors of all the items.
+                    continue
+
+                try:
+                    with transaction.atomic(using=self.using()):
+                        instances = self.get_model()._default_manager.bulk_create(
+                            instances, batch_size=self.get_chunk_size()
+                        )
+                except IntegrityError:
+                    # Find the items violating a constraint, one at a time.
+                    self._save_one_by_one(
+                        [
+                            (index, instance, None)
+                            for (index, _), instance in zip(
+                                chunk, instances, strict=True
+                            )
+                        ],
+                        errors,
+                    )
+                    continue
+
+                ids.extend(instance.pk for instance in instances)
+
+            errors.raise_if_any()
+
+        return _json_response({'created': len(ids), 'ids': ids}, status=201)
+
+    def patch(self, request):
+        reader = self.get_array_reader(request)
+        model = self.get_model()
+        errors = BulkErrors()
+        updated = 0
+
+        with transaction.atomic(using=self.using()):
+            for chunk in _chunks(_iter_items(reader), self.get_chunk_size()):
+                keys = self.get_keys(
+                    [(index, _pop_pk(data, model)) for index, data in chunk], errors
+                )
+                existing = self.get_queryset().in_bulk(list(keys.values()))
+                items = []
+
+                for index, data in chunk:
+                    if index not in keys:
+                        continue
+
+                    instance = existing.get(keys[index])
+                    if instance is None:
+                        errors.add(index, 'Not found', 'not_found')
+                    elif self.build_instance(
+                        data, index, errors, instance, partial=True
+                    ):
+                        items.append((index, instance, sorted(data)))
+
+                if errors or not items:
+                    continue
+
+                changed = sorted({name for _, _, fields in items for name in fields})
+                try:
+                    with transaction.atomic(using=self.using()):
+                        model._default_manager.bulk_update(
+                            [instance for _, instance, _ in items],
+                            fields=changed,
+                            batch_size=self.get_chunk_size(),
+                        )
+                except IntegrityError:
+                    self._save_one_by_one(items, errors)
+                    continue
+
+                updated += len(items)
+
+            errors.raise_if_any()
+
+        return {'updated': updated}
+
+    def delete(self, request):
+        reader = self.get_array_reader(request)
+        label = self.get_model()._meta.label
+        errors = BulkErrors()
+        deleted = 0
+
+        with transaction.atomic(using=self.using()):
+            for chunk in _chunks(_iter_items(reader), self.get_chunk_size()):
+                keys = self.get_keys(chunk, errors)
+                if errors:
+                    continue
+
+                queryset = self.get_queryset().filter(pk__in=keys.values())
+                _, per_model = queryset.delete()
+                deleted += per_model.get(label, 0)
+
+            errors.raise_if_any()
+
+        return {'deleted': deleted}
+
+    def _save_one_by_one(self, items: list[tuple], errors: BulkErrors):
+        """Report the items of a chunk that violate a constraint.
+
+        The whole request is rolled back once an error is reported, the saved
+        items are not kept.
+        """
+        for index, instance, update_fields in items:
+            self.save_instance(instance, index, errors, update_fields)
+
+        if not errors:
+            # Only the rows of the chunk together violate the constraint.
+            errors.add(None, CONSTRAINT_ERROR, 'integrity_error')
+
+    def get_array_reader(self, request) -> JsonStreamReader:
+        reader = self.get_body_reader(request)
+        if not reader.is_array:
+            raise ValidationError(
+                'Invalid input',
+                errors=[
+                    {'loc': ['body'], 'msg': 'Expected an array', 'type': 'list_type'}
+                ],
+            )
+        return reader
+
+
+class ModelDetailEndpoint(ModelEndpointMixin, Endpoint):
+    """Retrieves, updates and deletes a single record of a model.
+
+    The record is looked up with the `pk` URL parameter.
+    """
+
+    def get(self, request, pk):
+        data = self.get_queryset().filter(pk=pk).values(*self.get_fields()).first()
+        if data is None:
+            raise Http404()
+        return data
+
+    def put(self, request, pk):
+        return self._update(request, pk, partial=False)
+
+    def patch(self, request, pk):
+        return self._update(request, pk, partial=True)
+
+    def delete(self, request, pk):
+        deleted, _ = self.get_queryset().filter(pk=pk).delete()
+        if not deleted:
+            raise Http404()
+        return HttpResponse(status=204)
+
+    def _update(self, request, pk, partial: bool):
+        instance = self.get_queryset().filter(pk=pk).first()
+        if instance is None:
+            raise Http404()
+
+        data = _read_value(self.get_body_reader(request))
+        errors = BulkErrors()
+        self.build_instance(data, None, errors, instance, partial=partial)
+        errors.raise_if_any()
+
+        self.save_instance(
+            instance, None, errors, update_fields=list(data) if partial else None
+        )
+        errors.raise_if_any()
+        return self.values(instance)
+
+
+def _iter_items(reader: JsonStreamReader) -> Iterator[tuple[int, object]]:
+    try:
+        yield from enumerate(reader)
+    except ValueError as e:
+        raise _invalid_json(e) from None
+
+
+def _read_value(reader: JsonStreamReader):
+    try:
+        return reader.read_value()
+    except ValueError as e:
+        raise _invalid_json(e) from None
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _pop_pk(data, model: type[Model]) -> object | None:
+    if not isinstance(data, dict):
+        return None
+
+    pk = model._meta.pk
+    for key in ('pk', pk.name, pk.attname):
+        if key in data:
+            return data.pop(key)
+    return None
+
+
+def _invalid_json(error: ValueError) -> ValidationError:
+    return ValidationError(
+        'Invalid input',
+        errors=[{'loc': ['body'], 'msg': f'{error}', 'type': 'json_invalid'}],
+    )
+
+
+def _json_response(data, status: int) -> HttpResponse:
+    return HttpResponse(
+        content=JsonSerializer.encode(data),
+        content_type='application/json',
+        status=status,
+    )
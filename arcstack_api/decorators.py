@@ -1,18 +1,35 @@
 from collections.abc import Callable
 
-from .api import arcstack_api
-from .conf import settings
+from .api import get_api
 
 
 class api_endpoint:
+    """Turn a function into an API endpoint.
+
+    Any keyword argument other than `login_required` and `group` is an endpoint
+    option. It is set as an upper case attribute of the function, the same way
+    `Endpoint` subclasses declare them as class attributes
+    (e.g. `cache_ttl=60` is `CACHE_TTL = 60`).
+
+    `group` is the name of the API group serving the endpoint, see
+    `API_GROUPS`. Without `login_required`, the endpoint follows the
+    `DEFAULT_LOGIN_REQUIRED` of its group, resolved when its plan is compiled.
+    """
+
     def __init__(
         self,
-        login_required: bool = settings.API_DEFAULT_LOGIN_REQUIRED,
+        login_required: bool | None = None,
         *args,
-        **kwargs,
+        group: str | None = None,
+        **options,
     ):
         self.login_required = login_required
+        self.group = group
+        self.options = {name.upper(): value for name, value in options.items()}
 
     def __call__(self, endpoint: Callable):
-        endpoint.LOGIN_REQUIRED = self.login_required
-        return arcstack_api._create_wrapper(endpoint)
+        if self.login_required is not None:
+            endpoint.LOGIN_REQUIRED = self.login_required
+        for name, value in self.options.items():
+            setattr(endpoint, name, value)
+        return get_api(self.group)._create_wrapper(endpoint)
@@ -1,10 +1,13 @@
 from django.utils.decorators import classonlymethod
 from django.views import View
 
-from .api import arcstack_api
+from .api import get_api
 
 
 class Endpoint(View):
+    # The name of the API group serving the endpoint, see `API_GROUPS`.
+    API_GROUP: str | None = None
+
     @classonlymethod
     def as_endpoint(cls, **initkwargs):
-        return arcstack_api(cls.as_view(**initkwargs))
+        return get_api(cls.API_GROUP)(cls.as_view(**initkwargs))
@@ -29,10 +29,27 @@ class InternalServerError(Exception):
 class ValidationError(Exception):
     """Validation errors occurs when processing the input data such as query
     parameters, path parameters, headers, cookies, request body, etc.
+
+    Returned as a 422 response. `errors` is a list of the invalid inputs, each
+    with the `loc`, `msg` and `type` keys.
     """
 
-    def __init__(self, message: str):
+    def __init__(self, message: str, errors: list[dict] | None = None):
         super().__init__(message)
+        self.message = message
+        self.errors = errors or []
+        self.status_code = 422
+
+
+class PayloadTooLargeError(Exception):
+    """Raised when the request body is larger than the endpoint accepts.
+
+    Returned as a 413 response.
+    """
+
+    def __init__(self):
+        super().__init__('Payload too large')
+        self.status_code = 413
 
 
 class UnauthorizedError(Exception):
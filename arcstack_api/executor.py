@@ -0,0 +1,96 @@
+from asgiref.sync import markcoroutinefunction
+
+from .mixins import MiddlewareMixin
+from .utils import get_middleware_hook
+
+
+def is_flattenable_middleware(middleware) -> bool:
+    """Check if the middleware class can be run by `FlatMiddlewareExecutor`.
+
+    Only `MiddlewareMixin` subclasses that do not override `__call__` or
+    `__acall__` are flattenable since their behavior is defined entirely by
+    their hooks.
+    """
+    return (
+        isinstance(middleware, type)
+        and issubclass(middleware, MiddlewareMixin)
+        and middleware.__call__ is MiddlewareMixin.__call__
+        and middleware.__acall__ is MiddlewareMixin.__acall__
+    )
+
+
+class FlatMiddlewareExecutor:
+    """Runs the hooks of consecutive `MiddlewareMixin` middleware in one loop.
+
+    The hooks are collected once when the middleware are loaded. The result is
+    the same as the nested chain: the `process_request` hooks are called from
+    the outermost middleware to the innermost, the first one that returns a
+    response short-circuits the chain and only the `process_response` hooks of
+    the middleware it has passed through are called, from the innermost to the
+    outermost.
+    """
+
+    def __init__(self, middleware: list, get_response, is_async: bool = False):
+        self.middleware = tuple(middleware)
+        self.get_response = get_response
+        self.async_mode = is_async
+
+        self._request_hooks = tuple(
+            (index, hook)
+            for index, mw in enumerate(self.middleware)
+            if (hook := get_middleware_hook(mw, 'process_request', is_async))
+            is not None
+        )
+
+        response_hooks = [
+            get_middleware_hook(mw, 'process_response', is_async)
+            for mw in self.middleware
+        ]
+        # The `process_response` hooks to call, indexed by how many middleware
+        # the request passed through.
+        self._response_hooks = tuple(
+            tuple(hook for hook in reversed(response_hooks[:depth]) if hook)
+            for depth in range(len(self.middleware) + 1)
+        )
+
+        if is_async:
+            markcoroutinefunction(self)
+
+    def __repr__(self):
+        names = ', '.join(mw.__class__.__qualname__ for mw in self.middleware)
+        return f'<{self.__class__.__qualname__} middleware=[{names}]>'
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        response_hooks = self._response_hooks[-1]
+
+        for index, process_request in self._request_hooks:
+            response = process_request(request)
+            if response:
+                response_hooks = self._response_hooks[index + 1]
+                break
+        else:
+            response = self.get_response(request)
+
+        for process_response in response_hooks:
+            response = process_response(request, response)
+
+        return response
+
+    async def __acall__(self, request):
+        response_hooks = self._response_hooks[-1]
+
+        for index, process_request in self._request_hooks:
+            response = await process_request(request)
+            if response:
+                response_hooks = self._response_hooks[index + 1]
+                break
+        else:
+            response = await self.get_response(request)
+
+        for process_response in response_hooks:
+            response = await process_response(request, response)
+
+        return response
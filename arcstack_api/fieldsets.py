@@ -0,0 +1,80 @@
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from django.db.models import QuerySet
+
+from .conf import settings
+from .errors import ValidationError
+
+
+def compile_fieldset(fields: Iterable[str]) -> frozenset[str]:
+    """Build the whitelist of the `FIELDS` option of an endpoint."""
+    if isinstance(fields, str):
+        fields = (fields,)
+    return frozenset(fields)
+
+
+def parse_fields(request, whitelist: frozenset[str]) -> tuple[str, ...] | None:
+    """Return the fields requested with `?fields=`, or `None` for all fields.
+
+    :raises ValidationError: If a requested field is not in the whitelist.
+    """
+    value = request.GET.get(settings.API_FIELDS_QUERY_PARAM)
+    if not value:
+        return None
+
+    # `dict.fromkeys` drops the duplicates and keeps the order.
+    names = (name.strip() for name in value.split(','))
+    fields = tuple(dict.fromkeys(name for name in names if name))
+    if not fields:
+        # Only blank names, e.g. `?fields=,`.
+        return None
+    unknown = [name for name in fields if name not in whitelist]
+
+    if unknown:
+        raise ValidationError(
+            'Invalid input',
+            errors=[
+                {
+                    'loc': ['query', settings.API_FIELDS_QUERY_PARAM],
+                    'msg': f'Unknown fields: {", ".join(unknown)}',
+                    'type': 'fields_invalid',
+                }
+            ],
+        )
+
+    return fields
+
+
+def get_requested_fields(request) -> tuple[str, ...] | None:
+    """Return the fields selected by the request of an endpoint with `FIELDS`.
+
+    Endpoints can use it to select the fields themselves, e.g. with `.only()`.
+    """
+    return getattr(request, '_arcstack_fields', None)
+
+
+def project_queryset(
+    queryset: QuerySet, fields: tuple[str, ...], extra: Iterable[str] = ()
+) -> QuerySet:
+    """Fetch only the selected columns, plus the `extra` ones if needed."""
+    return queryset.values(*fields, *(name for name in extra if name not in fields))
+
+
+def select_fields(data: Any, fields: tuple[str, ...]) -> Any:
+    """Keep only the selected fields of a dict or of the dicts of a list."""
+    if isinstance(data, dict):
+        return {name: data[name] for name in fields if name in data}
+    if isinstance(data, list | tuple):
+        return [select_fields(item, fields) for item in data]
+    return data
+
+
+def iter_select_fields(iterator: Iterator, fields: tuple[str, ...]) -> Iterator:
+    for item in iterator:
+        yield select_fields(item, fields)
+
+
+async def aiter_select_fields(iterator, fields: tuple[str, ...]):
+    async for item in iterator:
+        yield select_fields(item, fields)
@@ -0,0 +1,144 @@
+from collections.abc import Callable
+
+from django.http import Http404, HttpRequest, HttpResponse
+
+from .errors import (
+    APIError,
+    InternalServerError,
+    PayloadTooLargeError,
+    UnauthorizedError,
+    ValidationError,
+)
+from .responses import (
+    InternalServerErrorResponse,
+    NotFoundResponse,
+    PayloadTooLargeResponse,
+    UnauthorizedResponse,
+)
+from .serializers import JsonSerializer
+
+
+ExceptionHandler = Callable[[Exception, HttpRequest], HttpResponse | None]
+
+
+class ExceptionHandlerRegistry:
+    """Maps exception types to the handlers that turn them into responses.
+
+    The handler of an exception is the one registered for the closest class in
+    its MRO. It is resolved once per concrete exception type and cached, so
+    handling an exception costs a single dict lookup.
+
+    A handler is called with the exception and the request, and returns a
+    response or `None` to let the other middleware handle the exception.
+    """
+
+    def __init__(self):
+        self._handlers: dict[type[Exception], ExceptionHandler] = {}
+        self._resolved: dict[type[Exception], ExceptionHandler | None] = {}
+
+    def register(self, exception_type: type[Exception], handler=None):
+        """Register a handler. Can also be used as a decorator."""
+        if handler is None:
+
+            def decorator(handler):
+                self.register(exception_type, handler)
+                return handler
+
+            return decorator
+
+        self._handlers[exception_type] = handler
+        self._resolved = {}
+        return handler
+
+    def unregister(self, exception_type: type[Exception]):
+        self._handlers.pop(exception_type, None)
+        self._resolved = {}
+
+    def get_handler(self, exception_type: type[Exception]) -> ExceptionHandler | None:
+        try:
+            return self._resolved[exception_type]
+        except KeyError:
+            pass
+
+        handler = next(
+            (
+                self._handlers[cls]
+                for cls in exception_type.__mro__
+                if cls in self._handlers
+            ),
+            None,
+        )
+        self._resolved[exception_type] = handler
+        return handler
+
+    def handle(self, exception: Exception, request: HttpRequest) -> HttpResponse | None:
+        handler = self.get_handler(type(exception))
+        if handler is None:
+            return None
+        return handler(exception, request)
+
+
+exception_handlers = ExceptionHandlerRegistry()
+
+
+def exception_handler(exception_type: type[Exception]):
+    """Register the decorated function as the handler of the exception type.
+
+    ```py
+    @exception_handler(PermissionDenied)
+    def permission_denied(exception, request):
+        return HttpResponse(status=403)
+    ```
+    """
+    return exception_handlers.register(exception_type)
+
+
+def error_response(detail, status: int) -> HttpResponse:
+    """Render the error envelope of the API, `{"detail": ...}`."""
+    return HttpResponse(
+        content=JsonSerializer.encode({'detail': detail}),
+        content_type='application/json',
+        status=status,
+    )
+
+
+@exception_handler(APIError)
+def handle_api_error(exception: APIError, request) -> HttpResponse:
+    # A message is wrapped in the error envelope, a `list` or a `dict` is the
+    # body of the response as is.
+    message = exception.message
+    if isinstance(message, str | int | float | bool):
+        return error_response(message, status=exception.status_code)
+
+    return HttpResponse(
+        content=JsonSerializer.encode(message),
+        content_type='application/json',
+        status=exception.status_code,
+    )
+
+
+@exception_handler(ValidationError)
+def handle_validation_error(exception: ValidationError, request) -> HttpResponse:
+    return error_response(
+        exception.errors or exception.message, status=exception.status_code
+    )
+
+
+@exception_handler(UnauthorizedError)
+def handle_unauthorized(exception, request) -> HttpResponse:
+    return UnauthorizedResponse()
+
+
+@exception_handler(PayloadTooLargeError)
+def handle_payload_too_large(exception, request) -> HttpResponse:
+    return PayloadTooLargeResponse()
+
+
+@exception_handler(InternalServerError)
+def handle_internal_server_error(exception, request) -> HttpResponse:
+    return InternalServerErrorResponse()
+
+
+@exception_handler(Http404)
+def handle_not_found(exception, request) -> HttpResponse:
+    return NotFoundResponse()
@@ -0,0 +1,275 @@
+import bisect
+import socket
+import threading
+from collections.abc import Callable
+from time import perf_counter_ns
+
+from asgiref.sync import markcoroutinefunction
+from django.utils.module_loading import import_string
+
+from .conf import settings
+from .logger import logger
+from .utils import get_endpoint_name
+
+
+class RequestTimer:
+    """Collects the timings of a single request.
+
+    `layers` are the inclusive durations of the nested middleware layers in the
+    order they finish (innermost first), with the duration of the phases
+    measured until then. `phases` are the durations of the other measured
+    phases like `serialize` and `exception`.
+    """
+
+    # The phases that overlap the others, e.g. the queries run while
+    # serializing. They are not subtracted from the layers.
+    OVERLAPPING = frozenset({'db'})
+
+    __slots__ = ('layers', 'phases', 'phases_total')
+
+    def __init__(self):
+        self.layers: list[tuple[str, int, int]] = []
+        self.phases: dict[str, int] = {}
+        self.phases_total = 0
+
+    def add(self, phase: str, duration_ns: int):
+        self.phases[phase] = self.phases.get(phase, 0) + duration_ns
+        if phase not in self.OVERLAPPING:
+            self.phases_total += duration_ns
+
+    def collect(self) -> dict[str, int]:
+        """Return the exclusive duration of every layer and phase in ns.
+
+        The phases measured inside a layer are subtracted from the layer.
+        """
+        durations = {}
+        inner = inner_phases = 0
+
+        for name, inclusive, phases in self.layers:
+            exclusive = inclusive - inner - (phases - inner_phases)
+            durations[name] = durations.get(name, 0) + exclusive
+            inner, inner_phases = inclusive, phases
+
+        for phase, duration in self.phases.items():
+            durations[phase] = durations.get(phase, 0) + duration
+
+        return durations
+
+
+def start_phase(request) -> int:
+    """Return the start time of a phase if the request is being timed, else 0.
+
+    Usage in middleware:
+
+        start = start_phase(request)
+        ...
+        end_phase(request, 'my_phase', start)
+    """
+    return perf_counter_ns() if hasattr(request, '_arcstack_timer') else 0
+
+
+def end_phase(request, phase: str, start: int):
+    if start:
+        request._arcstack_timer.add(phase, perf_counter_ns() - start)
+
+
+class TimedLayer:
+    """Measures the inclusive duration of a layer of the middleware chain."""
+
+    def __init__(self, name: str, handler: Callable, is_async: bool = False):
+        self.name = name
+        self.handler = handler
+        self.async_mode = is_async
+        if is_async:
+            markcoroutinefunction(self)
+
+    def __repr__(self):
+        return f'<{self.__class__.__qualname__} name={self.name}>'
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        start = perf_counter_ns()
+        try:
+            return self.handler(request)
+        finally:
+            self._record(request, start)
+
+    async def __acall__(self, request):
+        start = perf_counter_ns()
+        try:
+            return await self.handler(request)
+        finally:
+            self._record(request, start)
+
+    def _record(self, request, start: int):
+        timer = getattr(request, '_arcstack_timer', None)
+        if timer is not None:
+            timer.layers.append(
+                (self.name, perf_counter_ns() - start, timer.phases_total)
+            )
+
+
+class Instrumentation:
+    """Times the requests of an `ArcStackAPI` and reports them to the sinks.
+
+    Only created when `API_TIMING` is enabled. Otherwise the middleware chain
+    is built without any `TimedLayer` and the requests are not timed at all.
+    """
+
+    def __init__(self):
+        self.header = settings.API_TIMING_HEADER
+        self.sinks = [import_string(path)() for path in settings.API_TIMING_SINKS]
+        self._names: dict[Callable, str] = {}
+
+    def run(self, api, request, plan):
+        timer = request._arcstack_timer = RequestTimer()
+        start = perf_counter_ns()
+
+        try:
+            response = api._middleware_chain(request)
+        except Exception as e:
+            exception_start = perf_counter_ns()
+            response = api._process_exception(e, request)
+            timer.add('exception', perf_counter_ns() - exception_start)
+
+        return self._finish(request, plan, timer, response, start)
+
+    async def arun(self, api, request, plan):
+        timer = request._arcstack_timer = RequestTimer()
+        start = perf_counter_ns()
+
+        try:
+            response = await api._async_middleware_chain(request)
+        except Exception as e:
+            exception_start = perf_counter_ns()
+            response = await api._process_exception_async(e, request)
+            timer.add('exception', perf_counter_ns() - exception_start)
+
+        return self._finish(request, plan, timer, response, start)
+
+    def _finish(self, request, plan, timer: RequestTimer, response, start: int):
+        total = perf_counter_ns() - start
+        del request._arcstack_timer
+
+        durations = timer.collect()
+
+        if self.header and hasattr(response, 'headers'):
+            response.headers['Server-Timing'] = ', '.join(
+                f'{name};dur={duration / 1_000_000:.3f}'
+                for name, duration in (*durations.items(), ('total', total))
+            )
+
+        if self.sinks:
+            name = self._names.get(plan.endpoint)
+            if name is None:
+                name = self._names[plan.endpoint] = get_endpoint_name(plan.endpoint)
+
+            for sink in self.sinks:
+                try:
+                    sink.record(name, durations, total)
+                except Exception as e:
+                    logger.warning(f'Timing sink {sink!r} failed: {e}')
+
+        return response
+
+
+class Histogram:
+    """A fixed bucket histogram of durations in milliseconds."""
+
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'buckets': dict(zip((*self.BUCKETS, 'inf'), self.counts, strict=True)),
+        }
+
+
+class InMemorySink:
+    """Aggregates the timings into per-endpoint, per-phase histograms."""
+
+    def __init__(self):
+        self.histograms: dict[str, dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, durations: dict[str, int], total: int):
+        with self._lock:
+            histograms = self.histograms.setdefault(endpoint, {})
+            for phase, duration in (*durations.items(), ('total', total)):
+                histogram = histograms.get(phase)
+                if histogram is None:
+                    histogram = histograms[phase] = Histogram()
+                histogram.add(duration / 1_000_000)
+
+    def snapshot(self) -> dict[str, dict[str, dict]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    phase: histogram.snapshot()
+                    for phase, histogram in histograms.items()
+                }
+                for endpoint, histograms in self.histograms.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+
+class StatsdSink:
+    """Sends the timings to a statsd server over UDP.
+
+    Every request is sent as a single datagram of `ms` timers named
+    `<prefix>.<endpoint>.<phase>`. Send errors are ignored.
+    """
+
+    def __init__(self):
+        config = settings.API_TIMING_STATSD
+        self.address = (config.get('HOST', 'localhost'), config.get('PORT', 8125))
+        self.prefix = config.get('PREFIX', 'arcstack_api')
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def record(self, endpoint: str, durations: dict[str, int], total: int):
+        prefix = f'{self.prefix}.{endpoint}'
+        payload = '\n'.join(
+            f'{prefix}.{phase}:{duration / 1_000_000:.3f}|ms'
+            for phase, duration in (*durations.items(), ('total', total))
+        )
+
+        try:
+            self.socket.sendto(payload.encode(), self.address)
+        except OSError:
+            pass
+
+
+class LoggingSink:
+    """Logs the timings of every request at the `INFO` level."""
+
+    def record(self, endpoint: str, durations: dict[str, int], total: int):
+        phases = ' '.join(
+            f'{phase}={duration / 1_000_000:.3f}ms'
+            for phase, duration in durations.items()
+        )
+        logger.info(f'{endpoint} total={total / 1_000_000:.3f}ms {phases}')
@@ -0,0 +1,28 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from ...warmup import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the API middleware load and that the plans of the endpoints '
+        'of the URLconf compile. Runs in its own process, so it does not warm up '
+        'the server workers, use the API_WARMUP setting for that.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--urlconf',
+            help='The URLconf module to walk. ROOT_URLCONF by default.',
+        )
+
+    def handle(self, *args, urlconf=None, **options):
+        start = perf_counter()
+        plans = warmup(urlconf)
+        duration = (perf_counter() - start) * 1000
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Compiled {len(plans)} endpoints in {duration:.1f} ms.')
+        )
@@ -1,22 +1,27 @@
 from collections.abc import Callable
 
+from .plan import EndpointPlan
 from .signature import EndpointSignature
 
 
 class ArcStackRequestMeta:
-    endpoint: Callable
-    args: tuple
-    kwargs: dict
-    _signature: EndpointSignature = None
+    """Per request state of an endpoint call.
 
-    def __init__(self, endpoint: Callable, args: tuple, kwargs: dict):
-        self.endpoint = endpoint
+    Only the path `args` and `kwargs` are request specific, everything else is
+    read from the precompiled `EndpointPlan`.
+    """
+
+    __slots__ = ('plan', 'args', 'kwargs')
+
+    def __init__(self, plan: EndpointPlan, args: tuple, kwargs: dict):
+        self.plan = plan
         self.args = args
         self.kwargs = kwargs
 
+    @property
+    def endpoint(self) -> Callable:
+        return self.plan.endpoint
+
     @property
     def signature(self) -> EndpointSignature:
-        """Lazy signature creation."""
-        if self._signature is None:
-            self._signature = EndpointSignature(self.endpoint)
-        return self._signature
+        return self.plan.signature
@@ -0,0 +1,20 @@
+from .authentication import AuthorizationMiddleware
+from .cache import CacheMiddleware
+from .coalesce import CoalesceMiddleware
+from .common import CommonMiddleware
+from .compression import CompressionMiddleware
+from .concurrency import ConcurrencyLimitMiddleware
+from .queries import QueryCountMiddleware
+from .ratelimit import RateLimitMiddleware
+
+
+__all__ = [
+    'AuthorizationMiddleware',
+    'CacheMiddleware',
+    'CoalesceMiddleware',
+    'CommonMiddleware',
+    'CompressionMiddleware',
+    'ConcurrencyLimitMiddleware',
+    'QueryCountMiddleware',
+    'RateLimitMiddleware',
+]
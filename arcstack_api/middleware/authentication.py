@@ -0,0 +1,83 @@
+from asgiref.sync import sync_to_async
+
+from ..authentication import get_credential_cache, get_verifiers, parse_authorization
+from ..errors import UnauthorizedError
+from ..mixins import MiddlewareMixin
+
+
+class AuthorizationMiddleware(MiddlewareMixin):
+    """Authenticates the requests with the `Authorization` header.
+
+    Supports the `Basic` and `Bearer` schemes of `API_AUTH_SCHEMES`. The user
+    of valid credentials becomes `request.user`, and invalid credentials get
+    a `401` response. Requests without credentials keep the user of the
+    session.
+
+    Must be placed before `CommonMiddleware` so `LOGIN_REQUIRED` is checked
+    with the authenticated user. The users of the verified credentials are
+    cached, see `CredentialCache`.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.verifiers = get_verifiers()
+
+    def process_request(self, request):
+        credentials = self._get_credentials(request)
+        if credentials is None:
+            return None
+
+        scheme, value = credentials
+        cache = get_credential_cache()
+        user = cache.get(scheme, value)
+
+        if user is None:
+            user = self._check_user(self.verifiers[scheme](request, value))
+            cache.set(scheme, value, user)
+
+        self._set_user(request, user)
+        return None
+
+    async def aprocess_request(self, request):
+        credentials = self._get_credentials(request)
+        if credentials is None:
+            return None
+
+        scheme, value = credentials
+        cache = get_credential_cache()
+        user = cache.get(scheme, value)
+
+        if user is None:
+            verifier = sync_to_async(self.verifiers[scheme], thread_sensitive=True)
+            user = self._check_user(await verifier(request, value))
+            cache.set(scheme, value, user)
+
+        self._set_user(request, user)
+        return None
+
+    def _get_credentials(self, request) -> tuple[str, str] | None:
+        if getattr(request, '_arcstack_meta', None) is None:
+            # Not a valid request as an API endpoint
+            return None
+
+        header = request.META.get('HTTP_AUTHORIZATION')
+        if not header:
+            return None
+
+        credentials = parse_authorization(header)
+        if credentials is None or credentials[0] not in self.verifiers:
+            return None
+
+        return credentials
+
+    def _check_user(self, user):
+        if user is None or not getattr(user, 'is_active', True):
+            raise UnauthorizedError()
+        return user
+
+    def _set_user(self, request, user):
+        async def auser():
+            return user
+
+        request.user = user
+        request.auser = auser
@@ -0,0 +1,147 @@
+import hashlib
+from typing import NamedTuple
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from ..cache import CachedResponse, get_request_key, get_response_cache
+from ..conf import settings
+from ..mixins import MiddlewareMixin
+from ..plan import EndpointPlan
+from ..utils import aget_user, get_endpoint_name
+
+
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+class CachePolicy(NamedTuple):
+    name: str
+    ttl: int
+    vary: tuple[str, ...]
+    per_user: bool
+
+
+class CacheMiddleware(MiddlewareMixin):
+    """Caches the rendered responses of the endpoints that declare `CACHE_TTL`.
+
+    Must be placed before `CommonMiddleware` so the cached response is the one
+    rendered by it. A cached response is returned from `process_endpoint`, so
+    the endpoint is not called at all. Every response gets an `ETag` and
+    requests with a matching `If-None-Match` header get a `304` response.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.policies: dict = {}
+
+    def applies_to_endpoint(self, plan: EndpointPlan) -> bool:
+        ttl = plan.options.get('CACHE_TTL')
+        if not ttl:
+            return False
+
+        self.policies[plan.endpoint] = CachePolicy(
+            name=get_endpoint_name(plan.endpoint),
+            ttl=ttl,
+            vary=tuple(plan.options.get('CACHE_VARY', settings.API_CACHE_VARY_HEADERS)),
+            per_user=plan.options.get('CACHE_PER_USER', plan.login_required),
+        )
+        return True
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None or request.method not in CACHEABLE_METHODS:
+            return None
+
+        user_pk = request.user.pk if policy.per_user else None
+        key = self._get_cache_key(request, policy, args, kwargs, user_pk)
+        entry = get_response_cache().get(key)
+
+        return self._process_cached(request, policy, key, entry)
+
+    async def aprocess_endpoint(self, request, endpoint, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None or request.method not in CACHEABLE_METHODS:
+            return None
+
+        user_pk = (await aget_user(request)).pk if policy.per_user else None
+        key = self._get_cache_key(request, policy, args, kwargs, user_pk)
+        entry = await get_response_cache().aget(key)
+
+        return self._process_cached(request, policy, key, entry)
+
+    def process_response(self, request, response):
+        pending = self._pop_pending(request, response)
+        if pending is None:
+            return response
+
+        policy, key, entry = pending
+        get_response_cache().set(key, entry, policy.ttl)
+
+        return self._conditional_response(request, entry.etag, response)
+
+    async def aprocess_response(self, request, response):
+        pending = self._pop_pending(request, response)
+        if pending is None:
+            return response
+
+        policy, key, entry = pending
+        await get_response_cache().aset(key, entry, policy.ttl)
+
+        return self._conditional_response(request, entry.etag, response)
+
+    def _process_cached(self, request, policy, key, entry):
+        if entry is None:
+            # Cache the response once it is rendered.
+            request._arcstack_cache = (policy, key)
+            return None
+
+        return self._conditional_response(request, entry.etag, entry.to_response())
+
+    def _pop_pending(self, request, response):
+        pending = getattr(request, '_arcstack_cache', None)
+        if pending is None:
+            return None
+        del request._arcstack_cache
+
+        if not self._is_cacheable(response):
+            return None
+
+        policy, key = pending
+        etag = quote_etag(hashlib.blake2b(response.content, digest_size=16).hexdigest())
+        response['ETag'] = etag
+        # The caches downstream must not mix the responses of different keys.
+        patch_vary_headers(response, self._get_vary(policy))
+
+        return policy, key, CachedResponse.from_response(response, etag)
+
+    def _is_cacheable(self, response) -> bool:
+        return (
+            isinstance(response, HttpResponse)
+            and response.status_code == 200
+            and not response.cookies
+            and 'no-store' not in response.get('Cache-Control', '')
+            and 'private' not in response.get('Cache-Control', '')
+        )
+
+    def _get_vary(self, policy: CachePolicy) -> tuple[str, ...]:
+        if policy.per_user:
+            # The headers identifying the user.
+            return (*policy.vary, 'Authorization', 'Cookie')
+        return policy.vary
+
+    def _conditional_response(self, request, etag, response):
+        return get_conditional_response(request, etag=etag, response=response)
+
+    def _get_cache_key(
+        self,
+        request: HttpRequest,
+        policy: CachePolicy,
+        args: tuple,
+        kwargs: dict,
+        user_pk,
+    ) -> str:
+        key = get_request_key(
+            request, policy.name, args, kwargs, policy.vary, policy.per_user, user_pk
+        )
+        return f'{settings.API_CACHE_KEY_PREFIX}{key}'
@@ -0,0 +1,254 @@
+from itertools import chain
+from time import perf_counter_ns
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+
+from ..cache import CachedResponse, get_request_key
+from ..coalesce import get_single_flight
+from ..conf import settings
+from ..mixins import MiddlewareMixin
+from ..plan import EndpointPlan
+from ..utils import aget_user, get_endpoint_name
+
+
+COALESCED_METHODS = ('GET', 'HEAD')
+
+
+class CoalescePolicy(NamedTuple):
+    name: str
+    vary: tuple[str, ...]
+    per_user: bool
+    timeout: float
+    max_stream_size: int
+
+
+class CoalesceMiddleware(MiddlewareMixin):
+    """Runs identical concurrent requests of the endpoints with `COALESCE` once.
+
+    The first `GET` request of a key runs the endpoint, the identical requests
+    arriving while it is in flight wait for its rendered response and get a
+    copy of it. The key is made of the endpoint, its URL args, the query
+    string, the `COALESCE_VARY` headers and the user. A streamed response is
+    read up to `COALESCE_MAX_STREAM_SIZE` bytes to be shared, the waiting
+    requests of a larger one run the endpoint themselves.
+
+    Must be placed before `CommonMiddleware` so the shared response is the one
+    rendered by it, and after the authentication middleware so the requests
+    are coalesced per user.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.policies: dict = {}
+
+    def applies_to_endpoint(self, plan: EndpointPlan) -> bool:
+        if not plan.options.get('COALESCE', settings.API_COALESCE):
+            return False
+
+        self.policies[plan.endpoint] = CoalescePolicy(
+            name=get_endpoint_name(plan.endpoint),
+            vary=tuple(
+                plan.options.get('COALESCE_VARY', settings.API_COALESCE_VARY_HEADERS)
+            ),
+            per_user=plan.options.get('COALESCE_PER_USER', True),
+            timeout=plan.options.get('COALESCE_TIMEOUT', settings.API_COALESCE_TIMEOUT),
+            max_stream_size=plan.options.get(
+                'COALESCE_MAX_STREAM_SIZE', settings.API_COALESCE_MAX_STREAM_SIZE
+            ),
+        )
+        return True
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        entry = None
+        try:
+            response = self.get_response(request)
+            policy = self._get_leader_policy(request, response)
+            if policy is not None:
+                entry = self._get_entry(response, policy)
+            return response
+        finally:
+            # The waiting requests run the endpoint themselves if it failed.
+            self._land(request, entry)
+
+    async def __acall__(self, request):
+        entry = None
+        try:
+            response = await self.get_response(request)
+            policy = self._get_leader_policy(request, response)
+            if policy is not None:
+                if response.streaming and not response.is_async:
+                    # Reading the stream can run queries.
+                    entry = await sync_to_async(self._get_entry)(response, policy)
+                else:
+                    entry = await self._aget_entry(response, policy)
+            return response
+        finally:
+            self._land(request, entry)
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None or request.method not in COALESCED_METHODS:
+            return None
+
+        user = getattr(request, 'user', None) if policy.per_user else None
+        flight = self._join(request, policy, args, kwargs, user)
+        if flight is None:
+            return None
+
+        start = perf_counter_ns()
+        entry = flight.wait(policy.timeout)
+        return self._shared_response(request, entry, start)
+
+    async def aprocess_endpoint(self, request, endpoint, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None or request.method not in COALESCED_METHODS:
+            return None
+
+        user = None
+        if policy.per_user and hasattr(request, 'user'):
+            user = await aget_user(request)
+        flight = self._join(request, policy, args, kwargs, user)
+        if flight is None:
+            return None
+
+        start = perf_counter_ns()
+        entry = await flight.await_response(policy.timeout)
+        return self._shared_response(request, entry, start)
+
+    def _join(self, request, policy: CoalescePolicy, args, kwargs, user):
+        """Return the flight to wait for, `None` if the request leads it."""
+        key = get_request_key(
+            request,
+            f'{policy.name}:{request.method}',
+            args,
+            kwargs,
+            policy.vary,
+            policy.per_user,
+            user.pk if user is not None else None,
+        )
+        flight, leader = get_single_flight().join(key)
+        if leader:
+            # The response is shared once it is rendered.
+            request._arcstack_flight = (key, flight, policy)
+            return None
+        return flight
+
+    def _shared_response(self, request, entry: CachedResponse | None, start: int):
+        timer = getattr(request, '_arcstack_timer', None)
+        if timer is not None:
+            timer.add('coalesce', perf_counter_ns() - start)
+
+        # Without a response to share, the request runs the endpoint itself.
+        return entry.to_response() if entry is not None else None
+
+    def _get_leader_policy(self, request, response) -> CoalescePolicy | None:
+        """Return the policy if the request leads a flight and can share it."""
+        flight = getattr(request, '_arcstack_flight', None)
+        if flight is None or not self._is_shareable(response):
+            return None
+        return flight[2]
+
+    def _get_entry(self, response, policy: CoalescePolicy) -> CachedResponse | None:
+        content = None
+        if response.streaming:
+            content = self._read_stream(response, policy.max_stream_size)
+            if content is None:
+                return None
+        return CachedResponse.from_response(response, response.get('ETag', ''), content)
+
+    async def _aget_entry(
+        self, response, policy: CoalescePolicy
+    ) -> CachedResponse | None:
+        content = None
+        if response.streaming:
+            content = await self._aread_stream(response, policy.max_stream_size)
+            if content is None:
+                return None
+        return CachedResponse.from_response(response, response.get('ETag', ''), content)
+
+    def _read_stream(self, response, max_size: int) -> bytes | None:
+        """Return the content of a stream of at most `max_size` bytes.
+
+        The chunks read are streamed again, followed by the rest of a larger
+        stream, so the response is unchanged.
+        """
+        chunks = iter(response.streaming_content)
+        read = []
+        size = 0
+        try:
+            for chunk in chunks:
+                read.append(chunk)
+                size += len(chunk)
+                if size > max_size:
+                    break
+            else:
+                response.streaming_content = read
+                return b''.join(read)
+        except Exception as e:
+            # The response fails where the stream failed.
+            chunks = _raise(e)
+
+        response.streaming_content = chain(read, chunks)
+        return None
+
+    async def _aread_stream(self, response, max_size: int) -> bytes | None:
+        """Async version of `_read_stream`."""
+        chunks = aiter(response.streaming_content)
+        read = []
+        size = 0
+        try:
+            async for chunk in chunks:
+                read.append(chunk)
+                size += len(chunk)
+                if size > max_size:
+                    break
+            else:
+                response.streaming_content = _aiter(read)
+                return b''.join(read)
+        except Exception as e:
+            chunks = _araise(e)
+
+        response.streaming_content = _aiter(read, chunks)
+        return None
+
+    def _land(self, request, entry: CachedResponse | None):
+        flight = getattr(request, '_arcstack_flight', None)
+        if flight is None:
+            return
+        del request._arcstack_flight
+
+        key, flight, _ = flight
+        get_single_flight().land(key, flight, entry)
+
+    def _is_shareable(self, response) -> bool:
+        # Cookies are never shared, they can be a session. A `304` only
+        # answers the conditional headers of its own request.
+        return (
+            isinstance(response, HttpResponse | StreamingHttpResponse)
+            and response.status_code < 500
+            and response.status_code != 304
+            and not response.cookies
+        )
+
+
+def _raise(error: Exception):
+    raise error
+    yield
+
+
+async def _araise(error: Exception):
+    raise error
+    yield
+
+
+async def _aiter(chunks: list[bytes], rest=None):
+    for chunk in chunks:
+        yield chunk
+    if rest is not None:
+        async for chunk in rest:
+            yield chunk
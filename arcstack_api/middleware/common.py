@@ -0,0 +1,301 @@
+from collections.abc import AsyncIterator, Iterator
+from itertools import chain
+
+from asgiref.sync import sync_to_async
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+
+from ..conf import settings
+from ..errors import UnauthorizedError
+from ..fieldsets import (
+    aiter_select_fields,
+    compile_fieldset,
+    iter_select_fields,
+    parse_fields,
+    project_queryset,
+    select_fields,
+)
+from ..handlers import exception_handlers
+from ..instrumentation import end_phase, start_phase
+from ..mixins import MiddlewareMixin
+from ..modelserializer import (
+    ModelSerializer,
+    freeze_spec,
+    get_model_serializer,
+    is_model_queryset,
+)
+from ..plan import EndpointPlan
+from ..serializers import JsonSerializer
+from ..utils import aget_user
+
+
+class CommonMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.paginators: dict = {}
+        self.fieldsets: dict = {}
+        self.model_fields: dict = {}
+
+    def applies_to_endpoint(self, plan: EndpointPlan) -> bool:
+        paginator = plan.options.get('PAGINATION')
+        if paginator is not None:
+            self.paginators[plan.endpoint] = paginator
+
+        fields = plan.options.get('FIELDS')
+        if fields is not None:
+            self.fieldsets[plan.endpoint] = compile_fieldset(fields)
+
+        model_fields = plan.options.get('MODEL_FIELDS')
+        if model_fields is not None:
+            self.model_fields[plan.endpoint] = freeze_spec(model_fields)
+
+        return paginator is not None or fields is not None or model_fields is not None
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        paginator = self.paginators.get(endpoint)
+        if paginator is not None:
+            # Returned QuerySets are paginated instead of streamed.
+            request._arcstack_paginator = paginator
+
+        whitelist = self.fieldsets.get(endpoint)
+        if whitelist is not None:
+            # Validated before the endpoint is called, so the endpoint can use
+            # the selected fields too.
+            fields = parse_fields(request, whitelist)
+            if fields is not None:
+                request._arcstack_fields = fields
+
+        model_fields = self.model_fields.get(endpoint)
+        if model_fields is not None:
+            request._arcstack_model_fields = model_fields
+
+    async def aprocess_endpoint(self, request, endpoint, *args, **kwargs):
+        self.process_endpoint(request, endpoint, *args, **kwargs)
+
+    def process_request(self, request):
+        meta = getattr(request, '_arcstack_meta', None)
+
+        if meta is None:
+            # Not a valid request as an API endpoint
+            return
+
+        self._check_login_required(request, meta.plan)
+
+        return None
+
+    async def aprocess_request(self, request):
+        meta = getattr(request, '_arcstack_meta', None)
+
+        if meta is None:
+            # Not a valid request as an API endpoint
+            return
+
+        await self._acheck_login_required(request, meta.plan)
+
+        return None
+
+    def process_response(self, request, response):
+        if isinstance(response, HttpResponseBase):
+            # noop: The response is already an HttpResponse
+            pass
+        elif (
+            isinstance(response, str)
+            or isinstance(response, int)
+            or isinstance(response, float)
+            or isinstance(response, bool)
+        ):
+            # Convert the response to a string and return it as an HttpResponse
+            response = HttpResponse(
+                content=f'{response}',
+                content_type='text/plain',
+            )
+        elif isinstance(response, QuerySet):
+            fields = getattr(request, '_arcstack_fields', None)
+            paginator = getattr(request, '_arcstack_paginator', None)
+            serializer = self._get_model_serializer(request, response, fields)
+
+            if paginator is not None:
+                queryset = self._project_page(response, paginator, fields, serializer)
+                page = paginator.paginate(request, queryset)
+                return self._render_page(request, page, fields, serializer)
+
+            if serializer is not None:
+                return self._stream(
+                    serializer.iterator(response, settings.API_STREAM_CHUNK_SIZE)
+                )
+
+            if fields is not None:
+                response = project_queryset(response, fields)
+
+            response = self._stream(
+                response.iterator(chunk_size=settings.API_STREAM_CHUNK_SIZE)
+            )
+        elif isinstance(response, Model):
+            fields = getattr(request, '_arcstack_fields', None)
+            serializer = self._get_model_serializer(request, response, fields)
+            response = self._render_json(request, serializer.serialize(response))
+        elif isinstance(response, Iterator):
+            fields = getattr(request, '_arcstack_fields', None)
+            if fields is not None:
+                response = iter_select_fields(response, fields)
+
+            response = self._stream(response)
+        else:
+            fields = getattr(request, '_arcstack_fields', None)
+            if fields is not None:
+                response = select_fields(response, fields)
+
+            response = self._render_json(request, response)
+
+        return response
+
+    async def aprocess_response(self, request, response):
+        if isinstance(response, QuerySet):
+            fields = getattr(request, '_arcstack_fields', None)
+            paginator = getattr(request, '_arcstack_paginator', None)
+            serializer = self._get_model_serializer(request, response, fields)
+
+            if paginator is not None:
+                queryset = self._project_page(response, paginator, fields, serializer)
+                page = await paginator.apaginate(request, queryset)
+                return self._render_page(request, page, fields, serializer)
+
+            if serializer is not None:
+                return await self._astream(
+                    serializer.aiterator(response, settings.API_STREAM_CHUNK_SIZE)
+                )
+
+            if fields is not None:
+                response = project_queryset(response, fields)
+
+            return await self._astream(
+                response.aiterator(chunk_size=settings.API_STREAM_CHUNK_SIZE)
+            )
+        elif isinstance(response, AsyncIterator):
+            fields = getattr(request, '_arcstack_fields', None)
+            if fields is not None:
+                response = aiter_select_fields(response, fields)
+
+            return await self._astream(response)
+        elif isinstance(response, Model):
+            fields = getattr(request, '_arcstack_fields', None)
+            serializer = self._get_model_serializer(request, response, fields)
+            # The related objects and the properties can run queries.
+            data = await sync_to_async(serializer.serialize)(response)
+            return self._render_json(request, data)
+
+        # Building the other responses does not do any I/O.
+        return self.process_response(request, response)
+
+    def _render_json(self, request, data) -> HttpResponse:
+        start = start_phase(request)
+        try:
+            content = JsonSerializer.encode(data)
+        except TypeError:
+            raise ValueError(f'Unsupported response type: {type(data)}') from None
+        end_phase(request, 'serialize', start)
+
+        return HttpResponse(
+            content=content,
+            content_type='application/json',
+        )
+
+    def _get_model_serializer(
+        self, request, response: Model | QuerySet, fields
+    ) -> ModelSerializer | None:
+        """Return the serializer of the model instances, `None` for `values()`."""
+        if isinstance(response, QuerySet) and not is_model_queryset(response):
+            return None
+
+        model = response.model if isinstance(response, QuerySet) else type(response)
+        serializer = get_model_serializer(
+            model, getattr(request, '_arcstack_model_fields', None)
+        )
+        return serializer.select(fields) if fields is not None else serializer
+
+    def _project_page(self, queryset, paginator, fields, serializer):
+        # The ordering fields are needed for the cursors of the page.
+        if serializer is not None:
+            ordering = [field.attname for field in paginator.get_fields(queryset.model)]
+            return serializer.optimize(queryset, extra=ordering)
+
+        if fields is None:
+            return queryset
+
+        ordering = [field.name for field in paginator.get_fields(queryset.model)]
+        return project_queryset(queryset, fields, extra=ordering)
+
+    def _render_page(self, request, page: dict, fields, serializer) -> HttpResponse:
+        if serializer is not None:
+            page['results'] = serializer.serialize_many(page['results'])
+        elif fields is not None:
+            page['results'] = select_fields(page['results'], fields)
+        return self._render_json(request, page)
+
+    def _stream(self, iterator: Iterator) -> StreamingHttpResponse:
+        """Stream the items of the iterator as a JSON array."""
+        chunks = JsonSerializer.iter_encode(iterator, settings.API_STREAM_CHUNK_SIZE)
+
+        try:
+            # Encode the first chunk now so an unsupported item is reported
+            # before the response is started.
+            first_chunk = next(chunks)
+        except TypeError as e:
+            raise ValueError(f'Unsupported streamed item: {e}') from None
+
+        return StreamingHttpResponse(
+            chain((first_chunk,), chunks),
+            content_type='application/json',
+        )
+
+    async def _astream(self, iterator: AsyncIterator) -> StreamingHttpResponse:
+        """Async version of `_stream`."""
+        chunks = JsonSerializer.aiter_encode(iterator, settings.API_STREAM_CHUNK_SIZE)
+
+        try:
+            first_chunk = await anext(chunks)
+        except TypeError as e:
+            raise ValueError(f'Unsupported streamed item: {e}') from None
+
+        async def streaming_content():
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+
+        return StreamingHttpResponse(
+            streaming_content(),
+            content_type='application/json',
+        )
+
+    def process_exception(
+        self, exception: Exception, request: HttpRequest
+    ) -> HttpResponse | None:
+        """Render the exception with the handler registered for its type.
+
+        Exceptions without a handler are left to the other middleware.
+        """
+        return exception_handlers.handle(exception, request)
+
+    async def aprocess_exception(
+        self, exception: Exception, request: HttpRequest
+    ) -> HttpResponse | None:
+        return self.process_exception(exception, request)
+
+    def _check_login_required(self, request, plan):
+        """Check if the request is authenticated.
+
+        The login policy of the endpoint is resolved once in its plan from the
+        `LOGIN_REQUIRED` attribute and `API_DEFAULT_LOGIN_REQUIRED` setting.
+        """
+        if plan.login_required and not request.user.is_authenticated:
+            raise UnauthorizedError()
+
+        return None
+
+    async def _acheck_login_required(self, request, plan):
+        """Async version of `_check_login_required`."""
+        if plan.login_required and not (await aget_user(request)).is_authenticated:
+            raise UnauthorizedError()
+
+        return None
@@ -0,0 +1,115 @@
+import re
+
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_vary_headers
+
+from ..compression import Encoding, get_encodings, negotiate_encoding
+from ..conf import settings
+from ..instrumentation import end_phase, start_phase
+from ..mixins import MiddlewareMixin
+from ..plan import EndpointPlan
+
+
+# Negotiated encodings are cached per `Accept-Encoding` header value. Clients
+# send only a handful of distinct values.
+MAX_NEGOTIATED = 256
+
+# Same as Django's `GZipMiddleware`, a strong ETag is made weak when the
+# content is compressed.
+STRONG_ETAG = re.compile(r'^"[^"]*"$')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compresses the responses with `zstd`, `gzip` or `deflate`.
+
+    The encoding is negotiated with the `Accept-Encoding` header, preferring
+    the order of `API_COMPRESSION_ENCODINGS` between equal quality values.
+    Responses smaller than `API_COMPRESSION_MIN_SIZE` are sent as they are and
+    streaming responses are compressed chunk by chunk.
+
+    Must be placed before `CommonMiddleware` so the responses are compressed
+    after they are rendered. Endpoints opt out with `COMPRESS = False`.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.encodings = get_encodings(
+            settings.API_COMPRESSION_ENCODINGS, settings.API_COMPRESSION_LEVELS
+        )
+        self.min_size = settings.API_COMPRESSION_MIN_SIZE
+        self._negotiated: dict[str, Encoding | None] = {}
+
+    def applies_to_endpoint(self, plan: EndpointPlan) -> bool:
+        # Only the endpoints that opt out need `process_endpoint`.
+        return not plan.options.get('COMPRESS', True)
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        request._arcstack_compress = False
+
+    async def aprocess_endpoint(self, request, endpoint, *args, **kwargs):
+        request._arcstack_compress = False
+
+    def process_response(self, request, response):
+        encoding = self._get_encoding(request, response)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = (
+                encoding.astream(response.streaming_content)
+                if response.is_async
+                else encoding.stream(response.streaming_content)
+            )
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+
+            start = start_phase(request)
+            content = encoding.compress(response.content)
+            end_phase(request, 'compress', start)
+
+            if len(content) >= len(response.content):
+                return response
+
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response.headers['Content-Encoding'] = encoding.name
+
+        etag = response.get('ETag')
+        if etag and STRONG_ETAG.match(etag):
+            response.headers['ETag'] = f'W/{etag}'
+
+        return response
+
+    async def aprocess_response(self, request, response):
+        # Compressing does not do any I/O.
+        return self.process_response(request, response)
+
+    def _get_encoding(
+        self, request: HttpRequest, response: HttpResponseBase
+    ) -> Encoding | None:
+        if (
+            not isinstance(response, HttpResponseBase)
+            or not getattr(request, '_arcstack_compress', True)
+            or response.has_header('Content-Encoding')
+        ):
+            return None
+
+        header = request.headers.get('Accept-Encoding')
+        if not header:
+            return None
+
+        try:
+            return self._negotiated[header]
+        except KeyError:
+            pass
+
+        if len(self._negotiated) >= MAX_NEGOTIATED:
+            self._negotiated.clear()
+
+        encoding = self._negotiated[header] = negotiate_encoding(header, self.encodings)
+        return encoding
@@ -0,0 +1,112 @@
+from time import perf_counter_ns
+
+from ..concurrency import Bulkhead, BulkheadConfig, get_bulkhead, register_pool
+from ..conf import settings
+from ..mixins import MiddlewareMixin
+from ..plan import EndpointPlan
+from ..responses import ServiceUnavailableResponse
+from ..utils import get_endpoint_name
+
+
+class ConcurrencyLimitMiddleware(MiddlewareMixin):
+    """Limits the requests in flight of the endpoints with `CONCURRENCY_LIMIT`.
+
+    Every endpoint is a bulkhead, or shares one with the endpoints declaring
+    the same `CONCURRENCY_POOL`, so an overloaded endpoint can not take every
+    worker. The requests over the limit wait in a bounded queue, and get a
+    `503` response with a `Retry-After` header when it is full or when they
+    waited `API_CONCURRENCY_QUEUE_TIMEOUT` seconds.
+
+    With `CONCURRENCY_ADAPTIVE`, the limit follows the latency of the
+    requests, up to `CONCURRENCY_LIMIT`.
+
+    Should be placed after the authentication and rate limit middleware, so
+    the rejected requests do not take a slot. The endpoints of a pool that
+    declare different limits raise `ImproperlyConfigured` when their plans are
+    compiled, with `API_WARMUP` when the server starts.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.bulkheads: dict = {}
+
+    def applies_to_endpoint(self, plan: EndpointPlan) -> bool:
+        options = plan.options
+        limit = options.get('CONCURRENCY_LIMIT', settings.API_CONCURRENCY_LIMIT)
+        if not limit:
+            return False
+
+        config = BulkheadConfig(
+            limit=limit,
+            queue_size=options.get(
+                'CONCURRENCY_QUEUE_SIZE', settings.API_CONCURRENCY_QUEUE_SIZE
+            ),
+            timeout=options.get(
+                'CONCURRENCY_QUEUE_TIMEOUT', settings.API_CONCURRENCY_QUEUE_TIMEOUT
+            ),
+            adaptive=options.get(
+                'CONCURRENCY_ADAPTIVE', settings.API_CONCURRENCY_ADAPTIVE
+            ),
+        )
+        endpoint_name = get_endpoint_name(plan.endpoint)
+        name = options.get('CONCURRENCY_POOL') or endpoint_name
+        register_pool(name, endpoint_name, config)
+
+        self.bulkheads[plan.endpoint] = get_bulkhead(name, config)
+        return True
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        # The slot is taken in `process_endpoint` and released here, even if
+        # the endpoint fails.
+        try:
+            return self.get_response(request)
+        finally:
+            self._release(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            self._release(request)
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        bulkhead = self.bulkheads.get(endpoint)
+        if bulkhead is None:
+            return None
+
+        start = perf_counter_ns()
+        if not bulkhead.acquire():
+            return self._rejected_response()
+        self._acquired(request, bulkhead, start)
+
+    async def aprocess_endpoint(self, request, endpoint, *args, **kwargs):
+        bulkhead = self.bulkheads.get(endpoint)
+        if bulkhead is None:
+            return None
+
+        start = perf_counter_ns()
+        if not await bulkhead.aacquire():
+            return self._rejected_response()
+        self._acquired(request, bulkhead, start)
+
+    def _acquired(self, request, bulkhead: Bulkhead, start: int):
+        now = perf_counter_ns()
+        timer = getattr(request, '_arcstack_timer', None)
+        if timer is not None:
+            timer.add('queue', now - start)
+        request._arcstack_bulkhead = (bulkhead, now)
+
+    def _release(self, request):
+        acquired = getattr(request, '_arcstack_bulkhead', None)
+        if acquired is not None:
+            del request._arcstack_bulkhead
+            bulkhead, start = acquired
+            bulkhead.release((perf_counter_ns() - start) / 1_000_000_000)
+
+    def _rejected_response(self):
+        response = ServiceUnavailableResponse()
+        response['Retry-After'] = str(settings.API_CONCURRENCY_RETRY_AFTER)
+        return response
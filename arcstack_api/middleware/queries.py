@@ -0,0 +1,86 @@
+from asgiref.sync import sync_to_async
+
+from ..conf import settings
+from ..logger import logger
+from ..mixins import MiddlewareMixin
+from ..queries import (
+    QueryBudgetExceededError,
+    QueryRecorder,
+    QueryStats,
+    install_execute_wrapper,
+)
+from ..utils import get_endpoint_name
+
+
+class QueryCountMiddleware(MiddlewareMixin):
+    """Counts and times the database queries of every request.
+
+    The queries are reported in the `X-Query-Count` and `X-Query-Time`
+    headers. The query shapes repeated `API_QUERY_REPEAT_THRESHOLD` times,
+    usually an N+1, are logged as warnings. Endpoints running more queries
+    than their `QUERY_BUDGET` are logged as errors, or fail with
+    `API_QUERY_BUDGET_STRICT`.
+
+    Should be placed first so the queries of every other middleware are
+    counted too.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        meta = getattr(request, '_arcstack_meta', None)
+        if meta is None:
+            # Not a valid request as an API endpoint
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.install():
+            response = self.get_response(request)
+
+        return self._report(request, meta.plan, recorder, response)
+
+    async def __acall__(self, request):
+        meta = getattr(request, '_arcstack_meta', None)
+        if meta is None:
+            return await self.get_response(request)
+
+        # The async ORM runs the queries in the thread of the sync code, which
+        # has its own connections. The recorder follows the context of the
+        # request there, so concurrent requests do not count each other.
+        await sync_to_async(install_execute_wrapper, thread_sensitive=True)()
+        recorder = QueryRecorder()
+        with recorder.install():
+            response = await self.get_response(request)
+
+        return self._report(request, meta.plan, recorder, response)
+
+    def _report(self, request, plan, recorder: QueryRecorder, response):
+        stats = recorder.get_stats(settings.API_QUERY_REPEAT_THRESHOLD)
+        name = get_endpoint_name(plan.endpoint)
+
+        timer = getattr(request, '_arcstack_timer', None)
+        if timer is not None:
+            timer.add('db', stats.duration_ns)
+
+        if settings.API_QUERY_HEADERS:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-Query-Time'] = f'{stats.duration_ms:.2f}'
+
+        for shape, count in stats.repeated:
+            logger.warning(f'Possible N+1 query in {name}, run {count} times: {shape}')
+
+        budget = plan.options.get('QUERY_BUDGET', settings.API_QUERY_BUDGET)
+        if budget is not None and stats.count > budget:
+            self._budget_exceeded(name, budget, stats)
+
+        return response
+
+    def _budget_exceeded(self, name: str, budget: int, stats: QueryStats):
+        message = (
+            f'{name} ran {stats.count} queries, over its budget of {budget} '
+            f'({stats.duration_ms:.2f} ms)'
+        )
+        if settings.API_QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceededError(message)
+        logger.error(message)
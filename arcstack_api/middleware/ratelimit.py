@@ -0,0 +1,112 @@
+import math
+from collections.abc import Callable
+from typing import NamedTuple
+
+from django.http.response import HttpResponseBase
+
+from ..conf import settings
+from ..mixins import MiddlewareMixin
+from ..plan import EndpointPlan
+from ..ratelimit import Rate, RateLimitResult, get_rate_limit_store, parse_rate
+from ..responses import TooManyRequestsResponse
+from ..utils import aget_user, get_endpoint_name
+
+
+class RateLimitPolicy(NamedTuple):
+    name: str
+    rate: Rate
+    key: str | Callable
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Limits the requests of every client to the endpoints with `RATE_LIMIT`.
+
+    The limit is checked in `process_endpoint`, before the endpoint is called,
+    and the requests over it get a `429` response with a `Retry-After` header.
+    Every response of a limited endpoint gets the `RateLimit-*` headers.
+
+    Must be placed after the authentication middleware when the clients are
+    identified by their user.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.policies: dict = {}
+
+    def applies_to_endpoint(self, plan: EndpointPlan) -> bool:
+        rate = plan.options.get('RATE_LIMIT', settings.API_RATE_LIMIT)
+        if not rate:
+            return False
+
+        self.policies[plan.endpoint] = RateLimitPolicy(
+            name=get_endpoint_name(plan.endpoint),
+            rate=parse_rate(rate),
+            key=plan.options.get('RATE_LIMIT_KEY', settings.API_RATE_LIMIT_KEY),
+        )
+        return True
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return None
+
+        user = getattr(request, 'user', None) if policy.key == 'user' else None
+        client = self._get_client(request, policy, user)
+        result = get_rate_limit_store().hit(f'{policy.name}:{client}', policy.rate)
+
+        return self._process_result(request, policy, result)
+
+    async def aprocess_endpoint(self, request, endpoint, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return None
+
+        user = None
+        if policy.key == 'user' and hasattr(request, 'user'):
+            user = await aget_user(request)
+        client = self._get_client(request, policy, user)
+        result = await get_rate_limit_store().ahit(
+            f'{policy.name}:{client}', policy.rate
+        )
+
+        return self._process_result(request, policy, result)
+
+    def process_response(self, request, response):
+        limited = getattr(request, '_arcstack_rate_limit', None)
+        if limited is None:
+            return response
+        del request._arcstack_rate_limit
+
+        # Inside `CommonMiddleware`, the response is not rendered yet.
+        if isinstance(response, HttpResponseBase):
+            self._set_headers(response, *limited)
+        return response
+
+    async def aprocess_response(self, request, response):
+        return self.process_response(request, response)
+
+    def _process_result(self, request, policy, result: RateLimitResult):
+        if result.allowed:
+            # The headers are added to the response once it is rendered.
+            request._arcstack_rate_limit = (policy, result)
+            return None
+
+        response = TooManyRequestsResponse()
+        response['Retry-After'] = str(math.ceil(result.retry_after))
+        self._set_headers(response, policy, result)
+        return response
+
+    def _get_client(self, request, policy, user) -> str:
+        if callable(policy.key):
+            return f'key:{policy.key(request)}'
+        if policy.key == 'user' and user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+    def _set_headers(self, response, policy, result: RateLimitResult):
+        response['RateLimit-Limit'] = str(result.limit)
+        response['RateLimit-Remaining'] = str(result.remaining)
+        response['RateLimit-Reset'] = str(math.ceil(result.reset))
+        response['RateLimit-Policy'] = (
+            f'{policy.rate.limit};w={math.ceil(policy.rate.period)}'
+        )
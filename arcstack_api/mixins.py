@@ -1,8 +1,17 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .utils import get_middleware_hook
+
+
 class MiddlewareMixin:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         if get_response is None:
             raise ValueError('get_response must be provided.')
         self.get_response = get_response
+        self._async_check()
 
     def __repr__(self):
         qualname = self.__class__.__qualname__
@@ -13,7 +22,26 @@ class MiddlewareMixin:
         )
         return f'<{qualname} get_response={get_response_qualname}>'
 
+    def _async_check(self):
+        """If get_response is a coroutine function, turns us into async mode so
+        a thread is not consumed during a whole request.
+        """
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            # Mark the class as async-capable, but do the actual switch inside
+            # __call__ to avoid swapping out dunder methods.
+            markcoroutinefunction(self)
+            self._async_process_request = get_middleware_hook(
+                self, 'process_request', is_async=True
+            )
+            self._async_process_response = get_middleware_hook(
+                self, 'process_response', is_async=True
+            )
+
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
         response = None
 
         if hasattr(self, 'process_request'):
@@ -25,3 +53,19 @@ class MiddlewareMixin:
             response = self.process_response(request, response)
 
         return response
+
+    async def __acall__(self, request):
+        """Async version of __call__ that is swapped in when an async request
+        is running.
+        """
+        response = None
+
+        if self._async_process_request is not None:
+            response = await self._async_process_request(request)
+
+        response = response or await self.get_response(request)
+
+        if self._async_process_response is not None:
+            response = await self._async_process_response(request, response)
+
+        return response
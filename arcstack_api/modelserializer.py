@@ -0,0 +1,421 @@
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+from typing import Any, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ObjectDoesNotExist,
+)
+from django.db.models import Model, Prefetch, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.query import ModelIterable
+
+from .conf import settings
+
+
+class _Field(NamedTuple):
+    key: str
+    attname: str
+    # The column read by `values_list()` and `only()`, `None` for the
+    # attributes that are not concrete fields, e.g. properties.
+    column: str | None
+
+
+class _Relation(NamedTuple):
+    key: str
+    # The lookup of the relation, its accessor for the reverse relations.
+    name: str
+    many: bool
+    serializer: 'ModelSerializer'
+    # The foreign key of the related objects of a reverse relation, needed to
+    # match the prefetched objects to their instance.
+    remote_column: str | None
+
+
+def freeze_spec(spec) -> tuple:
+    """Turn a field spec into a hashable tuple, keeping its order.
+
+    A spec is an iterable of field names and of `{relation: spec}` mappings.
+    """
+    if isinstance(spec, str):
+        spec = (spec,)
+
+    frozen = []
+    for entry in spec:
+        if isinstance(entry, str):
+            frozen.append(entry)
+        elif isinstance(entry, Mapping):
+            frozen.extend((name, freeze_spec(sub)) for name, sub in entry.items())
+        elif isinstance(entry, tuple) and len(entry) == 2:
+            frozen.append((entry[0], freeze_spec(entry[1])))
+        else:
+            raise ImproperlyConfigured(f'Invalid field spec entry: {entry!r}')
+    return tuple(frozen)
+
+
+class ModelSerializer:
+    """Serializes the instances of a model to dicts with a field spec.
+
+    The spec is compiled once per model into accessor functions. When the spec
+    only reads columns and forward relations, the rows are read with
+    `values_list()` and no instance is created. Otherwise, the instances are
+    fetched with `only()` and the related objects with `select_related()` and
+    `prefetch_related()`, so serializing them does not run any query.
+    """
+
+    def __init__(self, model: type[Model], spec: tuple):
+        self.model = model
+        self.spec = spec
+        self.fields: list[_Field] = []
+        self.relations: list[_Relation] = []
+
+        for entry in spec:
+            if isinstance(entry, str):
+                self._add_field(entry)
+            else:
+                self._add_relation(*entry)
+
+        self.keys = tuple(field.key for field in self.fields)
+        self._get_values = _compile_getter([field.attname for field in self.fields])
+        self._values = self._compile_values('')
+
+    @property
+    def uses_values(self) -> bool:
+        """Whether the querysets are read without creating the instances."""
+        return self._values is not None
+
+    @property
+    def has_attributes(self) -> bool:
+        """Whether the spec reads attributes that are not fields."""
+        return any(field.column is None for field in self.fields) or any(
+            relation.serializer.has_attributes for relation in self.relations
+        )
+
+    def serialize(self, instance: Model) -> dict:
+        data = dict(zip(self.keys, self._get_values(instance), strict=True))
+
+        for relation in self.relations:
+            if relation.many:
+                data[relation.key] = [
+                    relation.serializer.serialize(related)
+                    for related in getattr(instance, relation.name).all()
+                ]
+            else:
+                try:
+                    related = getattr(instance, relation.name)
+                except ObjectDoesNotExist:
+                    # A missing reverse one-to-one object.
+                    related = None
+                data[relation.key] = (
+                    None if related is None else relation.serializer.serialize(related)
+                )
+
+        return data
+
+    def serialize_many(self, instances: Iterable[Model]) -> list[dict]:
+        return [self.serialize(instance) for instance in instances]
+
+    def iterator(self, queryset: QuerySet, chunk_size: int) -> Iterator[dict]:
+        """Fetch and serialize the rows of the queryset in chunks."""
+        if self._values is not None:
+            columns, read = self._values
+            rows = queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+            return map(read, rows)
+
+        instances = self.optimize(queryset).iterator(chunk_size=chunk_size)
+        return map(self.serialize, instances)
+
+    async def aiterator(
+        self, queryset: QuerySet, chunk_size: int
+    ) -> AsyncIterator[dict]:
+        """Async version of `iterator`."""
+        if self._values is not None:
+            columns, read = self._values
+            # `values_list().aiterator()` runs the query in the event loop, the
+            # rows are fetched in a thread like `aiterator()` does.
+            rows = await sync_to_async(iter)(
+                queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+            )
+            while chunk := await sync_to_async(_next_chunk)(rows, chunk_size):
+                for row in chunk:
+                    yield read(row)
+            return
+
+        async for instance in self.optimize(queryset).aiterator(chunk_size=chunk_size):
+            yield self.serialize(instance)
+
+    def optimize(self, queryset: QuerySet, extra: Iterable[str] = ()) -> QuerySet:
+        """Fetch what the spec reads, and only that, with the instances.
+
+        `extra` are the other columns needed, e.g. the ordering of a page.
+        """
+        select, prefetch, only = self._get_lookups('')
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if only is not None:
+            extra = [name for name in extra if name not in only]
+            queryset = queryset.only(*only, *extra)
+        return queryset
+
+    def select(self, fields: Iterable[str]) -> 'ModelSerializer':
+        """Return the serializer of the selected keys, e.g. of `?fields=`.
+
+        The selected keys that are not in the spec are read as fields.
+
+        :raises ImproperlyConfigured: If a key is not a field or an attribute of
+            the model.
+        """
+        entries = {
+            entry if isinstance(entry, str) else entry[0]: entry for entry in self.spec
+        }
+        return get_model_serializer(
+            self.model, tuple(entries.get(name, name) for name in fields)
+        )
+
+    def _add_field(self, name: str):
+        if LOOKUP_SEP in name:
+            # A field of a forward relation, e.g. `category__name`.
+            self.fields.append(_Field(name, name, name))
+            return
+
+        field = _get_field(self.model, name)
+        if field is None:
+            if not hasattr(self.model, name):
+                raise ImproperlyConfigured(
+                    f'{self.model.__name__}.{name} is not a field or an attribute.'
+                )
+            # A property or another attribute of the instances.
+            self.fields.append(_Field(name, name, None))
+            return
+
+        if field.many_to_many or field.one_to_many:
+            # The primary keys of the related objects.
+            self._add_relation(name, ('pk',), flat=True)
+            return
+        if not field.concrete:
+            raise ImproperlyConfigured(
+                f'{self.model.__name__}.{name} is a relation, declare the fields '
+                f'of the related object: {{{name!r}: [...]}}.'
+            )
+
+        self.fields.append(_Field(name, field.attname, field.attname))
+
+    def _add_relation(self, name: str, spec: tuple, flat: bool = False):
+        field = _get_relation(self.model, name)
+        many = field.many_to_many or field.one_to_many
+        reverse = not field.concrete
+
+        serializer = get_model_serializer(field.related_model, spec)
+        relation = _Relation(
+            key=name,
+            name=field.get_accessor_name() if reverse else field.name,
+            many=many,
+            serializer=serializer,
+            remote_column=field.field.attname if field.one_to_many else None,
+        )
+        if flat:
+            relation = relation._replace(serializer=_FlatSerializer(serializer))
+        self.relations.append(relation)
+
+    def _compile_values(self, prefix: str) -> tuple[list[str], Callable] | None:
+        """Compile the `values_list()` columns and the function reading a row.
+
+        Returns `None` if the spec can not be read from the rows.
+        """
+        if any(field.column is None for field in self.fields) or any(
+            relation.many for relation in self.relations
+        ):
+            return None
+
+        keys = self.keys
+        columns = [prefix + field.column for field in self.fields]
+        width = len(columns)
+
+        nested = []
+        for relation in self.relations:
+            related = relation.serializer._compile_values(f'{prefix}{relation.name}__')
+            if related is None:
+                return None
+            related_columns, read_related = related
+            # The primary key tells if there is a related object.
+            nested.append((relation.key, len(columns), read_related))
+            columns.append(f'{prefix}{relation.name}__pk')
+            columns.extend(related_columns)
+
+        if not nested and not prefix:
+            return columns, lambda row: dict(zip(keys, row, strict=True))
+
+        def read(row, start=0):
+            data = dict(zip(keys, row[start : start + width], strict=True))
+            for key, offset, read_related in nested:
+                data[key] = (
+                    None
+                    if row[start + offset] is None
+                    else read_related(row, start + offset + 1)
+                )
+            return data
+
+        return columns, read
+
+    def _get_lookups(self, prefix: str) -> tuple[list[str], list, list[str] | None]:
+        select = []
+        prefetch = []
+        only = None
+        for field in self.fields:
+            if field.column is not None and LOOKUP_SEP in field.column:
+                select.append(prefix + field.column.rpartition(LOOKUP_SEP)[0])
+
+        if not any(field.column is None for field in self.fields):
+            only = [prefix + field.column for field in self.fields]
+            only.extend(select)
+            # Needed to match the prefetched objects to the instances.
+            only.append(prefix + self.model._meta.pk.attname)
+
+        for relation in self.relations:
+            serializer = relation.serializer
+            if relation.many:
+                queryset = serializer.optimize(
+                    serializer.model._default_manager.all(),
+                    extra=[relation.remote_column] if relation.remote_column else (),
+                )
+                prefetch.append(Prefetch(prefix + relation.name, queryset=queryset))
+                continue
+
+            lookup = prefix + relation.name
+            select.append(lookup)
+            related_select, related_prefetch, related_only = serializer._get_lookups(
+                f'{lookup}__'
+            )
+            select.extend(related_select)
+            prefetch.extend(related_prefetch)
+            if only is not None:
+                only.append(lookup)
+                if related_only is not None:
+                    only.extend(related_only)
+
+        return select, prefetch, only
+
+
+class _FlatSerializer:
+    """Serializes the related objects of a relation to their primary keys."""
+
+    has_attributes = False
+
+    def __init__(self, serializer: ModelSerializer):
+        self.model = serializer.model
+        self._serializer = serializer
+
+    def serialize(self, instance: Model):
+        return instance.pk
+
+    def optimize(self, queryset: QuerySet, extra: Iterable[str] = ()) -> QuerySet:
+        return self._serializer.optimize(queryset, extra)
+
+    def _compile_values(self, prefix: str):
+        return None
+
+    def _get_lookups(self, prefix: str):
+        return self._serializer._get_lookups(prefix)
+
+
+def _get_field(model: type[Model], name: str):
+    opts = model._meta
+    if name == 'pk':
+        return opts.pk
+    try:
+        return opts.get_field(name)
+    except FieldDoesNotExist:
+        # The reverse relations are also declared by their accessor name, e.g.
+        # `book_set`.
+        return next(
+            (
+                related
+                for related in opts.related_objects
+                if related.get_accessor_name() == name
+            ),
+            None,
+        )
+
+
+def _get_relation(model: type[Model], name: str):
+    field = _get_field(model, name)
+    if field is None or not field.is_relation:
+        raise ImproperlyConfigured(f'{model.__name__}.{name} is not a relation.')
+    return field
+
+
+def _next_chunk(rows: Iterator, chunk_size: int) -> list:
+    return list(islice(rows, chunk_size))
+
+
+def _compile_getter(attnames: list[str]) -> Callable[[Any], tuple]:
+    """Build a function returning the attributes of an instance as a tuple."""
+    if not attnames:
+        return lambda instance: ()
+    if any(LOOKUP_SEP in attname for attname in attnames):
+        getters = [_compile_lookup(attname) for attname in attnames]
+        return lambda instance: tuple(getter(instance) for getter in getters)
+    if len(attnames) == 1:
+        getter = attrgetter(attnames[0])
+        return lambda instance: (getter(instance),)
+    return attrgetter(*attnames)
+
+
+def _compile_lookup(lookup: str) -> Callable[[Any], Any]:
+    """Build a function following a lookup, `None` past a missing object."""
+    names = lookup.split(LOOKUP_SEP)
+    if len(names) == 1:
+        return attrgetter(lookup)
+
+    def get(instance):
+        for name in names:
+            if instance is None:
+                return None
+            instance = getattr(instance, name)
+        return instance
+
+    return get
+
+
+def get_default_fields(model: type[Model]) -> tuple[str, ...]:
+    """The concrete fields of the model but the `API_EXCLUDED_FIELDS`.
+
+    The fields are named like `values()` names them, e.g. `author_id`.
+    """
+    excluded = settings.API_EXCLUDED_FIELDS
+    return tuple(
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.name not in excluded
+    )
+
+
+def get_default_spec(model: type[Model]) -> tuple:
+    """The `API_FIELDS` of the model, or its default fields."""
+    spec = getattr(model, 'API_FIELDS', None)
+    if spec is not None:
+        return freeze_spec(spec)
+    return get_default_fields(model)
+
+
+@lru_cache(maxsize=1024)
+def get_model_serializer(
+    model: type[Model], spec: tuple | None = None
+) -> ModelSerializer:
+    """Return the compiled serializer of the model and the frozen spec.
+
+    Without a spec, the `API_FIELDS` of the model, or all its concrete fields.
+    """
+    return ModelSerializer(model, get_default_spec(model) if spec is None else spec)
+
+
+def is_model_queryset(queryset: QuerySet) -> bool:
+    """Whether the queryset returns model instances, not `values()` rows."""
+    return issubclass(queryset._iterable_class, ModelIterable)
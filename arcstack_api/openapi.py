@@ -0,0 +1,469 @@
+import hashlib
+import inspect
+import json
+import re
+import threading
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+from django.http import HttpResponse
+from django.http.response import HttpResponseBase
+from django.urls.converters import IntConverter, UUIDConverter
+from django.urls.resolvers import RoutePattern
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .compression import Encoding, get_encodings, negotiate_encoding
+from .conf import settings
+from .responses import MethodNotAllowedResponse
+from .signature import EndpointSignature, MethodSignature
+from .validation import is_list_type, is_model, split_marker
+from .warmup import iter_routes
+
+
+try:
+    import pydantic
+except ImportError:  # pragma: no cover
+    pydantic = None
+
+
+OPENAPI_VERSION = '3.1.0'
+
+ROUTE_PARAM_RE = re.compile(r'<(?:(?P<converter>[^>:]+):)?(?P<name>[^>]+)>')
+
+# The schema is compressed once, so it is worth the highest levels.
+STATIC_COMPRESSION_LEVELS = {'zstd': 19, 'gzip': 9, 'deflate': 9}
+
+SECURITY_SCHEMES = {
+    'Basic': {'type': 'http', 'scheme': 'basic'},
+    'Bearer': {'type': 'http', 'scheme': 'bearer'},
+}
+
+
+class SchemaGenerator:
+    """Builds the OpenAPI document of the API endpoints of a URLconf.
+
+    The parameters, the request body and the response of every operation are
+    derived from the `EndpointSignature` of the endpoint, the same way the
+    inputs are validated. The JSON schemas of the annotations are generated by
+    pydantic in a single pass, the models are shared in the `components`.
+
+    Endpoints opt out with `OPENAPI = False`. Function endpoints handle every
+    method, they are documented as `GET`, or `POST` if they read a body,
+    unless they declare `OPENAPI_METHODS`.
+    """
+
+    def __init__(self, urlconf: str | None = None, info: dict | None = None):
+        self.urlconf = urlconf
+        self.info = {**settings.API_OPENAPI_INFO, **(info or {})}
+        self._schemas: list[tuple[dict, Any, str]] = []
+        self._operation_ids: set[str] = set()
+
+    def get_schema(self) -> dict:
+        self._schemas = []
+        self._operation_ids = set()
+
+        paths = {}
+        secured = False
+
+        for patterns, callback in iter_routes(self.urlconf):
+            plan = getattr(callback, 'arcstack_plan', None)
+            if plan is None or not plan.options.get('OPENAPI', True):
+                continue
+
+            path, path_params = get_openapi_path(patterns)
+            operations = paths.setdefault(path, {})
+
+            for method, signature in self._get_methods(plan):
+                operations[method] = self._get_operation(
+                    plan, method, signature, path_params
+                )
+            secured = secured or plan.login_required
+
+        schema = {
+            'openapi': OPENAPI_VERSION,
+            'info': self.info,
+            'paths': paths,
+        }
+
+        components = {}
+        if definitions := self._generate_schemas():
+            components['schemas'] = definitions
+        if secured:
+            components['securitySchemes'] = {
+                scheme: SECURITY_SCHEMES[scheme]
+                for scheme in settings.API_AUTH_SCHEMES
+                if scheme in SECURITY_SCHEMES
+            }
+        if components:
+            schema['components'] = components
+
+        return schema
+
+    def _get_methods(self, plan) -> Iterable[tuple[str, MethodSignature]]:
+        signature: EndpointSignature = plan.signature
+
+        if signature.is_class_based:
+            for method, method_signature in signature.methods.items():
+                if method != 'head':
+                    yield method, method_signature
+            return
+
+        method_signature = signature.methods[None]
+        methods = plan.options.get('OPENAPI_METHODS')
+        if methods is None:
+            reads_body = any(
+                self._get_source(param, ()) == 'body'
+                for param in method_signature.params
+            )
+            methods = ['post' if reads_body else 'get']
+
+        for method in methods:
+            yield method.lower(), method_signature
+
+    def _get_operation(
+        self,
+        plan,
+        method: str,
+        signature: MethodSignature,
+        path_params: dict[str, dict],
+    ) -> dict:
+        name = getattr(plan.endpoint, 'view_class', plan.endpoint).__name__
+        operation = {'operationId': self._get_operation_id(name, method)}
+
+        doc = self._get_doc(plan, method)
+        if doc:
+            summary, _, description = doc.partition('\n')
+            operation['summary'] = summary.strip()
+            if description.strip():
+                operation['description'] = description.strip()
+
+        if tags := plan.options.get('OPENAPI_TAGS'):
+            operation['tags'] = list(tags)
+
+        parameters = {
+            name: {
+                'name': name,
+                'in': 'path',
+                'required': True,
+                'schema': schema,
+            }
+            for name, schema in path_params.items()
+        }
+        body = []
+        validated = False
+
+        for param in signature.params:
+            if param.annotation is inspect.Parameter.empty:
+                continue
+
+            validated = True
+            annotation, marker = split_marker(param.annotation)
+            source = self._get_source(param, path_params)
+            alias = marker.alias if marker is not None and marker.alias else None
+
+            if source == 'body':
+                body.append((alias or param.name, annotation, param))
+                continue
+
+            if source == 'header':
+                alias = alias or param.name.replace('_', '-')
+
+            parameter = {
+                'name': alias or param.name,
+                'in': source,
+                'required': (
+                    source == 'path' or param.default is inspect.Parameter.empty
+                ),
+                'schema': self._get_schema(annotation, 'validation'),
+            }
+            if source == 'query' and is_list_type(annotation):
+                parameter['explode'] = True
+            parameters[parameter['name']] = parameter
+
+        if parameters:
+            operation['parameters'] = list(parameters.values())
+
+        if body:
+            operation['requestBody'] = self._get_request_body(body)
+
+        operation['responses'] = self._get_responses(plan, signature, validated)
+
+        if plan.login_required:
+            operation['security'] = [
+                {scheme: []}
+                for scheme in settings.API_AUTH_SCHEMES
+                if scheme in SECURITY_SCHEMES
+            ]
+
+        return operation
+
+    def _get_source(self, param: inspect.Parameter, path_params) -> str:
+        """Return the source of the parameter, as `MethodValidator` reads it."""
+        annotation, marker = split_marker(param.annotation)
+        if marker is not None and marker.source is not None:
+            return marker.source
+        if pydantic is not None and is_model(annotation):
+            return 'body'
+        return 'path' if param.name in path_params else 'query'
+
+    def _get_request_body(self, body: list[tuple]) -> dict:
+        if len(body) == 1:
+            _, annotation, param = body[0]
+            schema = self._get_schema(annotation, 'validation')
+            required = param.default is inspect.Parameter.empty
+        else:
+            # Each body parameter is a key of the body.
+            schema = {
+                'type': 'object',
+                'properties': {
+                    alias: self._get_schema(annotation, 'validation')
+                    for alias, annotation, _ in body
+                },
+            }
+            if names := [
+                alias
+                for alias, _, param in body
+                if param.default is inspect.Parameter.empty
+            ]:
+                schema['required'] = names
+            required = True
+
+        return {
+            'required': required,
+            'content': {'application/json': {'schema': schema}},
+        }
+
+    def _get_responses(self, plan, signature: MethodSignature, validated: bool):
+        response = {'description': 'Successful response'}
+
+        annotation = signature.return_annotation
+        if annotation not in (inspect.Signature.empty, None) and not (
+            isinstance(annotation, type) and issubclass(annotation, HttpResponseBase)
+        ):
+            response['content'] = {
+                'application/json': {
+                    'schema': self._get_schema(annotation, 'serialization')
+                }
+            }
+
+        responses = {'200': response}
+        if plan.login_required:
+            responses['401'] = {'description': 'Unauthorized'}
+        if validated:
+            responses['422'] = {'description': 'Invalid input'}
+
+        return responses
+
+    def _get_schema(self, annotation, mode: str) -> dict:
+        """Return a placeholder filled with the JSON schema of the annotation.
+
+        The schemas are generated together once the paths are built, so the
+        models used by several endpoints are defined once.
+        """
+        schema = {}
+        if pydantic is not None:
+            self._schemas.append((schema, annotation, mode))
+        return schema
+
+    def _generate_schemas(self) -> dict:
+        inputs = []
+        for index, (_, annotation, mode) in enumerate(self._schemas):
+            try:
+                adapter = pydantic.TypeAdapter(annotation)
+            except pydantic.PydanticUserError:
+                # Not a type pydantic knows, e.g. a `QuerySet`.
+                continue
+            inputs.append((index, mode, adapter))
+
+        if not inputs:
+            return {}
+
+        schemas, definitions = pydantic.TypeAdapter.json_schemas(
+            inputs, ref_template='#/components/schemas/{model}'
+        )
+        for (index, _mode), schema in schemas.items():
+            self._schemas[index][0].update(schema)
+
+        return definitions.get('$defs', {})
+
+    def _get_operation_id(self, name: str, method: str) -> str:
+        operation_id = base = f'{name}_{method}'
+        suffix = 1
+        while operation_id in self._operation_ids:
+            suffix += 1
+            operation_id = f'{base}_{suffix}'
+        self._operation_ids.add(operation_id)
+        return operation_id
+
+    def _get_doc(self, plan, method: str) -> str | None:
+        view_class = getattr(plan.endpoint, 'view_class', None)
+        if view_class is None:
+            doc = plan.endpoint.__doc__
+        else:
+            # `inspect.getdoc` would inherit the docstring of `View`.
+            doc = getattr(view_class, method).__doc__ or view_class.__doc__
+        return inspect.cleandoc(doc) if doc else None
+
+
+def get_openapi_path(patterns: Iterable) -> tuple[str, dict[str, dict]]:
+    """Convert the URL patterns of a view to an OpenAPI path.
+
+    Returns the path with its parameters in braces and the schema of every
+    path parameter, from the converter of the route.
+    """
+    path = ''
+    params = {}
+
+    for pattern in patterns:
+        if isinstance(pattern, RoutePattern):
+            for name, converter in pattern.converters.items():
+                params[name] = _get_converter_schema(converter)
+            path += ROUTE_PARAM_RE.sub(r'{\g<name>}', str(pattern))
+        else:
+            for name in pattern.regex.groupindex:
+                params[name] = {'type': 'string'}
+            path += _simplify_regex(pattern.regex.pattern)
+
+    return '/' + path.lstrip('/'), params
+
+
+def _get_converter_schema(converter) -> dict:
+    if isinstance(converter, IntConverter):
+        return {'type': 'integer', 'minimum': 0}
+    if isinstance(converter, UUIDConverter):
+        return {'type': 'string', 'format': 'uuid'}
+    return {'type': 'string'}
+
+
+def _simplify_regex(regex: str) -> str:
+    """Replace the named groups with `{name}` and drop the anchors."""
+    parts = []
+    position = 0
+
+    while (start := regex.find('(?P<', position)) != -1:
+        name_end = regex.index('>', start)
+        depth = 0
+        end = start
+        while end < len(regex):
+            if regex[end] == '\\':
+                end += 2
+                continue
+            if regex[end] == '(':
+                depth += 1
+            elif regex[end] == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+            end += 1
+
+        parts.append(regex[position:start])
+        parts.append('{' + regex[start + 4 : name_end] + '}')
+        position = end + 1
+
+    parts.append(regex[position:])
+    path = ''.join(parts).lstrip('^').removesuffix('$').removesuffix(r'\Z')
+    return re.sub(r'\\(.)', r'\1', path)
+
+
+class Representation(NamedTuple):
+    content: bytes
+    etag: str
+    encoding: str | None
+
+
+class SchemaDocument:
+    """The rendered OpenAPI document, and its compressed representations.
+
+    Everything is computed once, serving the document only negotiates the
+    encoding and compares the `ETag`.
+    """
+
+    __slots__ = ('identity', 'encodings', 'representations')
+
+    def __init__(self, schema: dict, encodings: list[Encoding]):
+        content = json.dumps(schema, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+
+        self.identity = Representation(content, quote_etag(digest), None)
+        self.encodings = []
+        self.representations = {}
+
+        for encoding in encodings:
+            compressed = encoding.compress(content)
+            if len(compressed) < len(content):
+                self.encodings.append(encoding)
+                self.representations[encoding.name] = Representation(
+                    compressed,
+                    quote_etag(f'{digest}-{encoding.name}'),
+                    encoding.name,
+                )
+
+    def negotiate(self, accept_encoding: str | None) -> Representation:
+        if accept_encoding:
+            encoding = negotiate_encoding(accept_encoding, self.encodings)
+            if encoding is not None:
+                return self.representations[encoding.name]
+        return self.identity
+
+
+class OpenAPISchemaView:
+    """Serves the OpenAPI document of the URLconf.
+
+    The document is generated on the first request, or by `warmup`, and then
+    served from memory. It is not an API endpoint, the API middleware do not
+    run for it.
+    """
+
+    def __init__(self, urlconf: str | None = None, info: dict | None = None):
+        self.urlconf = urlconf
+        self.info = info
+        self._document: SchemaDocument | None = None
+        self._lock = threading.Lock()
+
+    def get_document(self) -> SchemaDocument:
+        document = self._document
+        if document is None:
+            with self._lock:
+                document = self._document
+                if document is None:
+                    document = self._document = self.build_document()
+        return document
+
+    def build_document(self) -> SchemaDocument:
+        schema = SchemaGenerator(self.urlconf, self.info).get_schema()
+        encodings = get_encodings(
+            settings.API_COMPRESSION_ENCODINGS,
+            {**STATIC_COMPRESSION_LEVELS, **settings.API_COMPRESSION_LEVELS},
+        )
+        return SchemaDocument(schema, encodings)
+
+    def reset(self):
+        """Generate the document again on the next request."""
+        self._document = None
+
+    def __call__(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return MethodNotAllowedResponse()
+
+        representation = self.get_document().negotiate(
+            request.headers.get('Accept-Encoding')
+        )
+
+        response = HttpResponse(representation.content, content_type='application/json')
+        response.headers['ETag'] = representation.etag
+        if representation.encoding is not None:
+            response.headers['Content-Encoding'] = representation.encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        return get_conditional_response(
+            request, etag=representation.etag, response=response
+        )
+
+
+def get_schema_view(urlconf: str | None = None, info: dict | None = None) -> Callable:
+    """Return the view serving the OpenAPI document, to route in the URLconf.
+
+    `info` is merged into `API_OPENAPI_INFO`, e.g. the `title` and `version`.
+    """
+    return OpenAPISchemaView(urlconf, info)
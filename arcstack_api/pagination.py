@@ -0,0 +1,274 @@
+import datetime
+from collections.abc import Sequence
+from typing import Any, NamedTuple
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q, QuerySet
+
+from .conf import settings
+from .errors import APIError
+
+
+CURSOR_SALT = 'arcstack_api.pagination.cursor'
+
+
+class OrderingField(NamedTuple):
+    name: str
+    attname: str
+    descending: bool
+    field: Any
+
+
+class Cursor(NamedTuple):
+    # Values of the ordering fields of the row the page starts after.
+    position: tuple
+    # Whether the page is read backwards from the position (previous page).
+    reverse: bool
+
+
+class CursorSigner:
+    """Signs the cursors so the clients can not forge positions."""
+
+    def __init__(self, salt: str = CURSOR_SALT):
+        self.salt = salt
+
+    def dumps(self, cursor: Cursor) -> str:
+        return signing.dumps(
+            [list(cursor.position), cursor.reverse],
+            salt=self.salt,
+            serializer=_CursorJSONSerializer,
+            compress=True,
+        )
+
+    def loads(self, value: str) -> Cursor:
+        position, reverse = signing.loads(
+            value, salt=self.salt, serializer=_CursorJSONSerializer
+        )
+        return Cursor(tuple(position), bool(reverse))
+
+
+class _CursorJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # `DjangoJSONEncoder` cuts the microseconds, a position must be exact
+        # or the rows of the same millisecond are repeated or skipped.
+        if isinstance(o, datetime.datetime | datetime.time):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _CursorJSONSerializer:
+    def dumps(self, obj) -> bytes:
+        return _CursorJSONEncoder(separators=(',', ':')).encode(obj).encode('latin-1')
+
+    def loads(self, data: bytes):
+        return signing.JSONSerializer().loads(data)
+
+
+class CursorPaginator:
+    """Keyset pagination for `QuerySet` objects.
+
+    The rows are ordered by `ordering` and a page is selected with a `WHERE`
+    predicate on the values of the last row of the previous page instead of an
+    `OFFSET`, so every page costs the same no matter how deep it is. The
+    ordering should be covered by an index and must end with a unique field.
+    The primary key is appended when it is not there. The ordering fields must
+    not be nullable.
+
+    A page fetches one extra row to know whether there is a next page, so no
+    `COUNT` query is made.
+
+    ```py
+    paginator = CursorPaginator(ordering=('-created', 'id'))
+
+
+    @api_endpoint()
+    def events(request):
+        return paginator.paginate(request, Event.objects.values('id', 'name'))
+    ```
+    """
+
+    def __init__(
+        self,
+        ordering: Sequence[str],
+        page_size: int | None = None,
+        max_page_size: int | None = None,
+        cursor_query_param: str = 'cursor',
+        page_size_query_param: str | None = 'page_size',
+    ):
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        if not ordering:
+            raise ImproperlyConfigured('CursorPaginator requires an ordering.')
+
+        self.ordering = tuple(ordering)
+        self.page_size = page_size or settings.API_PAGE_SIZE
+        self.max_page_size = max_page_size or settings.API_MAX_PAGE_SIZE
+        self.cursor_query_param = cursor_query_param
+        self.page_size_query_param = page_size_query_param
+        self.signer = CursorSigner()
+        self._fields: dict[type[Model], tuple[OrderingField, ...]] = {}
+
+    def paginate(self, request, queryset: QuerySet) -> dict:
+        """Return a page of the queryset with the links of the adjacent pages."""
+        queryset, fields, cursor, page_size = self._prepare(request, queryset)
+        rows = list(queryset[: page_size + 1])
+        return self._build_page(request, rows, fields, cursor, page_size)
+
+    async def apaginate(self, request, queryset: QuerySet) -> dict:
+        """Async version of `paginate`."""
+        queryset, fields, cursor, page_size = self._prepare(request, queryset)
+        rows = [row async for row in queryset[: page_size + 1]]
+        return self._build_page(request, rows, fields, cursor, page_size)
+
+    def get_fields(self, model: type[Model]) -> tuple[OrderingField, ...]:
+        """Resolve the ordering fields of the model, once per model."""
+        fields = self._fields.get(model)
+        if fields is None:
+            fields = self._fields[model] = self._resolve_fields(model)
+        return fields
+
+    def _resolve_fields(self, model: type[Model]) -> tuple[OrderingField, ...]:
+        fields = []
+
+        for name in self.ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+
+            if name == 'pk':
+                field = model._meta.pk
+            else:
+                try:
+                    field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    raise ImproperlyConfigured(
+                        f'Cursor ordering field `{name}` is not a field of '
+                        f'{model.__name__}. Related lookups are not supported.'
+                    ) from None
+
+            if field.null:
+                # `NULL` positions never match the `>` and `<` predicates.
+                raise ImproperlyConfigured(
+                    f'Cursor ordering field `{name}` of {model.__name__} must not '
+                    'be nullable.'
+                )
+
+            fields.append(OrderingField(field.name, field.attname, descending, field))
+
+        if not any(field.field.primary_key for field in fields):
+            pk = model._meta.pk
+            fields.append(OrderingField(pk.name, pk.attname, fields[-1].descending, pk))
+
+        return tuple(fields)
+
+    def _prepare(self, request, queryset: QuerySet):
+        fields = self.get_fields(queryset.model)
+        cursor = self._get_cursor(request, fields)
+        page_size = self._get_page_size(request)
+
+        # A previous page is read backwards from its position and reversed.
+        reverse = cursor is not None and cursor.reverse
+        queryset = queryset.order_by(
+            *(
+                f'-{field.attname}' if field.descending != reverse else field.attname
+                for field in fields
+            )
+        )
+
+        if cursor is not None:
+            queryset = queryset.filter(self._get_predicate(fields, cursor))
+
+        return queryset, fields, cursor, page_size
+
+    def _get_predicate(self, fields: tuple[OrderingField, ...], cursor: Cursor) -> Q:
+        """Build `(a > x) OR (a = x AND b > y) OR ...` for the position."""
+        predicate = Q()
+        equal = {}
+
+        for field, value in zip(fields, cursor.position, strict=True):
+            lookup = 'lt' if field.descending != cursor.reverse else 'gt'
+            predicate |= Q(**equal, **{f'{field.attname}__{lookup}': value})
+            equal[field.attname] = value
+
+        return predicate
+
+    def _get_cursor(self, request, fields: tuple[OrderingField, ...]) -> Cursor | None:
+        value = request.GET.get(self.cursor_query_param)
+        if not value:
+            return None
+
+        try:
+            cursor = self.signer.loads(value)
+            if len(cursor.position) != len(fields):
+                raise ValueError
+            position = tuple(
+                field.field.to_python(value)
+                for field, value in zip(fields, cursor.position, strict=True)
+            )
+        except (signing.BadSignature, ValueError, TypeError, DjangoValidationError):
+            raise APIError('Invalid cursor') from None
+
+        return Cursor(position, cursor.reverse)
+
+    def _get_page_size(self, request) -> int:
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.GET[self.page_size_query_param])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+
+        return self.page_size
+
+    def _build_page(
+        self,
+        request,
+        rows: list,
+        fields: tuple[OrderingField, ...],
+        cursor: Cursor | None,
+        page_size: int,
+    ) -> dict:
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if cursor is not None and cursor.reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        next_link = previous_link = None
+        if rows:
+            if has_next:
+                next_link = self._get_link(request, fields, rows[-1], reverse=False)
+            if has_previous:
+                previous_link = self._get_link(request, fields, rows[0], reverse=True)
+
+        return {'results': rows, 'next': next_link, 'previous': previous_link}
+
+    def _get_link(self, request, fields, row, reverse: bool) -> str:
+        if isinstance(row, dict):
+            position = tuple(_get_dict_value(row, field) for field in fields)
+        else:
+            position = tuple(getattr(row, field.attname) for field in fields)
+
+        query = request.GET.copy()
+        query[self.cursor_query_param] = self.signer.dumps(Cursor(position, reverse))
+
+        return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def _get_dict_value(row: dict, field: OrderingField):
+    for key in (field.name, field.attname, 'pk' if field.field.primary_key else None):
+        if key in row:
+            return row[key]
+
+    raise ImproperlyConfigured(
+        f'Cursor ordering field `{field.name}` must be included in the values '
+        'of the paginated QuerySet.'
+    )
@@ -0,0 +1,50 @@
+class Param:
+    """Declares where the value of an endpoint parameter is read from.
+
+    Used as `Annotated` metadata on the parameters of endpoint functions and
+    `Endpoint` methods:
+
+        def get(self, request, page: Annotated[int, Query()] = 1): ...
+
+    `alias` is the name of the value in its source if it differs from the name
+    of the parameter.
+    """
+
+    source: str = None
+
+    def __init__(self, alias: str | None = None):
+        self.alias = alias
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(alias={self.alias!r})'
+
+
+class Path(Param):
+    """The value is read from the URL kwargs."""
+
+    source = 'path'
+
+
+class Query(Param):
+    """The value is read from the query string."""
+
+    source = 'query'
+
+
+class Header(Param):
+    """The value is read from the request headers.
+
+    Underscores in the parameter name are replaced with dashes.
+    """
+
+    source = 'header'
+
+
+class Body(Param):
+    """The value is read from the JSON request body.
+
+    If it is the only body parameter, it receives the whole body. Otherwise
+    each body parameter receives the value of its own key in the body.
+    """
+
+    source = 'body'
@@ -0,0 +1,196 @@
+import codecs
+import json
+import re
+from collections.abc import Iterator
+
+
+WHITESPACE = ' \t\n\r'
+
+# The characters that can follow an item of an array.
+_DELIMITERS = WHITESPACE + ',]'
+
+READ_SIZE = 64 * 1024
+
+# The characters that open or close a value, outside and inside of a string.
+_STRUCTURE_RE = re.compile(r'[\[\]{}"]')
+_STRING_END_RE = re.compile(r'\\.|"', re.DOTALL)
+
+
+class JsonStreamReader:
+    """Reads a JSON document from a stream without loading all of it.
+
+    If the document is an array, its items are decoded one at a time while the
+    stream is read in chunks of `read_size` bytes, so only the current item is
+    held in memory. An item is decoded once the data read can complete it. Any
+    other document is read whole and decoded once.
+
+    ```py
+    reader = JsonStreamReader(request)
+    if reader.is_array:
+        for item in reader:
+            ...
+    else:
+        data = reader.read_value()
+    ```
+
+    :raises ValueError: If the document is not valid JSON.
+    """
+
+    def __init__(self, stream, read_size: int = READ_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        # The scan of the current item, see `_may_be_complete`.
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+
+        self._skip_whitespace()
+        self.is_array = self._peek() == '['
+
+    def __iter__(self) -> Iterator:
+        if not self.is_array:
+            raise ValueError('The JSON document is not an array')
+
+        self._pos += 1
+        self._skip_whitespace()
+
+        if self._peek() == ']':
+            self._pos += 1
+            self._expect_end()
+            return
+
+        while True:
+            yield self._decode_value()
+
+            self._skip_whitespace()
+            char = self._peek()
+            self._pos += 1
+
+            if char == ']':
+                self._expect_end()
+                return
+            if char != ',':
+                raise ValueError(f'Expected `,` or `]` at position {self._pos}')
+
+            self._skip_whitespace()
+            # Drop the decoded items from the buffer.
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+
+    def read_value(self):
+        """Decode the whole document."""
+        text = self._buffer[self._pos :]
+        if not self._eof:
+            # The stream enforces the size limit of the body.
+            text += self._text_decoder.decode(self.stream.read(), final=True)
+            self._eof = True
+        self._buffer = ''
+        self._pos = 0
+
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            raise ValueError('Invalid JSON') from None
+
+    def _decode_value(self):
+        # The numbers and the literals are short, they are decoded after every
+        # chunk. The end of the other values is scanned for.
+        scalar = self._peek() not in '[{"'
+        self._scan_pos = self._pos
+        self._depth = 0
+        self._in_string = False
+
+        while True:
+            if scalar or self._may_be_complete():
+                try:
+                    value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                except json.JSONDecodeError:
+                    if self._eof:
+                        raise ValueError('Invalid JSON') from None
+                else:
+                    # A number may continue in the next chunk, e.g. `1` of `1.5`.
+                    if not scalar or self._eof or self._is_delimiter(end):
+                        self._pos = end
+                        return value
+            elif self._eof:
+                raise ValueError('Invalid JSON')
+
+            self._read()
+
+    def _is_delimiter(self, pos: int) -> bool:
+        return pos < len(self._buffer) and self._buffer[pos] in _DELIMITERS
+
+    def _may_be_complete(self) -> bool:
+        """Scan the data read since the last call for the end of the item.
+
+        Only the brackets and the strings are followed, so every character is
+        scanned once and the item is decoded once it is closed.
+        """
+        buffer = self._buffer
+        pos = self._scan_pos
+
+        while True:
+            if self._in_string:
+                match = _STRING_END_RE.search(buffer, pos)
+                if match is None:
+                    # A backslash at the end escapes the next chunk.
+                    self._scan_pos = len(buffer) - buffer.endswith('\\', pos)
+                    return False
+                pos = match.end()
+                if match.group() == '"':
+                    self._in_string = False
+                    if self._depth <= 0:
+                        self._scan_pos = pos
+                        return True
+                continue
+
+            match = _STRUCTURE_RE.search(buffer, pos)
+            if match is None:
+                self._scan_pos = len(buffer)
+                return self._depth <= 0
+
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth <= 0:
+                    self._scan_pos = pos
+                    return True
+
+    def _read(self):
+        chunk = self.stream.read(self.read_size)
+        if chunk:
+            self._buffer += self._text_decoder.decode(chunk)
+        else:
+            self._buffer += self._text_decoder.decode(b'', final=True)
+            self._eof = True
+
+    def _peek(self) -> str:
+        while self._pos >= len(self._buffer):
+            if self._eof:
+                raise ValueError('Unexpected end of JSON')
+            self._read()
+        return self._buffer[self._pos]
+
+    def _skip_whitespace(self):
+        while True:
+            buffer = self._buffer
+            while self._pos < len(buffer) and buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(buffer) or self._eof:
+                return
+            self._read()
+
+    def _expect_end(self):
+        self._skip_whitespace()
+        if self._pos < len(self._buffer):
+            raise ValueError(f'Extra data at position {self._pos}')
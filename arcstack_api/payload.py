@@ -0,0 +1,153 @@
+import io
+
+from .conf import settings
+from .errors import PayloadTooLargeError, ValidationError
+from .serializers import JsonSerializer
+
+
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+_MISSING = object()
+
+
+class LimitedStream:
+    """Reads a stream and fails as soon as more than `max_size` bytes are read."""
+
+    def __init__(self, stream, max_size: int | None):
+        self.stream = stream
+        self.max_size = max_size
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self.max_size is None:
+            return self.stream.read(size)
+
+        # Read one byte over the limit to know whether the limit is exceeded.
+        remaining = self.max_size - self.size + 1
+        chunk = self.stream.read(remaining if size < 0 else min(size, remaining))
+
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise PayloadTooLargeError()
+
+        return chunk
+
+
+class RequestPayload:
+    """The body of a request, read and parsed lazily, at most once.
+
+    Attached to the requests of the endpoints as `request.payload` with the
+    `MAX_BODY_SIZE` of the endpoint. Every middleware and the endpoint share
+    the parsed body, instead of parsing `request.body` again.
+
+    The size limit is checked with the `Content-Length` header before anything
+    is read, and while the body is read, so an oversized body is rejected with
+    a `413` response without being buffered.
+    """
+
+    __slots__ = ('request', 'max_size', '_data', '_json')
+
+    def __init__(self, request, max_size: int | None):
+        self.request = request
+        self.max_size = max_size
+        self._data = _MISSING
+        self._json = _MISSING
+
+    @property
+    def content_type(self) -> str:
+        content_type = self.request.META.get('CONTENT_TYPE', '')
+        return content_type.partition(';')[0].strip().lower()
+
+    @property
+    def raw(self) -> bytes:
+        """The body as bytes. Also cached as `request.body`."""
+        request = self.request
+
+        if hasattr(request, '_body'):
+            self._check_size(len(request._body))
+            return request._body
+
+        self._check_content_length()
+        body = LimitedStream(request, self.max_size).read()
+
+        # Same as `HttpRequest.body`, so the body can still be read from the
+        # request after it is loaded.
+        request._body = body
+        request._stream = io.BytesIO(body)
+        return body
+
+    @property
+    def data(self):
+        """The body parsed according to its content type.
+
+        JSON bodies are decoded, form bodies are `request.POST` and any other
+        body is returned as bytes. An empty body is `None`.
+        """
+        if self._data is _MISSING:
+            content_type = self.content_type
+            if content_type in FORM_CONTENT_TYPES:
+                self._check_content_length()
+                self._data = self.request.POST
+            elif content_type == 'application/json' or content_type.endswith('+json'):
+                self._data = self.json()
+            else:
+                self._data = self.raw or None
+
+        return self._data
+
+    def json(self):
+        """The body decoded as JSON, regardless of its content type.
+
+        :raises ValidationError: If the body is not valid JSON.
+        """
+        if self._json is _MISSING:
+            raw = self.raw
+            if not raw:
+                self._json = None
+            else:
+                try:
+                    self._json = JsonSerializer.deserialize(raw)
+                except ValueError:
+                    raise ValidationError(
+                        'Invalid input',
+                        errors=[
+                            {
+                                'loc': ['body'],
+                                'msg': 'Invalid JSON',
+                                'type': 'json_invalid',
+                            }
+                        ],
+                    ) from None
+
+        return self._json
+
+    def stream(self):
+        """A file-like object to read the body incrementally within the limit."""
+        if hasattr(self.request, '_body'):
+            return io.BytesIO(self.raw)
+
+        self._check_content_length()
+        return LimitedStream(self.request, self.max_size)
+
+    def _check_content_length(self):
+        try:
+            content_length = int(self.request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        self._check_size(content_length)
+
+    def _check_size(self, size: int):
+        if self.max_size is not None and size > self.max_size:
+            raise PayloadTooLargeError()
+
+
+def get_payload(request) -> RequestPayload:
+    """Return the payload of the request.
+
+    Requests that did not go through an endpoint get a payload with the
+    `API_MAX_BODY_SIZE` limit.
+    """
+    payload = getattr(request, 'payload', None)
+    if payload is None:
+        payload = request.payload = RequestPayload(request, settings.API_MAX_BODY_SIZE)
+    return payload
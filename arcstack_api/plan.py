@@ -0,0 +1,41 @@
+from collections.abc import Callable, Mapping
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+from .signature import EndpointSignature
+
+
+class EndpointPlan(NamedTuple):
+    """Everything about an endpoint that does not change between requests.
+
+    The plan is compiled once when the endpoint is decorated and recompiled
+    only when the middleware of the API are reloaded.
+
+    `max_body_size` is the `MAX_BODY_SIZE` option of the endpoint, or
+    `API_MAX_BODY_SIZE`. `None` disables the limit.
+    """
+
+    endpoint: Callable
+    signature: EndpointSignature
+    is_async: bool
+    login_required: bool
+    options: Mapping[str, Any]
+    endpoint_middleware: tuple[Callable, ...]
+    validator: Callable | None
+    max_body_size: int | None
+    generation: int
+
+
+def get_endpoint_options(endpoint: Callable) -> Mapping[str, Any]:
+    """Collect the upper case attributes declared on the endpoint.
+
+    For class-based endpoints, these are the class attributes of the view class
+    (e.g. `LOGIN_REQUIRED`). For function endpoints, these are the function
+    attributes set by the `api_endpoint` decorator.
+    """
+    target = getattr(endpoint, 'view_class', endpoint)
+    names = dir(target) if isinstance(target, type) else list(vars(target))
+
+    return MappingProxyType(
+        {name: getattr(target, name) for name in names if name.isupper()}
+    )
@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter_ns
+from typing import NamedTuple
+
+from django.db import connections
+
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s|\?')
+IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceededError(Exception):
+    """Raised when an endpoint runs more queries than its `QUERY_BUDGET`.
+
+    Only raised with `API_QUERY_BUDGET_STRICT`, e.g. in the tests.
+    """
+
+
+@lru_cache(maxsize=1024)
+def get_query_shape(sql: str) -> str:
+    """Return the SQL with the values replaced, to group the same queries.
+
+    The queries of an N+1 only differ by their parameters, so they have the
+    same shape. The `IN` lists of any length have the same shape too.
+    """
+    shape = STRING_RE.sub('?', sql)
+    shape = NUMBER_RE.sub('?', shape)
+    shape = PLACEHOLDER_RE.sub('?', shape)
+    shape = IN_LIST_RE.sub('IN (...)', shape)
+    return WHITESPACE_RE.sub(' ', shape).strip()
+
+
+class QueryStats(NamedTuple):
+    count: int
+    duration_ns: int
+    # The shapes run at least `API_QUERY_REPEAT_THRESHOLD` times, with their
+    # number of runs, most repeated first.
+    repeated: list[tuple[str, int]]
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1_000_000
+
+
+class QueryRecorder:
+    """Counts and times the queries run while it is installed.
+
+    The queries are attributed with a context variable, so the concurrent
+    async requests sharing the thread of the async ORM only count their own
+    queries.
+    """
+
+    __slots__ = ('count', 'duration_ns', 'sql')
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ns = 0
+        self.sql: Counter[str] = Counter()
+
+    def add(self, sql: str, duration_ns: int):
+        self.duration_ns += duration_ns
+        self.count += 1
+        # The shapes are computed once the request is done.
+        self.sql[sql] += 1
+
+    @contextmanager
+    def install(self) -> Iterator[None]:
+        """Record the queries of the current context, sync or async.
+
+        The async requests install the execute wrapper in the thread of the
+        async ORM first, with `install_execute_wrapper`.
+        """
+        install_execute_wrapper()
+        token = _recorders.set((*_recorders.get(), self))
+        try:
+            yield
+        finally:
+            _recorders.reset(token)
+
+    def get_stats(self, repeat_threshold: int) -> QueryStats:
+        shapes: Counter[str] = Counter()
+        for sql, count in self.sql.items():
+            shapes[get_query_shape(sql)] += count
+
+        repeated = [
+            (shape, count)
+            for shape, count in shapes.most_common()
+            if count >= repeat_threshold
+        ]
+        return QueryStats(self.count, self.duration_ns, repeated)
+
+
+# The recorders of the current request, the outer requests too, e.g. of a batch.
+_recorders: ContextVar[tuple[QueryRecorder, ...]] = ContextVar(
+    'arcstack_query_recorders', default=()
+)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+
+    start = perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ns = perf_counter_ns() - start
+        for recorder in recorders:
+            recorder.add(sql, duration_ns)
+
+
+def install_execute_wrapper():
+    """Install the recording execute wrapper on the connections of the thread.
+
+    Installed once per connection and left in place, it only records when a
+    recorder is installed in the context of the query.
+    """
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            # First, so the `execute_wrapper()` blocks pop their own wrapper.
+            connection.execute_wrappers.insert(0, _record_query)
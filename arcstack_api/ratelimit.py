@@ -0,0 +1,178 @@
+import math
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from django.core.cache import caches
+
+from .conf import settings
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([smhd])[a-z]*\s*$')
+
+
+class Rate(NamedTuple):
+    """`limit` requests per `period` seconds."""
+
+    limit: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        """The time it takes to get one request back."""
+        return self.period / self.limit
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the whole limit is available again.
+    reset: float
+    # Seconds until the next request is allowed, `0` if allowed.
+    retry_after: float
+
+
+def parse_rate(rate) -> Rate:
+    """Parse a rate like `'100/m'`, `'10/5s'` or `(100, 60)`."""
+    if isinstance(rate, Rate):
+        return rate
+    if isinstance(rate, tuple | list):
+        limit, period = rate
+        return Rate(int(limit), float(period))
+
+    match = RATE_RE.match(rate) if isinstance(rate, str) else None
+    if match is None or int(match[1]) < 1:
+        raise ValueError(f'Invalid rate: {rate!r}')
+
+    limit, multiplier, unit = match.groups()
+    return Rate(int(limit), int(multiplier or 1) * PERIODS[unit])
+
+
+def gcra(
+    tat: float | None, now: float, rate: Rate
+) -> tuple[float | None, RateLimitResult]:
+    """Apply the generic cell rate algorithm to one request.
+
+    `tat` is the theoretical arrival time stored for the key, `None` for a new
+    key. It is the time the bucket is full again, so a bucket holds a single
+    number and a request is a constant amount of work. Returns the new `tat`
+    to store, `None` if the request is denied, and the result.
+    """
+    interval = rate.interval
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + interval
+    allow_at = new_tat - rate.period
+
+    if now < allow_at:
+        return None, RateLimitResult(
+            allowed=False,
+            limit=rate.limit,
+            remaining=0,
+            reset=tat - now,
+            retry_after=allow_at - now,
+        )
+
+    remaining = int((now - allow_at) / interval + 1e-9)
+    return new_tat, RateLimitResult(
+        allowed=True,
+        limit=rate.limit,
+        remaining=min(remaining, rate.limit - 1),
+        reset=new_tat - now,
+        retry_after=0,
+    )
+
+
+class MemoryRateLimitStore:
+    """Keeps the buckets in the process, split in shards with their own lock.
+
+    The requests of different keys rarely wait for the same lock, and a lock
+    is held only for the few operations of `gcra`. The limits are per process.
+    """
+
+    def __init__(self, shards: int = 16, max_entries: int = 100_000):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_entries_per_shard = max(max_entries // shards, 1)
+
+    def hit(self, key: str, rate: Rate) -> RateLimitResult:
+        buckets, lock = self.shards[hash(key) % len(self.shards)]
+        now = time.monotonic()
+
+        with lock:
+            new_tat, result = gcra(buckets.get(key), now, rate)
+            if new_tat is not None:
+                buckets[key] = new_tat
+                if len(buckets) > self.max_entries_per_shard:
+                    self._prune(buckets, now)
+
+        return result
+
+    async def ahit(self, key: str, rate: Rate) -> RateLimitResult:
+        return self.hit(key, rate)
+
+    def clear(self):
+        for buckets, lock in self.shards:
+            with lock:
+                buckets.clear()
+
+    def _prune(self, buckets: dict, now: float):
+        # A bucket with a `tat` in the past is full, the same as no bucket.
+        for key in [key for key, tat in buckets.items() if tat <= now]:
+            del buckets[key]
+
+        # Then drop the oldest buckets.
+        while len(buckets) > self.max_entries_per_shard:
+            del buckets[next(iter(buckets))]
+
+
+class CacheRateLimitStore:
+    """Keeps the buckets in a Django cache, shared by all the workers.
+
+    Django caches have no compare-and-set, so concurrent requests of the same
+    client in different workers may both be allowed. The limit is approximate
+    under such races.
+    """
+
+    def __init__(self, backend: str, key_prefix: str = ''):
+        self.cache = caches[backend]
+        self.key_prefix = key_prefix
+
+    def hit(self, key: str, rate: Rate) -> RateLimitResult:
+        key = f'{self.key_prefix}{key}'
+        new_tat, result = gcra(self.cache.get(key), time.time(), rate)
+        if new_tat is not None:
+            self.cache.set(key, new_tat, math.ceil(result.reset) + 1)
+        return result
+
+    async def ahit(self, key: str, rate: Rate) -> RateLimitResult:
+        key = f'{self.key_prefix}{key}'
+        new_tat, result = gcra(await self.cache.aget(key), time.time(), rate)
+        if new_tat is not None:
+            await self.cache.aset(key, new_tat, math.ceil(result.reset) + 1)
+        return result
+
+
+_rate_limit_stores: dict = {}
+
+
+def get_rate_limit_store() -> MemoryRateLimitStore | CacheRateLimitStore:
+    """Return the rate limit store configured in the settings.
+
+    The buckets are kept in the process, unless `API_RATE_LIMIT_BACKEND` is the
+    alias of a Django cache.
+    """
+    backend = settings.API_RATE_LIMIT_BACKEND
+    key = (backend, settings.API_RATE_LIMIT_SHARDS, settings.API_RATE_LIMIT_KEY_PREFIX)
+
+    store = _rate_limit_stores.get(key)
+    if store is None:
+        if backend:
+            store = CacheRateLimitStore(backend, settings.API_RATE_LIMIT_KEY_PREFIX)
+        else:
+            store = MemoryRateLimitStore(settings.API_RATE_LIMIT_SHARDS)
+        _rate_limit_stores[key] = store
+
+    return store
@@ -1,3 +1,5 @@
+import json
+
 from django.http import HttpResponse
 from django.http import JsonResponse as DjangoJsonResponse
 
@@ -13,30 +15,59 @@ class JsonResponse(DjangoJsonResponse):
         )
 
 
-class InternalServerErrorResponse(HttpResponse):
-    def __init__(self):
-        super().__init__(content=b'Internal server error', status=500)
+class StaticErrorResponse(HttpResponse):
+    """An error response with a pre-rendered body in the error envelope.
 
+    The body does not depend on the request, so it is rendered once when the
+    class is defined instead of being serialized for every error.
+    """
 
-class MethodNotAllowedResponse(HttpResponse):
-    def __init__(self):
-        super().__init__(
-            content=b'Method not allowed',
-            status=405,
-        )
+    status_code = 500
+    detail = ''
+    body = b''
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.body = json.dumps({'detail': cls.detail}).encode()
 
-class NotFoundResponse(HttpResponse):
     def __init__(self):
         super().__init__(
-            content=b'Not found',
-            status=404,
+            content=self.body,
+            content_type='application/json',
+            status=self.status_code,
         )
 
 
-class UnauthorizedResponse(HttpResponse):
-    def __init__(self):
-        super().__init__(
-            content=b'Unauthorized',
-            status=401,
-        )
+class InternalServerErrorResponse(StaticErrorResponse):
+    status_code = 500
+    detail = 'Internal server error'
+
+
+class MethodNotAllowedResponse(StaticErrorResponse):
+    status_code = 405
+    detail = 'Method not allowed'
+
+
+class NotFoundResponse(StaticErrorResponse):
+    status_code = 404
+    detail = 'Not found'
+
+
+class PayloadTooLargeResponse(StaticErrorResponse):
+    status_code = 413
+    detail = 'Payload too large'
+
+
+class ServiceUnavailableResponse(StaticErrorResponse):
+    status_code = 503
+    detail = 'Service unavailable'
+
+
+class TooManyRequestsResponse(StaticErrorResponse):
+    status_code = 429
+    detail = 'Too many requests'
+
+
+class UnauthorizedResponse(StaticErrorResponse):
+    status_code = 401
+    detail = 'Unauthorized'
@@ -1,8 +1,128 @@
 import json
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+from itertools import islice
 
 from django.utils.module_loading import import_string
 
 from .conf import settings
+from .logger import logger
+
+
+class JsonBackend:
+    """Base class for the JSON backends.
+
+    A backend is created once per `API_JSON_BACKEND` and `API_JSON_ENCODER`
+    combination and reused for every payload. `dumps` must return `bytes` and
+    raise a `TypeError` when the data can not be serialized.
+    """
+
+    # Separator between the items of an array, used to join streamed chunks.
+    item_separator = b','
+
+    def __init__(self, encoder: type[json.JSONEncoder]):
+        self.encoder = encoder
+
+    def dumps(self, data) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class StdlibJsonBackend(JsonBackend):
+    """Encodes with the standard library `json` module and the configured encoder."""
+
+    def __init__(self, encoder):
+        super().__init__(encoder)
+        # Encoder instances are stateless between `encode` calls.
+        instance = encoder()
+        self._encode = instance.encode
+        self.item_separator = instance.item_separator.encode('utf-8')
+
+    def dumps(self, data) -> bytes:
+        return self._encode(data).encode('utf-8')
+
+
+class OrjsonBackend(JsonBackend):
+    """Encodes with `orjson`.
+
+    `datetime` and dataclass instances are passed through to the configured
+    encoder so the output matches `DjangoJSONEncoder`.
+    """
+
+    def __init__(self, encoder):
+        import orjson
+
+        super().__init__(encoder)
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+        self._default = encoder().default
+        self._option = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def dumps(self, data) -> bytes:
+        return self._dumps(data, default=self._default, option=self._option)
+
+    def loads(self, data):
+        return self._loads(data)
+
+
+class MsgspecBackend(JsonBackend):
+    """Encodes with `msgspec`.
+
+    `Decimal` and `UUID` values are encoded as strings like `DjangoJSONEncoder`.
+    The other types `msgspec` does not know are passed to the configured
+    encoder. `msgspec` encodes the `datetime`, `time` and `timedelta` values
+    itself, with microseconds and `timedelta` values in seconds.
+    """
+
+    def __init__(self, encoder):
+        import msgspec
+
+        super().__init__(encoder)
+        self._encode = msgspec.json.Encoder(
+            enc_hook=encoder().default,
+            decimal_format='string',
+        ).encode
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, data) -> bytes:
+        return self._encode(data)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+
+_backends: dict[tuple[str, str], JsonBackend] = {}
+
+
+def get_json_backend() -> JsonBackend:
+    """Return the JSON backend configured in the settings.
+
+    The backend and the encoder are imported only once per configuration.
+    """
+    key = (settings.API_JSON_BACKEND, settings.API_JSON_ENCODER)
+    backend = _backends.get(key)
+    if backend is None:
+        backend = _backends[key] = _load_json_backend(*key)
+    return backend
+
+
+def _load_json_backend(backend_path: str, encoder_path: str) -> JsonBackend:
+    backend_class = import_string(backend_path)
+    encoder = import_string(encoder_path)
+
+    try:
+        return backend_class(encoder)
+    except ImportError as e:
+        logger.warning(
+            f'JSON backend {backend_path} is not available ({e}). '
+            'Falling back to the standard library backend.'
+        )
+        return StdlibJsonBackend(encoder)
 
 
 class JsonSerializer:
@@ -10,6 +130,64 @@ class JsonSerializer:
     A utility class for serializing and deserializing JSON data.
     """
 
+    @classmethod
+    def encode(cls, data) -> bytes:
+        """
+        Serialize the data to JSON encoded bytes in a single pass.
+
+        :return: JSON bytes representation of the data.
+        :raises TypeError: If the data is not JSON serializable.
+        """
+        return get_json_backend().dumps(data)
+
+    @classmethod
+    def iter_encode(cls, iterable: Iterable, chunk_size: int) -> Iterator[bytes]:
+        """
+        Serialize an iterable to a JSON array incrementally.
+
+        Every `chunk_size` items are encoded together and yielded as a chunk, so
+        only one chunk is held in memory at a time. The first chunk always
+        contains the opening bracket.
+
+        :return: Iterator of JSON bytes chunks.
+        :raises TypeError: If an item is not JSON serializable.
+        """
+        backend = get_json_backend()
+        iterator = iter(iterable)
+        prefix = b'['
+
+        while batch := list(islice(iterator, chunk_size)):
+            yield prefix + backend.dumps(batch)[1:-1]
+            prefix = backend.item_separator
+
+        yield b'[]' if prefix == b'[' else b']'
+
+    @classmethod
+    async def aiter_encode(
+        cls, iterable: AsyncIterable, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Async version of `iter_encode` for async iterables.
+
+        :return: Async iterator of JSON bytes chunks.
+        """
+        backend = get_json_backend()
+        prefix = b'['
+        batch = []
+
+        async for item in iterable:
+            batch.append(item)
+            if len(batch) == chunk_size:
+                yield prefix + backend.dumps(batch)[1:-1]
+                prefix = backend.item_separator
+                batch = []
+
+        if batch:
+            yield prefix + backend.dumps(batch)[1:-1]
+            prefix = backend.item_separator
+
+        yield b'[]' if prefix == b'[' else b']'
+
     @classmethod
     def serialize(cls, data):
         """
@@ -17,7 +195,7 @@ class JsonSerializer:
 
         :return: JSON string representation of the data.
         """
-        return json.dumps(data, cls=cls._get_default_encoder())
+        return cls.encode(data).decode('utf-8')
 
     @classmethod
     def deserialize(cls, data):
@@ -27,18 +205,21 @@ class JsonSerializer:
         :param data: JSON string to deserialize.
         :return: Deserialized Python object.
         """
-        return json.loads(data)
+        return get_json_backend().loads(data)
 
     @classmethod
     def is_json_serializable(cls, data):
         """
         Check if the data can be serialized to JSON.
 
+        Prefer `encode` and catching `TypeError` when the encoded data is
+        needed, this method encodes the data just to throw it away.
+
         :param data: Data to check for JSON serialization.
         :return: True if data is JSON serializable, False otherwise.
         """
         try:
-            cls.serialize(data)
+            cls.encode(data)
         except TypeError:
             return False
         return True
@@ -50,4 +231,4 @@ class JsonSerializer:
 
         :return: Default JSON encoder class.
         """
-        return import_string(settings.API_JSON_ENCODER)
+        return get_json_backend().encoder
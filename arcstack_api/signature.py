@@ -1,4 +1,5 @@
 import inspect
+import typing
 from collections import namedtuple
 from collections.abc import Callable
 
@@ -18,3 +19,54 @@ class EndpointSignature:
         self.is_class_based = endpoint_cls is not None
 
         self.signature = inspect.signature(endpoint_cls or endpoint)
+
+        if self.is_class_based:
+            self.methods = {
+                method: self._get_method_signature(
+                    method, getattr(endpoint_cls, method), skip=2
+                )
+                for method in endpoint_cls.http_method_names
+                if method != 'options' and hasattr(endpoint_cls, method)
+            }
+        else:
+            self.methods = {
+                None: self._get_method_signature(
+                    endpoint.__name__, endpoint, skip=1, signature=self.signature
+                )
+            }
+
+    def get_method(self, method: str) -> MethodSignature | None:
+        """Return the signature of the function handling the HTTP method."""
+        if self.is_class_based:
+            return self.methods.get(method.lower())
+        return self.methods[None]
+
+    def _get_method_signature(
+        self, name: str, func: Callable, skip: int, signature=None
+    ) -> MethodSignature:
+        """Build the signature of an endpoint function or `Endpoint` method.
+
+        The first `skip` parameters (`self` and `request`) and the variadic
+        parameters are not part of the `params`. Annotations are resolved with
+        their `Annotated` metadata.
+        """
+        signature = signature or inspect.signature(func)
+
+        try:
+            hints = typing.get_type_hints(func, include_extras=True)
+        except (NameError, TypeError):
+            hints = {}
+
+        params = [
+            param.replace(annotation=hints.get(param.name, param.annotation))
+            for param in list(signature.parameters.values())[skip:]
+            if param.kind
+            not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+        ]
+
+        return MethodSignature(
+            name=name,
+            signature=signature,
+            params=params,
+            return_annotation=hints.get('return', signature.return_annotation),
+        )
@@ -1,4 +1,69 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+
+
 def is_class_based_endpoint(endpoint):
     from .endpoint import Endpoint
 
     return isinstance(endpoint, type) and issubclass(endpoint, Endpoint)
+
+
+def get_endpoint_name(endpoint) -> str:
+    """Return the dotted path of the function or the view class of the endpoint."""
+    target = getattr(endpoint, 'view_class', endpoint)
+    return f'{target.__module__}.{target.__qualname__}'
+
+
+async def aget_user(request):
+    """Return the user of the request without blocking the event loop.
+
+    `request.auser()` is used when `AuthenticationMiddleware` provides it,
+    otherwise the lazy user is resolved in a thread.
+    """
+    if hasattr(request, 'auser'):
+        return await request.auser()
+
+    def get_user():
+        user = request.user
+        # Evaluate the lazy object in this thread.
+        user.is_authenticated  # noqa: B018
+        return user
+
+    return await sync_to_async(get_user, thread_sensitive=True)()
+
+
+def adapt_method_mode(is_async, method, method_is_async=None):
+    """Adapt a method to be in the correct "mode".
+
+    - If is_async is False:
+      - Synchronous methods are left alone
+      - Asynchronous methods are wrapped with async_to_sync
+    - If is_async is True:
+      - Synchronous methods are wrapped with sync_to_async()
+      - Asynchronous methods are left alone
+    """
+    if method_is_async is None:
+        method_is_async = iscoroutinefunction(method)
+    if is_async and not method_is_async:
+        return sync_to_async(method, thread_sensitive=True)
+    elif not is_async and method_is_async:
+        return async_to_sync(method)
+    return method
+
+
+def get_middleware_hook(middleware, name, is_async=False):
+    """Return the `name` hook of the middleware adapted to the requested mode.
+
+    In async mode, a native coroutine variant of the hook prefixed with `a`
+    (e.g. `aprocess_request`) is preferred over adapting the sync hook so the
+    call does not need a thread. Returns `None` if the hook is not defined.
+    """
+    if is_async:
+        async_hook = getattr(middleware, f'a{name}', None)
+        if async_hook is not None:
+            return async_hook
+
+    hook = getattr(middleware, name, None)
+    if hook is None:
+        return None
+
+    return adapt_method_mode(is_async, hook)
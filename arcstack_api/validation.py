@@ -0,0 +1,282 @@
+import inspect
+import types
+import typing
+from typing import Annotated, Any, NamedTuple
+
+from django.core.exceptions import ImproperlyConfigured
+from typing_extensions import NotRequired, TypedDict
+
+from .errors import ValidationError
+from .params import Param
+from .payload import get_payload
+from .signature import EndpointSignature, MethodSignature
+
+
+try:
+    import pydantic
+except ImportError:  # pragma: no cover
+    pydantic = None
+
+
+LIST_TYPES = (list, tuple, set, frozenset)
+
+_MISSING = object()
+
+_POSITIONAL_KINDS = (
+    inspect.Parameter.POSITIONAL_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+)
+
+
+class ParamSpec(NamedTuple):
+    name: str
+    # `None` means the URL args if the value is there, otherwise the query string.
+    source: str | None
+    alias: str
+    is_list: bool
+
+
+class MethodValidator:
+    """Validates the inputs of one endpoint function or `Endpoint` method.
+
+    The pydantic `TypeAdapter` is built once when the endpoint is compiled.
+    Calling the validator only collects the raw values from the request and
+    validates them in a single pass.
+    """
+
+    __slots__ = ('params', 'positional', 'adapter', 'embed_body')
+
+    def __init__(
+        self,
+        params: list[ParamSpec],
+        positional: tuple[str, ...],
+        adapter,
+        embed_body: bool,
+    ):
+        self.params = params
+        # The names of the parameters that take the positional URL args.
+        self.positional = positional
+        self.adapter = adapter
+        self.embed_body = embed_body
+
+    def __call__(self, request, args: tuple, kwargs: dict) -> tuple[tuple, dict]:
+        path = kwargs
+        if args:
+            path = {**dict(zip(self.positional, args, strict=False)), **kwargs}
+        data = {}
+        body = _MISSING
+
+        for param in self.params:
+            source = param.source
+            if source is None:
+                source = 'path' if param.name in path else 'query'
+
+            if source == 'path':
+                if param.name in path:
+                    data[param.name] = path[param.name]
+            elif source == 'query':
+                if param.alias in request.GET:
+                    data[param.name] = (
+                        request.GET.getlist(param.alias)
+                        if param.is_list
+                        else request.GET[param.alias]
+                    )
+            elif source == 'header':
+                if param.alias in request.headers:
+                    data[param.name] = request.headers[param.alias]
+            else:
+                if body is _MISSING:
+                    body = _get_json_body(request)
+                if not self.embed_body:
+                    data[param.name] = body
+                elif isinstance(body, dict) and param.alias in body:
+                    data[param.name] = body[param.alias]
+
+        try:
+            validated = self.adapter.validate_python(data)
+        except pydantic.ValidationError as e:
+            raise ValidationError(
+                'Invalid input', errors=self._format_errors(e, path)
+            ) from None
+
+        if args:
+            # The extra args are passed to the `*args` of the endpoint.
+            args = (
+                *(
+                    validated.pop(name, value)
+                    for name, value in zip(self.positional, args, strict=False)
+                ),
+                *args[len(self.positional) :],
+            )
+        return args, {**kwargs, **validated}
+
+    def _format_errors(self, error, path: dict) -> list[dict]:
+        sources = {
+            param.name: param.source or ('path' if param.name in path else 'query')
+            for param in self.params
+        }
+        return [
+            {
+                'loc': [sources.get(e['loc'][0], 'body'), *e['loc']],
+                'msg': e['msg'],
+                'type': e['type'],
+            }
+            for e in error.errors(include_url=False)
+        ]
+
+
+class EndpointValidator:
+    """Dispatches to the `MethodValidator` of the HTTP method of the request."""
+
+    __slots__ = ('signature', 'validators')
+
+    def __init__(
+        self,
+        signature: EndpointSignature,
+        validators: dict[str | None, MethodValidator],
+    ):
+        self.signature = signature
+        self.validators = validators
+
+    def __call__(self, request, args: tuple, kwargs: dict) -> tuple[tuple, dict]:
+        key = request.method.lower() if self.signature.is_class_based else None
+        validator = self.validators.get(key)
+        if validator is None:
+            return args, kwargs
+        return validator(request, args, kwargs)
+
+
+def compile_validator(signature: EndpointSignature) -> EndpointValidator | None:
+    """Build the input validators of an endpoint.
+
+    Returns `None` if none of the parameters of the endpoint are annotated, so
+    endpoints without annotations do not pay for validation. Without pydantic,
+    only the endpoints that use the `Param` markers fail to compile.
+    """
+    validators = {}
+
+    for key, method in signature.methods.items():
+        validator = _compile_method_validator(method)
+        if validator is not None:
+            validators[key] = validator
+
+    if not validators:
+        return None
+
+    return EndpointValidator(signature, validators)
+
+
+def _compile_method_validator(method: MethodSignature) -> MethodValidator | None:
+    params = []
+    annotations = {}
+    fields = {}
+
+    for param in method.params:
+        if param.annotation is inspect.Parameter.empty:
+            continue
+
+        annotation, marker = split_marker(param.annotation)
+
+        if pydantic is None:
+            if marker is not None:
+                raise ImproperlyConfigured(
+                    f'`{method.name}` declares the `{param.name}` parameter with '
+                    f'{marker!r} but pydantic is not installed.'
+                )
+            continue
+
+        source = marker.source if marker is not None else None
+        if source is None and is_model(annotation):
+            source = 'body'
+
+        alias = marker.alias if marker is not None and marker.alias else None
+        if alias is None:
+            alias = param.name.replace('_', '-') if source == 'header' else param.name
+
+        params.append(
+            ParamSpec(
+                name=param.name,
+                source=source,
+                alias=alias,
+                is_list=is_list_type(annotation),
+            )
+        )
+        annotations[param.name] = annotation
+        fields[param.name] = (
+            annotation
+            if param.default is inspect.Parameter.empty
+            else NotRequired[annotation]
+        )
+
+    if not params:
+        return None
+
+    try:
+        adapter = pydantic.TypeAdapter(TypedDict(f'{method.name}_params', fields))
+    except pydantic.PydanticUserError:
+        # Not all the types are types pydantic knows, e.g. a `QuerySet`. Those
+        # parameters are passed as they are.
+        fields = {
+            name: field
+            for name, field in fields.items()
+            if _is_supported(annotations[name])
+        }
+        params = [param for param in params if param.name in fields]
+        if not params:
+            return None
+        adapter = pydantic.TypeAdapter(TypedDict(f'{method.name}_params', fields))
+
+    body_params = [param for param in params if param.source == 'body']
+
+    return MethodValidator(
+        params=params,
+        positional=tuple(
+            param.name for param in method.params if param.kind in _POSITIONAL_KINDS
+        ),
+        adapter=adapter,
+        embed_body=len(body_params) > 1,
+    )
+
+
+def split_marker(annotation) -> tuple[Any, Param | None]:
+    """Separate the `Param` marker from the other `Annotated` metadata."""
+    if typing.get_origin(annotation) is not Annotated:
+        return annotation, None
+
+    base, *metadata = typing.get_args(annotation)
+    markers = [m for m in metadata if isinstance(m, Param)]
+    metadata = [m for m in metadata if not isinstance(m, Param)]
+
+    if metadata:
+        base = Annotated[(base, *metadata)]
+
+    return base, markers[0] if markers else None
+
+
+def is_list_type(annotation) -> bool:
+    """Check if the annotation is a list type, also when it is optional."""
+    if typing.get_origin(annotation) is Annotated:
+        annotation = typing.get_args(annotation)[0]
+
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        return any(is_list_type(arg) for arg in typing.get_args(annotation))
+
+    return origin in LIST_TYPES or annotation in LIST_TYPES
+
+
+def is_model(annotation) -> bool:
+    """Check if the annotation is a pydantic model, pydantic must be installed."""
+    return isinstance(annotation, type) and issubclass(annotation, pydantic.BaseModel)
+
+
+def _is_supported(annotation) -> bool:
+    try:
+        pydantic.TypeAdapter(annotation)
+    except pydantic.PydanticUserError:
+        return False
+    return True
+
+
+def _get_json_body(request):
+    return get_payload(request).json()
@@ -0,0 +1,54 @@
+from collections.abc import Callable, Iterable, Iterator
+
+from django.urls import URLResolver, get_resolver
+
+from .api import get_apis
+from .plan import EndpointPlan
+
+
+def iter_routes(urlconf: str | None = None) -> Iterator[tuple[tuple, Callable]]:
+    """Yield the patterns leading to every view of the URLconf, and the view."""
+    yield from _iter_patterns(get_resolver(urlconf).url_patterns, ())
+
+
+def iter_endpoints(urlconf: str | None = None) -> Iterator:
+    """Yield the API endpoints of the URLconf, included ones too."""
+    for _, callback in iter_routes(urlconf):
+        if hasattr(callback, 'arcstack_api'):
+            yield callback
+
+
+def warmup(urlconf: str | None = None) -> list[EndpointPlan]:
+    """Load the middleware of the APIs and compile the plans of the endpoints.
+
+    Run before the workers accept requests, so the first requests do not pay
+    for importing the middleware and compiling the plans. The OpenAPI documents
+    routed in the URLconf are generated too.
+    """
+    from .openapi import OpenAPISchemaView
+
+    for api in get_apis():
+        api.ensure_loaded()
+
+    plans = {}
+    schema_views = []
+    for _, callback in iter_routes(urlconf):
+        if isinstance(callback, OpenAPISchemaView):
+            schema_views.append(callback)
+        # The same endpoint can be routed more than once.
+        elif hasattr(callback, 'arcstack_api') and callback not in plans:
+            plans[callback] = callback.arcstack_api.prepare(callback)
+
+    # Generated once the plans are compiled, they describe the endpoints.
+    for view in schema_views:
+        view.get_document()
+
+    return list(plans.values())
+
+
+def _iter_patterns(patterns: Iterable, parents: tuple) -> Iterator:
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_patterns(pattern.url_patterns, (*parents, pattern.pattern))
+        else:
+            yield (*parents, pattern.pattern), pattern.callback
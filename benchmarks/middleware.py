@@ -0,0 +1,21 @@
+from arcstack_api.mixins import MiddlewareMixin
+
+
+class NoopMiddleware(MiddlewareMixin):
+    """Middleware with request and response hooks that do nothing.
+
+    Used to measure the cost of every extra layer in the middleware chain.
+    `instances` counts the loaded layers, to check the depth of the chains.
+    """
+
+    instances = 0
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        NoopMiddleware.instances += 1
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
@@ -0,0 +1,330 @@
+"""In-process micro-benchmarks of the API dispatch path.
+
+The endpoints are called directly with `RequestFactory` requests, so the
+numbers only include the work done by `arcstack_api` (and by Django for the
+plain view baselines), not the HTTP server or the Django request handler.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run                      # run and print the results
+    python -m benchmarks.run -k depth4            # run the matching benchmarks
+    python -m benchmarks.run --save main          # store benchmarks/baselines/main.json
+    python -m benchmarks.run --compare main       # fail if slower than the baseline
+
+A benchmark regresses when its median time per call is more than `--threshold`
+(default 10%) slower than the baseline. The exit code is 1 if any benchmark
+regressed.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+import django
+from django.conf import settings
+
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+
+STACK_DEPTHS = [1, 4, 8]
+
+EXECUTORS = ['nested', 'flat']
+
+ENDPOINT_KINDS = ['function', 'class']
+
+SMALL_DICT = {'id': 1, 'name': 'Item', 'active': True}
+
+LARGE_LIST = [
+    {'id': i, 'name': f'Item {i}', 'price': i * 1.5, 'tags': ['a', 'b']}
+    for i in range(1000)
+]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    # Settings overridden while the benchmark is set up and measured.
+    settings: dict | None = None
+    # Called after the measurement, raises if it did not measure the setup.
+    check: Callable[[], None] | None = None
+
+
+def configure_django():
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY='benchmarks',
+        ALLOWED_HOSTS=['testserver'],
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+        ],
+        LOGGING_CONFIG=None,
+    )
+    django.setup()
+
+
+def response_values():
+    from django.http import HttpResponse
+
+    from arcstack_api import APIError
+
+    def raise_api_error():
+        raise APIError('Bad request')
+
+    return {
+        'str': lambda: 'Hello, world!',
+        'small_dict': lambda: SMALL_DICT,
+        'large_list': lambda: LARGE_LIST,
+        'http_response': lambda: HttpResponse(b'Hello, world!'),
+        'api_error': raise_api_error,
+    }
+
+
+def middleware_stack(depth: int) -> list[str]:
+    if depth == 0:
+        return []
+    return ['arcstack_api.middleware.CommonMiddleware'] + [
+        'benchmarks.middleware.NoopMiddleware'
+    ] * (depth - 1)
+
+
+def api_settings(depth: int, executor: str) -> dict:
+    return {
+        'API_MIDDLEWARE': middleware_stack(depth),
+        'API_MIDDLEWARE_EXECUTOR': executor,
+    }
+
+
+def make_api():
+    """Load an API with the settings of the running benchmark.
+
+    The APIs reload when an `API_` setting changes, so the settings stay
+    overridden until the measurement is done.
+    """
+    from arcstack_api.api import ArcStackAPI
+
+    from .middleware import NoopMiddleware
+
+    NoopMiddleware.instances = 0
+    return ArcStackAPI(lazy=False)
+
+
+def check_stack(depth: int, executor: str):
+    """Raise if the measured API did not run the expected chains."""
+    from django.conf import settings
+
+    from .middleware import NoopMiddleware
+
+    # The sync and the async chains are both loaded, once.
+    expected = 2 * max(depth - 1, 0)
+    if NoopMiddleware.instances != expected:
+        raise RuntimeError(
+            f'Expected {expected} NoopMiddleware layers, '
+            f'{NoopMiddleware.instances} were loaded.'
+        )
+    if settings.API_MIDDLEWARE_EXECUTOR != executor:
+        raise RuntimeError(f'Expected the {executor} executor.')
+
+
+def make_endpoint(api, kind: str, value: Callable):
+    from arcstack_api import Endpoint
+
+    if kind == 'function':
+
+        def endpoint(request):
+            return value()
+
+        return api(endpoint)
+
+    class BenchmarkEndpoint(Endpoint):
+        def get(self, request):
+            return value()
+
+    return api(BenchmarkEndpoint.as_view())
+
+
+def bind(endpoint: Callable) -> Callable[[], object]:
+    from django.test import RequestFactory
+
+    request = RequestFactory().get('/api/benchmark')
+    return lambda: endpoint(request)
+
+
+def django_view_benchmarks() -> list[Benchmark]:
+    from django.http import HttpResponse, JsonResponse
+
+    views = {
+        'str': lambda request: HttpResponse('Hello, world!', content_type='text/plain'),
+        'small_dict': lambda request: JsonResponse(SMALL_DICT),
+        'large_list': lambda request: JsonResponse(LARGE_LIST, safe=False),
+        'http_response': lambda request: HttpResponse(b'Hello, world!'),
+    }
+
+    return [
+        Benchmark(f'django.view.{name}', lambda view=view: bind(view))
+        for name, view in views.items()
+    ]
+
+
+def arcstack_benchmarks() -> list[Benchmark]:
+    benchmarks = []
+    values = response_values()
+
+    for executor in EXECUTORS:
+        for kind in ENDPOINT_KINDS:
+            # Without middleware, only `HttpResponse` returns are valid responses.
+            benchmarks.append(
+                Benchmark(
+                    f'arcstack.{executor}.depth0.{kind}.http_response',
+                    lambda kind=kind: bind(
+                        make_endpoint(make_api(), kind, values['http_response'])
+                    ),
+                    api_settings(0, executor),
+                    lambda executor=executor: check_stack(0, executor),
+                )
+            )
+
+            for depth in STACK_DEPTHS:
+                for name, value in values.items():
+                    benchmarks.append(
+                        Benchmark(
+                            f'arcstack.{executor}.depth{depth}.{kind}.{name}',
+                            lambda kind=kind, value=value: bind(
+                                make_endpoint(make_api(), kind, value)
+                            ),
+                            api_settings(depth, executor),
+                            lambda depth=depth, executor=executor: check_stack(
+                                depth, executor
+                            ),
+                        )
+                    )
+
+    return benchmarks
+
+
+def autorange(func: Callable[[], object], min_time: float = 0.05) -> int:
+    """Return the number of calls that takes at least `min_time` seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
+
+
+def measure(func: Callable[[], object], rounds: int) -> dict:
+    number = autorange(func)
+    timings = []
+
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter_ns() - start) / number)
+
+    return {
+        'median_ns': round(statistics.median(timings), 1),
+        'min_ns': round(min(timings), 1),
+        'rounds': rounds,
+        'number': number,
+    }
+
+
+def run(benchmarks: list[Benchmark], rounds: int) -> dict:
+    from django.test import override_settings
+
+    results = {}
+
+    for benchmark in benchmarks:
+        with override_settings(**(benchmark.settings or {})):
+            func = benchmark.setup()
+            results[benchmark.name] = measure(func, rounds)
+            if benchmark.check is not None:
+                benchmark.check()
+        print(
+            f'{benchmark.name:<55} {results[benchmark.name]["median_ns"] / 1000:>10.2f} us'
+        )
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return the names of the benchmarks that regressed above the threshold."""
+    regressions = []
+
+    print(f'\n{"benchmark":<55} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+
+        change = result['median_ns'] / base['median_ns'] - 1
+        marker = ''
+        if change > threshold:
+            regressions.append(name)
+            marker = ' REGRESSION'
+        print(
+            f'{name:<55} {base["median_ns"] / 1000:>8.2f}us '
+            f'{result["median_ns"] / 1000:>8.2f}us {change:>+8.1%}{marker}'
+        )
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='keyword', help='Only run matching benchmarks.')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--save', metavar='NAME', help='Save the results as a baseline.')
+    parser.add_argument('--compare', metavar='NAME', help='Compare with a baseline.')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='Allowed slowdown compared to the baseline (default: 0.1).',
+    )
+    args = parser.parse_args(argv)
+
+    configure_django()
+
+    benchmarks = django_view_benchmarks() + arcstack_benchmarks()
+    if args.keyword:
+        benchmarks = [b for b in benchmarks if args.keyword in b.name]
+
+    current = run(benchmarks, args.rounds)
+
+    if args.save:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        path = BASELINES_DIR / f'{args.save}.json'
+        path.write_text(json.dumps(current, indent=2) + '\n')
+        print(f'\nSaved baseline to {path}')
+
+    if args.compare:
+        path = BASELINES_DIR / f'{args.compare}.json'
+        baseline = json.loads(path.read_text())
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}.')
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
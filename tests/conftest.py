@@ -23,10 +23,8 @@ django.setup()
 @pytest.fixture
 def set_middleware(settings):
     def wrapper(middleware_list):
-        from arcstack_api import arcstack_api
-
+        # The APIs are reloaded when the setting changes.
         settings.API_MIDDLEWARE = middleware_list
-        arcstack_api.load_middleware()
 
     return wrapper
 
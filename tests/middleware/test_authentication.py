@@ -0,0 +1,193 @@
+import asyncio
+import base64
+
+import pytest
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import ImproperlyConfigured
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.authentication import (
+    CredentialCache,
+    get_credential_cache,
+    invalidate_credentials,
+)
+
+
+TOKENS = {}
+
+
+def verify_token(token):
+    TOKENS.setdefault('calls', []).append(token)
+    pk = TOKENS.get(token)
+    return None if pk is None else User.objects.get(pk=pk)
+
+
+def basic(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+
+@pytest.fixture
+def auth_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.AuthorizationMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    settings.API_AUTH_SCHEMES = ['Basic', 'Bearer']
+    settings.API_AUTH_TOKEN_VERIFIER = verify_token
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    get_credential_cache().clear()
+    TOKENS.clear()
+    yield ArcStackAPI()
+    get_credential_cache().clear()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user('alice', password='secret')
+
+
+@pytest.fixture
+def whoami(auth_api):
+    def endpoint(request):
+        return request.user.username
+
+    endpoint.LOGIN_REQUIRED = True
+
+    return auth_api(endpoint)
+
+
+def get(rf, authorization=None):
+    headers = {} if authorization is None else {'HTTP_AUTHORIZATION': authorization}
+    request = rf.get('/api/me', **headers)
+    request.user = AnonymousUser()
+    return request
+
+
+@pytest.mark.django_db
+class TestAuthorizationMiddleware:
+    def test_basic(self, whoami, user, rf, expect_response):
+        response = whoami(get(rf, basic('alice', 'secret')))
+
+        expect_response(response, status=200, content=b'alice')
+
+    def test_basic_is_cached(self, whoami, user, rf, monkeypatch):
+        calls = []
+
+        def counting_authenticate(*args, **kwargs):
+            calls.append(kwargs['username'])
+            return authenticate(*args, **kwargs)
+
+        monkeypatch.setattr(
+            'arcstack_api.authentication.authenticate', counting_authenticate
+        )
+
+        whoami(get(rf, basic('alice', 'secret')))
+        response = whoami(get(rf, basic('alice', 'secret')))
+
+        assert response.content == b'alice'
+        assert calls == ['alice']
+
+    def test_invalid_credentials(self, whoami, user, rf, expect_response):
+        expect_response(whoami(get(rf, basic('alice', 'wrong'))), status=401)
+        expect_response(whoami(get(rf, 'Basic not-base64')), status=401)
+        expect_response(whoami(get(rf, 'Bearer unknown')), status=401)
+
+    def test_invalid_credentials_are_not_cached(self, whoami, user, rf):
+        whoami(get(rf, basic('alice', 'wrong')))
+
+        assert len(get_credential_cache()) == 0
+
+    def test_without_credentials(self, whoami, auth_api, rf, expect_response):
+        expect_response(whoami(get(rf)), status=401)
+        # Unsupported schemes are left to the other authentication methods.
+        expect_response(whoami(get(rf, 'Digest abc')), status=401)
+
+        public = auth_api(lambda request: request.user.is_authenticated)
+        expect_response(public(get(rf)), status=200, content=b'False')
+
+    def test_bearer(self, whoami, user, rf, expect_response):
+        TOKENS['token'] = user.pk
+
+        whoami(get(rf, 'Bearer token'))
+        response = whoami(get(rf, 'Bearer token'))
+
+        expect_response(response, status=200, content=b'alice')
+        assert TOKENS['calls'] == ['token']
+
+    def test_revoked_token(self, whoami, user, rf, expect_response):
+        TOKENS['token'] = user.pk
+        whoami(get(rf, 'Bearer token'))
+
+        del TOKENS['token']
+        invalidate_credentials('Bearer', 'token')
+
+        expect_response(whoami(get(rf, 'Bearer token')), status=401)
+
+    def test_saving_user_invalidates(self, whoami, user, rf, expect_response):
+        whoami(get(rf, basic('alice', 'secret')))
+
+        user.set_password('changed')
+        user.save()
+
+        expect_response(whoami(get(rf, basic('alice', 'secret'))), status=401)
+        expect_response(whoami(get(rf, basic('alice', 'changed'))), status=200)
+
+    def test_inactive_user(self, whoami, user, rf, expect_response):
+        user.is_active = False
+        user.save()
+        TOKENS['token'] = user.pk
+
+        expect_response(whoami(get(rf, 'Bearer token')), status=401)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async(self, auth_api, user, rf, expect_response):
+        async def endpoint(request):
+            return (await request.auser()).username
+
+        endpoint.LOGIN_REQUIRED = True
+        endpoint = auth_api(endpoint)
+
+        response = asyncio.run(endpoint(get(rf, basic('alice', 'secret'))))
+        expect_response(response, status=200, content=b'alice')
+
+        response = asyncio.run(endpoint(get(rf, basic('alice', 'wrong'))))
+        expect_response(response, status=401)
+
+    def test_bearer_requires_verifier(self, settings):
+        settings.API_MIDDLEWARE = ['arcstack_api.middleware.AuthorizationMiddleware']
+        settings.API_AUTH_SCHEMES = ['Bearer']
+        settings.API_AUTH_TOKEN_VERIFIER = None
+
+        with pytest.raises(ImproperlyConfigured):
+            ArcStackAPI()
+
+
+class TestCredentialCache:
+    def test_expiration(self):
+        cache = CredentialCache(max_entries=10, ttl=0)
+        cache.set('Basic', 'abc', User(pk=1))
+
+        assert cache.get('Basic', 'abc') is None
+
+    def test_returns_copies(self):
+        cache = CredentialCache(max_entries=10, ttl=60)
+        user = User(pk=1, username='alice')
+        cache.set('basic', 'abc', user)
+
+        cached = cache.get('Basic', 'abc')
+        assert cached.username == 'alice'
+        assert cached is not user
+        assert cached is not cache.get('Basic', 'abc')
+
+    def test_invalidate_user(self):
+        cache = CredentialCache(max_entries=10, ttl=60)
+        cache.set('Basic', 'abc', User(pk=1))
+        cache.set('Bearer', 'token', User(pk=1))
+        cache.set('Bearer', 'other', User(pk=2))
+
+        cache.invalidate_user(1)
+
+        assert cache.get('Basic', 'abc') is None
+        assert cache.get('Bearer', 'token') is None
+        assert cache.get('Bearer', 'other') is not None
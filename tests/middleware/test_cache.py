@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+from django.http import HttpResponse
+
+from arcstack_api import Endpoint
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.cache import LRUCache, get_response_cache
+
+
+@pytest.fixture
+def cache_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.CacheMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    get_response_cache().clear()
+    yield ArcStackAPI()
+    get_response_cache().clear()
+
+
+@pytest.fixture
+def counting_endpoint(cache_api):
+    calls = []
+
+    def endpoint(request, pk):
+        calls.append(pk)
+        return {'pk': pk, 'page': request.GET.get('page')}
+
+    endpoint.CACHE_TTL = 60
+
+    return cache_api(endpoint), calls
+
+
+class TestCacheMiddleware:
+    def test_response_is_cached(self, counting_endpoint, rf, expect_response):
+        endpoint, calls = counting_endpoint
+
+        first = endpoint(rf.get('/api/1'), pk=1)
+        second = endpoint(rf.get('/api/1'), pk=1)
+
+        assert calls == [1]
+        expect_response(second, status=200, content=first.content)
+        assert second['ETag'] == first['ETag']
+        assert second['Content-Type'] == 'application/json'
+
+    def test_per_request_headers_are_not_replayed(self, cache_api, rf):
+        def endpoint(request):
+            response = HttpResponse('ok')
+            response['X-Query-Count'] = '3'
+            response['RateLimit-Remaining'] = '9'
+            response['Cache-Control'] = 'max-age=60'
+            return response
+
+        endpoint.CACHE_TTL = 60
+        endpoint = cache_api(endpoint)
+
+        first = endpoint(rf.get('/api'))
+        second = endpoint(rf.get('/api'))
+
+        assert first['X-Query-Count'] == '3'
+        assert 'X-Query-Count' not in second
+        assert 'RateLimit-Remaining' not in second
+        assert second['Cache-Control'] == 'max-age=60'
+
+    def test_vary(self, cache_api, rf):
+        def endpoint(request):
+            return {}
+
+        def private(request):
+            return {}
+
+        endpoint.CACHE_TTL = private.CACHE_TTL = 60
+        private.CACHE_PER_USER = True
+        endpoint, private = cache_api(endpoint), cache_api(private)
+        request = rf.get('/api')
+        request.user = type('User', (), {'pk': 1, 'is_authenticated': True})()
+
+        first = endpoint(rf.get('/api'))
+        second = endpoint(rf.get('/api'))
+
+        assert first['Vary'] == second['Vary'] == 'Accept, Accept-Language'
+        assert private(request)['Vary'] == (
+            'Accept, Accept-Language, Authorization, Cookie'
+        )
+
+    def test_key_covers_args_and_query(self, counting_endpoint, rf):
+        endpoint, calls = counting_endpoint
+
+        endpoint(rf.get('/api/1'), pk=1)
+        endpoint(rf.get('/api/2'), pk=2)
+        endpoint(rf.get('/api/1?page=2'), pk=1)
+        endpoint(rf.post('/api/1'), pk=1)
+
+        assert calls == [1, 2, 1, 1]
+
+    def test_key_covers_vary_headers(self, counting_endpoint, rf):
+        endpoint, calls = counting_endpoint
+
+        endpoint(rf.get('/api/1', HTTP_ACCEPT_LANGUAGE='en'), pk=1)
+        endpoint(rf.get('/api/1', HTTP_ACCEPT_LANGUAGE='tr'), pk=1)
+
+        assert calls == [1, 1]
+
+    def test_not_modified(self, counting_endpoint, rf, expect_response):
+        endpoint, _ = counting_endpoint
+
+        etag = endpoint(rf.get('/api/1'), pk=1)['ETag']
+        response = endpoint(rf.get('/api/1', HTTP_IF_NONE_MATCH=etag), pk=1)
+
+        expect_response(response, status=304, content=b'')
+
+    def test_endpoint_without_ttl(self, cache_api, rf):
+        class UncachedEndpoint(Endpoint):
+            def get(self, request):
+                return 'OK'
+
+        endpoint = cache_api(UncachedEndpoint.as_view())
+
+        assert endpoint.arcstack_plan.endpoint_middleware == ()
+        assert 'ETag' not in endpoint(rf.get('/api'))
+
+    def test_class_based_endpoint(self, cache_api, rf):
+        calls = []
+
+        class CachedEndpoint(Endpoint):
+            CACHE_TTL = 60
+
+            def get(self, request):
+                calls.append(1)
+                return 'OK'
+
+        endpoint = cache_api(CachedEndpoint.as_view())
+        endpoint(rf.get('/api'))
+        endpoint(rf.get('/api'))
+
+        assert calls == [1]
+
+    def test_errors_are_not_cached(self, cache_api, rf):
+        calls = []
+
+        def endpoint(request):
+            calls.append(1)
+            if len(calls) == 1:
+                return HttpResponse(b'Not found', status=404)
+            return 'OK'
+
+        endpoint.CACHE_TTL = 60
+        endpoint = cache_api(endpoint)
+
+        assert endpoint(rf.get('/api')).status_code == 404
+        assert endpoint(rf.get('/api')).status_code == 200
+        assert endpoint(rf.get('/api')).status_code == 200
+        assert len(calls) == 2
+
+    def test_shared_backend_tier(self, settings, counting_endpoint, rf):
+        settings.API_CACHE_BACKEND = 'default'
+        endpoint, calls = counting_endpoint
+
+        endpoint(rf.get('/api/1'), pk=1)
+        get_response_cache().local.clear()
+        response = endpoint(rf.get('/api/1'), pk=1)
+
+        assert calls == [1]
+        assert response.status_code == 200
+        get_response_cache().clear()
+
+    def test_async_endpoint(self, cache_api, rf):
+        calls = []
+
+        async def endpoint(request):
+            calls.append(1)
+            return 'OK'
+
+        endpoint.CACHE_TTL = 60
+        endpoint = cache_api(endpoint)
+
+        asyncio.run(endpoint(rf.get('/api')))
+        response = asyncio.run(endpoint(rf.get('/api')))
+
+        assert calls == [1]
+        assert response.content == b'OK'
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert len(cache) == 2
+
+    def test_expires_entries(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr('arcstack_api.cache.time.monotonic', lambda: now[0])
+
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1, ttl=10)
+        now[0] += 11
+
+        assert cache.get('a') is None
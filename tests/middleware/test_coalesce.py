@@ -0,0 +1,352 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.coalesce import Flight, SingleFlight, get_single_flight
+
+
+@pytest.fixture
+def coalesce_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.CoalesceMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    return ArcStackAPI()
+
+
+class User:
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+def blocking_endpoint():
+    """A sync endpoint that runs until it is released."""
+
+    def blocking(request, pk):
+        blocking.calls.append(pk)
+        blocking.running.release()
+        blocking.release.wait(5)
+        return {'pk': pk, 'call': len(blocking.calls)}
+
+    blocking.calls = []
+    blocking.release = threading.Event()
+    blocking.running = threading.Semaphore(0)
+    blocking.COALESCE = True
+    return blocking
+
+
+def wait_for_followers(count):
+    flight = next(iter(get_single_flight()._flights.values()))
+    while len(flight._event._cond._waiters) < count:
+        pass
+
+
+class TestSingleFlight:
+    def test_join(self):
+        single_flight = SingleFlight()
+
+        flight, leader = single_flight.join('key')
+        assert leader
+        assert single_flight.join('key') == (flight, False)
+        assert single_flight.join('other')[1]
+
+        single_flight.land('key', flight, None)
+        assert len(single_flight) == 1
+        assert single_flight.join('key')[1]
+
+    def test_async_wait(self):
+        flight = Flight()
+
+        async def main():
+            waiting = asyncio.create_task(flight.await_response(5))
+            await asyncio.sleep(0)
+            await asyncio.to_thread(flight.land, 'response')
+            return await waiting
+
+        assert asyncio.run(main()) == 'response'
+        assert flight.wait(0) == 'response'
+
+    def test_timeout(self):
+        flight = Flight()
+
+        assert flight.wait(0.01) is None
+        assert asyncio.run(flight.await_response(0.01)) is None
+
+
+class TestCoalesceMiddleware:
+    def test_identical_requests_are_coalesced(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+        endpoint = coalesce_api(blocking)
+
+        with ThreadPoolExecutor(3) as executor:
+            leader = executor.submit(endpoint, rf.get('/api/1'), pk=1)
+            blocking.running.acquire()
+            followers = [
+                executor.submit(endpoint, rf.get('/api/1'), pk=1) for _ in range(2)
+            ]
+            wait_for_followers(2)
+            blocking.release.set()
+
+            responses = [leader.result()] + [f.result() for f in followers]
+
+        assert blocking.calls == [1]
+        assert {response.content for response in responses} == {
+            b'{"pk": 1, "call": 1}'
+        }
+        assert all(r['Content-Type'] == 'application/json' for r in responses)
+        # Three distinct response objects.
+        assert len({id(response) for response in responses}) == 3
+        assert len(get_single_flight()) == 0
+
+    def test_no_stale_response(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+        blocking.release.set()
+        endpoint = coalesce_api(blocking)
+
+        endpoint(rf.get('/api/1'), pk=1)
+        response = endpoint(rf.get('/api/1'), pk=1)
+
+        assert blocking.calls == [1, 1]
+        assert response.content == b'{"pk": 1, "call": 2}'
+
+    def test_key(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+        endpoint = coalesce_api(blocking)
+
+        def request(path, user=None, **headers):
+            request = rf.get(path, headers=headers)
+            request.user = user or AnonymousUser()
+            return request
+
+        with ThreadPoolExecutor(6) as executor:
+            leader = executor.submit(endpoint, request('/api/1'), pk=1)
+            blocking.running.acquire()
+            others = [
+                executor.submit(endpoint, request('/api/2'), pk=2),
+                executor.submit(endpoint, request('/api/1?page=2'), pk=1),
+                executor.submit(endpoint, request('/api/1', User(1)), pk=1),
+                executor.submit(endpoint, request('/api/1', Accept='text/csv'), pk=1),
+            ]
+            for _ in others:
+                blocking.running.acquire()
+            blocking.release.set()
+
+            leader.result()
+            for other in others:
+                other.result()
+
+        assert len(blocking.calls) == 5
+
+    def test_post_is_not_coalesced(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+        endpoint = coalesce_api(blocking)
+
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(endpoint, rf.post('/api/1'), pk=1)
+            blocking.running.acquire()
+            second = executor.submit(endpoint, rf.post('/api/1'), pk=1)
+            blocking.running.acquire()
+            blocking.release.set()
+
+            first.result(), second.result()
+
+        assert blocking.calls == [1, 1]
+
+    def test_failed_leader(self, coalesce_api, rf):
+        running = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def endpoint(request):
+            calls.append(request)
+            if len(calls) == 1:
+                running.set()
+                release.wait(5)
+                raise KeyError('key')
+            return {'ok': True}
+
+        endpoint.COALESCE = True
+        wrapped = coalesce_api(endpoint)
+
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(wrapped, rf.get('/api'))
+            running.wait(5)
+            follower = executor.submit(wrapped, rf.get('/api'))
+            wait_for_followers(1)
+            release.set()
+
+            assert leader.result().status_code == 500
+            # The follower ran the endpoint itself.
+            assert follower.result().status_code == 200
+
+        assert len(calls) == 2
+
+    def test_cookies_are_not_shared(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+
+        def endpoint(request, pk):
+            response = HttpResponse(blocking(request, pk)['pk'])
+            response.set_cookie('session', 'secret')
+            return response
+
+        endpoint.COALESCE = True
+        wrapped = coalesce_api(endpoint)
+
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            blocking.running.acquire()
+            follower = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            wait_for_followers(1)
+            blocking.release.set()
+
+            leader.result(), follower.result()
+
+        assert blocking.calls == [1, 1]
+
+    def test_async(self, coalesce_api, rf):
+        calls = []
+        release = asyncio.Event()
+
+        async def endpoint(request):
+            calls.append(request)
+            await release.wait()
+            return {'ok': True}
+
+        endpoint.COALESCE = True
+        wrapped = coalesce_api(endpoint)
+
+        async def main():
+            tasks = [asyncio.create_task(wrapped(rf.get('/api'))) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            release.set()
+            return await asyncio.gather(*tasks)
+
+        responses = asyncio.run(main())
+
+        assert len(calls) == 1
+        assert [response.status_code for response in responses] == [200] * 3
+        assert len({response.content for response in responses}) == 1
+
+    def test_stream_is_shared(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+
+        def endpoint(request, pk):
+            return iter([blocking(request, pk), {'pk': 2}])
+
+        endpoint.COALESCE = True
+        wrapped = coalesce_api(endpoint)
+
+        with ThreadPoolExecutor(3) as executor:
+            leader = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            blocking.running.acquire()
+            followers = [
+                executor.submit(wrapped, rf.get('/api/1'), pk=1) for _ in range(2)
+            ]
+            wait_for_followers(2)
+            blocking.release.set()
+
+            leader = leader.result()
+            followers = [follower.result() for follower in followers]
+
+        content = b'[{"pk": 1, "call": 1}, {"pk": 2}]'
+        assert blocking.calls == [1]
+        assert b''.join(leader.streaming_content) == content
+        assert [follower.content for follower in followers] == [content] * 2
+        assert all(f['Content-Type'] == 'application/json' for f in followers)
+
+    def test_large_stream_is_not_shared(self, coalesce_api, rf):
+        blocking = blocking_endpoint()
+
+        def endpoint(request, pk):
+            return iter([blocking(request, pk)] + [{'pk': pk}] * 10)
+
+        endpoint.COALESCE = True
+        endpoint.COALESCE_MAX_STREAM_SIZE = 32
+        wrapped = coalesce_api(endpoint)
+
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            blocking.running.acquire()
+            follower = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            wait_for_followers(1)
+            blocking.release.set()
+
+            leader = leader.result()
+            follower = follower.result()
+
+        # The follower ran the endpoint itself.
+        assert blocking.calls == [1, 1]
+        # The leader streams the chunks read, then the rest.
+        assert json.loads(b''.join(leader.streaming_content)) == [
+            {'pk': 1, 'call': 1}
+        ] + [{'pk': 1}] * 10
+        assert json.loads(b''.join(follower.streaming_content))[0]['call'] == 2
+
+    def test_failed_stream_is_not_shared(self, coalesce_api, rf, settings):
+        # The first chunk is encoded before the response is returned.
+        settings.API_STREAM_CHUNK_SIZE = 1
+        blocking = blocking_endpoint()
+
+        def items(request, pk):
+            yield blocking(request, pk)
+            raise KeyError('key')
+
+        def endpoint(request, pk):
+            return items(request, pk)
+
+        endpoint.COALESCE = True
+        wrapped = coalesce_api(endpoint)
+
+        with ThreadPoolExecutor(2) as executor:
+            leader = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            blocking.running.acquire()
+            follower = executor.submit(wrapped, rf.get('/api/1'), pk=1)
+            wait_for_followers(1)
+            blocking.release.set()
+
+            leader = leader.result()
+            follower = follower.result()
+
+        assert blocking.calls == [1, 1]
+        # The leader's stream fails where it failed before.
+        content = iter(leader.streaming_content)
+        assert next(content) == b'[{"pk": 1, "call": 1}'
+        with pytest.raises(KeyError):
+            next(content)
+
+    def test_async_stream_is_shared(self, coalesce_api, rf):
+        calls = []
+        release = asyncio.Event()
+
+        async def items():
+            await release.wait()
+            yield {'call': len(calls)}
+
+        async def endpoint(request):
+            calls.append(request)
+            return items()
+
+        endpoint.COALESCE = True
+        wrapped = coalesce_api(endpoint)
+
+        async def main():
+            tasks = [asyncio.create_task(wrapped(rf.get('/api'))) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            release.set()
+            leader, *followers = await asyncio.gather(*tasks)
+            content = b''.join([chunk async for chunk in leader.streaming_content])
+            return content, followers
+
+        content, followers = asyncio.run(main())
+
+        assert len(calls) == 1
+        assert content == b'[{"call": 1}]'
+        assert [follower.content for follower in followers] == [content] * 2
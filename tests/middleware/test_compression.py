@@ -0,0 +1,200 @@
+import asyncio
+import gzip
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.http import HttpResponse
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.compression import parse_accept_encoding
+from arcstack_api.middleware import CompressionMiddleware
+
+
+PAYLOAD = {'items': [{'id': i, 'name': f'item {i}'} for i in range(200)]}
+
+
+@pytest.fixture
+def compression_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.CompressionMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    settings.API_COMPRESSION_ENCODINGS = ['gzip', 'deflate']
+    return ArcStackAPI()
+
+
+class TestCompressionMiddleware:
+    def test_gzip(self, compression_api, rf):
+        @compression_api
+        def endpoint(request):
+            return PAYLOAD
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+        uncompressed = endpoint(rf.get('/api'))
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content)
+        assert gzip.decompress(response.content) == uncompressed.content
+        assert not uncompressed.has_header('Content-Encoding')
+
+    def test_quality_values(self, compression_api, rf):
+        @compression_api
+        def endpoint(request):
+            return PAYLOAD
+
+        request = rf.get('/api', HTTP_ACCEPT_ENCODING='gzip;q=0.5, deflate')
+        response = endpoint(request)
+
+        assert response['Content-Encoding'] == 'deflate'
+        zlib.decompress(response.content)
+
+    def test_below_threshold(self, compression_api, rf):
+        @compression_api
+        def endpoint(request):
+            return {'status': 'OK'}
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip'))
+
+        assert not response.has_header('Content-Encoding')
+
+    def test_endpoint_opt_out(self, compression_api, rf):
+        def endpoint(request):
+            return PAYLOAD
+
+        endpoint.COMPRESS = False
+        endpoint = compression_api(endpoint)
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip'))
+
+        assert not response.has_header('Content-Encoding')
+
+    def test_already_encoded(self, compression_api, rf):
+        @compression_api
+        def endpoint(request):
+            response = HttpResponse(b'x' * 2000)
+            response['Content-Encoding'] = 'br'
+            return response
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip'))
+
+        assert response['Content-Encoding'] == 'br'
+        assert response.content == b'x' * 2000
+
+    def test_etag_is_weakened(self, compression_api, rf):
+        @compression_api
+        def endpoint(request):
+            response = HttpResponse(b'x' * 2000)
+            response['ETag'] = '"abc"'
+            return response
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip'))
+
+        assert response['ETag'] == 'W/"abc"'
+
+    def test_streaming_response(self, compression_api, rf):
+        @compression_api
+        def endpoint(request):
+            return (item for item in PAYLOAD['items'])
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip'))
+
+        assert response['Content-Encoding'] == 'gzip'
+        content = gzip.decompress(b''.join(response.streaming_content))
+        assert content.startswith(b'[{"id": 0')
+
+    def test_async_streaming_response(self, compression_api, rf):
+        @compression_api
+        async def endpoint(request):
+            async def items():
+                for item in PAYLOAD['items']:
+                    yield item
+
+            return items()
+
+        async def consume():
+            response = await endpoint(
+                rf.get('/api', HTTP_ACCEPT_ENCODING='deflate')
+            )
+            chunks = [chunk async for chunk in response.streaming_content]
+            return response, zlib.decompress(b''.join(chunks))
+
+        response, content = asyncio.run(consume())
+
+        assert response['Content-Encoding'] == 'deflate'
+        assert content.endswith(b'"name": "item 199"}]')
+
+    def test_zstd(self, compression_api, settings, rf):
+        zstandard = pytest.importorskip('zstandard')
+        settings.API_COMPRESSION_ENCODINGS = ['zstd', 'gzip']
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return PAYLOAD
+
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='gzip, zstd'))
+        uncompressed = endpoint(rf.get('/api'))
+
+        assert response['Content-Encoding'] == 'zstd'
+        decompressor = zstandard.ZstdDecompressor()
+        assert decompressor.decompress(response.content) == uncompressed.content
+
+    def test_zstd_streaming_response(self, compression_api, settings, rf):
+        zstandard = pytest.importorskip('zstandard')
+        settings.API_COMPRESSION_ENCODINGS = ['zstd']
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return (item for item in PAYLOAD['items'])
+
+        def fetch():
+            response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='zstd'))
+            assert response['Content-Encoding'] == 'zstd'
+            reader = zstandard.ZstdDecompressor().stream_reader(
+                b''.join(response.streaming_content)
+            )
+            return json.loads(reader.read())
+
+        # The concurrent streams do not share a compressor.
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(lambda _: fetch(), range(8)))
+
+        assert results == [PAYLOAD['items']] * 8
+
+    def test_zstd_not_installed(self, compression_api, settings, rf, monkeypatch):
+        monkeypatch.setattr('arcstack_api.compression.zstandard', None)
+        settings.API_COMPRESSION_ENCODINGS = ['zstd', 'gzip']
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return PAYLOAD
+
+        zstd_only = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='zstd'))
+        response = endpoint(rf.get('/api', HTTP_ACCEPT_ENCODING='zstd, gzip'))
+
+        assert not zstd_only.has_header('Content-Encoding')
+        assert response['Content-Encoding'] == 'gzip'
+
+    def test_negotiation_is_cached(self, settings, rf):
+        settings.API_COMPRESSION_ENCODINGS = ['gzip']
+        middleware = CompressionMiddleware(lambda request: HttpResponse())
+        request = rf.get('/api', HTTP_ACCEPT_ENCODING='br, gzip')
+
+        encoding = middleware._get_encoding(request, HttpResponse())
+
+        assert encoding.name == 'gzip'
+        assert middleware._negotiated == {'br, gzip': encoding}
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding('gzip, deflate;q=0.5, br;q=x, *;q=0') == {
+        'gzip': 1.0,
+        'deflate': 0.5,
+        'br': 0.0,
+        '*': 0.0,
+    }
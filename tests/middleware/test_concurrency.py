@@ -0,0 +1,328 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.concurrency import (
+    Bulkhead,
+    BulkheadConfig,
+    GradientLimit,
+    _bulkheads,
+    clear_bulkheads,
+    get_bulkhead,
+)
+
+
+@pytest.fixture
+def concurrency_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.ConcurrencyLimitMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    clear_bulkheads()
+    yield ArcStackAPI()
+    clear_bulkheads()
+
+
+def blocking_endpoint():
+    """A sync endpoint that holds its slot until it is released."""
+
+    def blocking(request):
+        blocking.running.release()
+        blocking.release.wait(5)
+        return {'ok': True}
+
+    blocking.release = threading.Event()
+    blocking.running = threading.Semaphore(0)
+    return blocking
+
+
+def config(limit=1, queue_size=0, timeout=0.05, adaptive=False):
+    return BulkheadConfig(limit, queue_size, timeout, adaptive)
+
+
+class TestBulkhead:
+    def test_limit(self):
+        bulkhead = Bulkhead('test', config(limit=2))
+
+        assert bulkhead.acquire()
+        assert bulkhead.acquire()
+        assert not bulkhead.acquire()
+
+        bulkhead.release()
+        assert bulkhead.acquire()
+        assert bulkhead.in_flight == 2
+
+    def test_queue_timeout(self):
+        bulkhead = Bulkhead('test', config(queue_size=1, timeout=0.01))
+        bulkhead.acquire()
+
+        assert not bulkhead.acquire()
+        assert not bulkhead._waiters
+
+    def test_handover(self):
+        bulkhead = Bulkhead('test', config(queue_size=1, timeout=5))
+        bulkhead.acquire()
+
+        with ThreadPoolExecutor(1) as executor:
+            waiting = executor.submit(bulkhead.acquire)
+            while not bulkhead._waiters:
+                pass
+            bulkhead.release()
+
+            assert waiting.result()
+        assert bulkhead.in_flight == 1
+
+    def test_async_handover(self):
+        bulkhead = Bulkhead('test', config(queue_size=1, timeout=5))
+
+        async def main():
+            await bulkhead.aacquire()
+            waiting = asyncio.create_task(bulkhead.aacquire())
+            await asyncio.sleep(0)
+            assert len(bulkhead._waiters) == 1
+
+            # Released from another thread, e.g. by a sync request.
+            await asyncio.to_thread(bulkhead.release)
+            return await waiting
+
+        assert asyncio.run(main())
+        assert bulkhead.in_flight == 1
+
+    def test_async_cancelled(self):
+        bulkhead = Bulkhead('test', config(queue_size=1, timeout=5))
+        bulkhead.acquire()
+
+        async def main():
+            waiting = asyncio.create_task(bulkhead.aacquire())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+        asyncio.run(main())
+        assert not bulkhead._waiters
+        assert bulkhead.in_flight == 1
+
+    def test_get_bulkhead(self):
+        clear_bulkheads()
+        bulkhead = get_bulkhead('pool', config())
+
+        assert get_bulkhead('pool', config()) is bulkhead
+        assert get_bulkhead('pool', config(limit=2)) is not bulkhead
+
+
+class TestGradientLimit:
+    def test_shrinks_when_latency_grows(self):
+        gradient = GradientLimit(20, 1, 20)
+        for _ in range(50):
+            gradient.update(0.01, in_flight=20)
+
+        limits = [gradient.update(0.1, in_flight=20) for _ in range(20)]
+
+        assert limits[-1] < 20
+        assert limits == sorted(limits, reverse=True)
+        assert limits[-1] >= 1
+
+    def test_grows_back(self):
+        gradient = GradientLimit(20, 1, 20)
+        for _ in range(50):
+            gradient.update(0.01, in_flight=20)
+        for _ in range(20):
+            gradient.update(0.1, in_flight=20)
+        shrunk = int(gradient.limit)
+
+        for _ in range(200):
+            gradient.update(0.01, in_flight=20)
+
+        assert int(gradient.limit) > shrunk
+
+    def test_idle(self):
+        gradient = GradientLimit(20, 1, 20)
+        gradient.update(0.01, in_flight=1)
+
+        assert gradient.update(1, in_flight=1) == 20
+
+
+class TestConcurrencyLimitMiddleware:
+    def test_rejected(self, concurrency_api, rf):
+        blocking = blocking_endpoint()
+        blocking.CONCURRENCY_LIMIT = 1
+        blocking.CONCURRENCY_QUEUE_SIZE = 0
+        endpoint = concurrency_api(blocking)
+
+        with ThreadPoolExecutor(1) as executor:
+            running = executor.submit(endpoint, rf.get('/'))
+            blocking.running.acquire()
+
+            response = endpoint(rf.get('/'))
+            assert response.status_code == 503
+            assert response['Retry-After'] == '1'
+
+            blocking.release.set()
+            assert running.result().status_code == 200
+
+        assert endpoint(rf.get('/')).status_code == 200
+
+    def test_queued(self, concurrency_api, rf):
+        blocking = blocking_endpoint()
+        blocking.CONCURRENCY_LIMIT = 1
+        blocking.CONCURRENCY_QUEUE_TIMEOUT = 5
+        blocking.CONCURRENCY_POOL = 'blocking'
+        endpoint = concurrency_api(blocking)
+        bulkhead = _bulkheads['blocking']
+
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(endpoint, rf.get('/'))
+            blocking.running.acquire()
+            second = executor.submit(endpoint, rf.get('/'))
+            while not bulkhead._waiters:
+                pass
+
+            blocking.release.set()
+            assert first.result().status_code == 200
+            assert second.result().status_code == 200
+
+        assert bulkhead.in_flight == 0
+
+    def test_released_on_error(self, concurrency_api, rf):
+        def failing(request):
+            raise KeyError('key')
+
+        failing.CONCURRENCY_LIMIT = 1
+        endpoint = concurrency_api(failing)
+
+        assert endpoint(rf.get('/')).status_code == 500
+        assert endpoint(rf.get('/')).status_code == 500
+
+    def test_shared_pool(self, concurrency_api, rf):
+        blocking = blocking_endpoint()
+        blocking.CONCURRENCY_LIMIT = 1
+        blocking.CONCURRENCY_POOL = 'reports'
+        blocking.CONCURRENCY_QUEUE_SIZE = 0
+
+        def other(request):
+            return {'ok': True}
+
+        other.CONCURRENCY_LIMIT = 1
+        other.CONCURRENCY_POOL = 'reports'
+        other.CONCURRENCY_QUEUE_SIZE = 0
+
+        endpoint = concurrency_api(blocking)
+        other_endpoint = concurrency_api(other)
+
+        with ThreadPoolExecutor(1) as executor:
+            running = executor.submit(endpoint, rf.get('/'))
+            blocking.running.acquire()
+
+            assert other_endpoint(rf.get('/')).status_code == 503
+
+            blocking.release.set()
+            running.result()
+
+        assert other_endpoint(rf.get('/')).status_code == 200
+
+    def test_conflicting_pool(self, concurrency_api):
+        def first(request):
+            return {}
+
+        def second(request):
+            return {}
+
+        first.CONCURRENCY_LIMIT = 1
+        second.CONCURRENCY_LIMIT = 2
+        first.CONCURRENCY_POOL = second.CONCURRENCY_POOL = 'reports'
+
+        concurrency_api(first)
+        with pytest.raises(ImproperlyConfigured, match='reports'):
+            concurrency_api(second)
+
+    def test_conflicting_pool_across_chains(self, concurrency_api):
+        def first(request):
+            return {}
+
+        async def second(request):
+            return {}
+
+        first.CONCURRENCY_LIMIT = 1
+        second.CONCURRENCY_LIMIT = 2
+        first.CONCURRENCY_POOL = second.CONCURRENCY_POOL = 'reports'
+
+        concurrency_api(first)
+        with pytest.raises(ImproperlyConfigured, match='reports'):
+            concurrency_api(second)
+
+    def test_shared_pool_after_reload(self, concurrency_api, rf, settings):
+        def first(request):
+            return {'ok': True}
+
+        def second(request):
+            return {'ok': True}
+
+        first.CONCURRENCY_LIMIT = second.CONCURRENCY_LIMIT = 1
+        first.CONCURRENCY_POOL = second.CONCURRENCY_POOL = 'reports'
+        first, second = concurrency_api(first), concurrency_api(second)
+
+        settings.API_CONCURRENCY_QUEUE_SIZE = 5
+
+        assert first(rf.get('/')).status_code == 200
+        assert second(rf.get('/')).status_code == 200
+
+    def test_conflicting_pool_at_warmup(self, concurrency_api):
+        api = ArcStackAPI(lazy=True)
+
+        def first(request):
+            return {}
+
+        def second(request):
+            return {}
+
+        first.CONCURRENCY_LIMIT = 1
+        second.CONCURRENCY_LIMIT = 2
+        first.CONCURRENCY_POOL = second.CONCURRENCY_POOL = 'reports'
+        first, second = api(first), api(second)
+
+        # What `warmup()` does for every routed endpoint.
+        api.prepare(first)
+        with pytest.raises(ImproperlyConfigured, match='reports'):
+            api.prepare(second)
+
+    def test_default_limit(self, concurrency_api, rf, settings):
+        def endpoint(request):
+            return {'ok': True}
+
+        assert concurrency_api(endpoint).arcstack_plan.endpoint_middleware == ()
+
+        settings.API_CONCURRENCY_LIMIT = 5
+        wrapped = concurrency_api(endpoint)
+        assert wrapped(rf.get('/')).status_code == 200
+        assert len(wrapped.arcstack_plan.endpoint_middleware) == 1
+
+    def test_async(self, concurrency_api, rf):
+        release = asyncio.Event()
+
+        async def endpoint(request):
+            await release.wait()
+            return {'ok': True}
+
+        endpoint.CONCURRENCY_LIMIT = 1
+        endpoint.CONCURRENCY_QUEUE_SIZE = 1
+        wrapped = concurrency_api(endpoint)
+
+        async def main():
+            first = asyncio.create_task(wrapped(rf.get('/')))
+            queued = asyncio.create_task(wrapped(rf.get('/')))
+            await asyncio.sleep(0.01)
+
+            rejected = await wrapped(rf.get('/'))
+            release.set()
+            return rejected, await first, await queued
+
+        rejected, first, queued = asyncio.run(main())
+
+        assert rejected.status_code == 503
+        assert first.status_code == 200
+        assert queued.status_code == 200
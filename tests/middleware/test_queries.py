@@ -0,0 +1,193 @@
+import asyncio
+import logging
+
+import pytest
+from django.contrib.auth.models import Group, User
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.queries import QueryRecorder, get_query_shape
+
+
+@pytest.fixture
+def queries_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.QueryCountMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    return ArcStackAPI()
+
+
+@pytest.fixture
+def groups(db):
+    groups = [Group.objects.create(name=f'group{i}') for i in range(4)]
+    for group in groups:
+        User.objects.create(username=f'user-{group.name}').groups.add(group)
+    return groups
+
+
+def n_plus_one(request):
+    return [
+        {'name': group.name, 'users': [user.username for user in group.user_set.all()]}
+        for group in Group.objects.order_by('pk')
+    ]
+
+
+def prefetched(request):
+    return [
+        {'name': group.name, 'users': [user.username for user in group.user_set.all()]}
+        for group in Group.objects.order_by('pk').prefetch_related('user_set')
+    ]
+
+
+class TestQueryShape:
+    @pytest.mark.parametrize(
+        'sql, shape',
+        [
+            (
+                'SELECT * FROM "t" WHERE "t"."id" = %s',
+                'SELECT * FROM "t" WHERE "t"."id" = ?',
+            ),
+            (
+                'SELECT * FROM t1 WHERE id IN (%s, %s,\n %s) LIMIT 21',
+                'SELECT * FROM t1 WHERE id IN (...) LIMIT ?',
+            ),
+            (
+                "SELECT * FROM t WHERE name = 'it''s' AND score > -1.5",
+                'SELECT * FROM t WHERE name = ? AND score > ?',
+            ),
+        ],
+    )
+    def test_shape(self, sql, shape):
+        assert get_query_shape(sql) == shape
+
+    def test_in_lists_have_the_same_shape(self):
+        assert get_query_shape('SELECT 1 WHERE id IN (%s)') == get_query_shape(
+            'SELECT 1 WHERE id IN (%s, %s, %s)'
+        )
+
+
+@pytest.mark.django_db
+class TestQueryRecorder:
+    def test_stats(self, groups):
+        recorder = QueryRecorder()
+        with recorder.install():
+            n_plus_one(None)
+
+        stats = recorder.get_stats(repeat_threshold=3)
+
+        assert stats.count == 5
+        assert stats.duration_ns > 0
+        assert len(stats.repeated) == 1
+        assert stats.repeated[0][1] == 4
+
+    def test_uninstalled(self, groups):
+        recorder = QueryRecorder()
+        with recorder.install():
+            pass
+        list(Group.objects.all())
+
+        assert recorder.count == 0
+
+
+@pytest.mark.django_db
+class TestQueryCountMiddleware:
+    def test_headers(self, queries_api, groups, rf):
+        response = queries_api(prefetched)(rf.get('/api'))
+
+        assert response.status_code == 200
+        assert response['X-Query-Count'] == '2'
+        assert float(response['X-Query-Time']) >= 0
+
+    def test_headers_disabled(self, queries_api, groups, rf, settings):
+        settings.API_QUERY_HEADERS = False
+
+        response = queries_api(prefetched)(rf.get('/api'))
+
+        assert 'X-Query-Count' not in response
+
+    def test_n_plus_one_is_logged(self, queries_api, groups, rf, caplog):
+        with caplog.at_level(logging.WARNING, logger='arcstack_api'):
+            response = queries_api(n_plus_one)(rf.get('/api'))
+
+        assert response['X-Query-Count'] == '5'
+        [record] = caplog.records
+        assert 'Possible N+1 query' in record.message
+        assert 'n_plus_one' in record.message
+        assert 'run 4 times' in record.message
+
+    def test_prefetched_is_not_logged(self, queries_api, groups, rf, caplog):
+        with caplog.at_level(logging.WARNING, logger='arcstack_api'):
+            queries_api(prefetched)(rf.get('/api'))
+
+        assert caplog.records == []
+
+    def test_budget_is_logged(self, queries_api, groups, rf, caplog, settings):
+        settings.API_QUERY_REPEAT_THRESHOLD = 100
+
+        def endpoint(request):
+            return n_plus_one(request)
+
+        endpoint.QUERY_BUDGET = 2
+
+        with caplog.at_level(logging.ERROR, logger='arcstack_api'):
+            response = queries_api(endpoint)(rf.get('/api'))
+
+        assert response.status_code == 200
+        [record] = caplog.records
+        assert 'ran 5 queries, over its budget of 2' in record.message
+
+    def test_strict_budget_fails(self, queries_api, groups, rf, settings):
+        settings.API_QUERY_BUDGET = 2
+        settings.API_QUERY_BUDGET_STRICT = True
+
+        response = queries_api(n_plus_one)(rf.get('/api'))
+        assert response.status_code == 500
+
+        settings.DEBUG = True
+        with pytest.raises(Exception, match='over its budget of 2'):
+            queries_api(n_plus_one)(rf.get('/api'))
+
+    def test_within_budget(self, queries_api, groups, rf, settings):
+        settings.API_QUERY_BUDGET = 2
+        settings.API_QUERY_BUDGET_STRICT = True
+
+        assert queries_api(prefetched)(rf.get('/api')).status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async(self, queries_api, groups, rf):
+        async def endpoint(request):
+            return [group.name async for group in Group.objects.order_by('pk')]
+
+        response = asyncio.run(queries_api(endpoint)(rf.get('/api')))
+
+        assert response.status_code == 200
+        assert response['X-Query-Count'] == '1'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_async_requests(self, queries_api, groups, rf):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow(request):
+            await Group.objects.acount()
+            started.set()
+            await release.wait()
+            return {'count': await Group.objects.acount()}
+
+        async def fast(request):
+            await started.wait()
+            names = [group.name async for group in Group.objects.all()]
+            for name in names[:2]:
+                await Group.objects.aget(name=name)
+            release.set()
+            return names
+
+        async def main():
+            return await asyncio.gather(
+                queries_api(slow)(rf.get('/api')), queries_api(fast)(rf.get('/api'))
+            )
+
+        slow_response, fast_response = asyncio.run(main())
+
+        assert slow_response['X-Query-Count'] == '2'
+        assert fast_response['X-Query-Count'] == '3'
@@ -0,0 +1,247 @@
+import asyncio
+
+import pytest
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.ratelimit import (
+    CacheRateLimitStore,
+    MemoryRateLimitStore,
+    Rate,
+    gcra,
+    get_rate_limit_store,
+    parse_rate,
+)
+
+
+@pytest.fixture
+def ratelimit_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.RateLimitMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    get_rate_limit_store().clear()
+    yield ArcStackAPI()
+    get_rate_limit_store().clear()
+
+
+@pytest.fixture
+def endpoint(ratelimit_api):
+    calls = []
+
+    def endpoint(request):
+        calls.append(request)
+        return {'ok': True}
+
+    endpoint.RATE_LIMIT = '2/m'
+
+    return ratelimit_api(endpoint), calls
+
+
+def get(rf, user=None, ip='127.0.0.1'):
+    request = rf.get('/api', REMOTE_ADDR=ip)
+    request.user = user or AnonymousUser()
+    return request
+
+
+class TestParseRate:
+    @pytest.mark.parametrize(
+        'rate, expected',
+        [
+            ('100/m', Rate(100, 60)),
+            ('10/5s', Rate(10, 5)),
+            ('1000/hour', Rate(1000, 3600)),
+            ('5 / d', Rate(5, 86400)),
+            ((3, 2.5), Rate(3, 2.5)),
+        ],
+    )
+    def test_parse(self, rate, expected):
+        assert parse_rate(rate) == expected
+
+    @pytest.mark.parametrize('rate', ['0/m', '10', '10/w', 10])
+    def test_invalid(self, rate):
+        with pytest.raises(ValueError):
+            parse_rate(rate)
+
+
+class TestGCRA:
+    def test_burst_then_refill(self):
+        rate = Rate(3, 3)
+        tat = None
+
+        results = []
+        for _ in range(4):
+            new_tat, result = gcra(tat, 100.0, rate)
+            tat = new_tat if new_tat is not None else tat
+            results.append(result)
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results] == [2, 1, 0, 0]
+        assert results[3].retry_after == pytest.approx(1)
+        assert results[3].reset == pytest.approx(3)
+
+        # One request is available again after the interval.
+        _, result = gcra(tat, 101.0, rate)
+        assert result.allowed
+        assert result.remaining == 0
+
+    def test_full_bucket_after_period(self):
+        rate = Rate(2, 10)
+        tat, _ = gcra(None, 0.0, rate)
+
+        _, result = gcra(tat, 100.0, rate)
+        assert result.remaining == 1
+
+
+class TestStores:
+    def test_memory_store_keys(self):
+        store = MemoryRateLimitStore(shards=4)
+        rate = Rate(1, 60)
+
+        assert store.hit('a', rate).allowed
+        assert not store.hit('a', rate).allowed
+        assert store.hit('b', rate).allowed
+
+    def test_memory_store_prunes(self):
+        store = MemoryRateLimitStore(shards=1, max_entries=3)
+
+        for key in 'abcdef':
+            store.hit(key, Rate(1, 60))
+
+        assert len(store.shards[0][0]) == 3
+
+    def test_cache_store(self):
+        cache.clear()
+        store = CacheRateLimitStore('default', key_prefix='test:')
+        rate = Rate(2, 60)
+
+        assert store.hit('a', rate).allowed
+        assert store.hit('a', rate).allowed
+        assert not store.hit('a', rate).allowed
+        assert cache.get('test:a') is not None
+
+        assert asyncio.run(store.ahit('b', rate)).allowed
+
+
+class TestRateLimitMiddleware:
+    def test_limit(self, endpoint, rf, expect_response):
+        endpoint, calls = endpoint
+
+        first = endpoint(get(rf))
+        endpoint(get(rf))
+        limited = endpoint(get(rf))
+
+        expect_response(first, status=200)
+        assert first['RateLimit-Limit'] == '2'
+        assert first['RateLimit-Remaining'] == '1'
+        assert first['RateLimit-Policy'] == '2;w=60'
+
+        expect_response(
+            limited, status=429, content=b'{"detail": "Too many requests"}'
+        )
+        assert limited['Retry-After'] == '30'
+        assert limited['RateLimit-Remaining'] == '0'
+        # The endpoint is not called for the limited request.
+        assert len(calls) == 2
+
+    def test_per_client(self, endpoint, rf):
+        endpoint, _ = endpoint
+
+        endpoint(get(rf, ip='10.0.0.1'))
+        endpoint(get(rf, ip='10.0.0.1'))
+
+        assert endpoint(get(rf, ip='10.0.0.2')).status_code == 200
+        assert endpoint(get(rf, ip='10.0.0.1')).status_code == 429
+
+    def test_per_user(self, endpoint, rf):
+        endpoint, _ = endpoint
+        alice, bob = User(pk=1), User(pk=2)
+
+        endpoint(get(rf, alice))
+        endpoint(get(rf, alice))
+
+        # Same address, but another user.
+        assert endpoint(get(rf, bob)).status_code == 200
+        assert endpoint(get(rf, alice)).status_code == 429
+
+    def test_per_endpoint(self, endpoint, ratelimit_api, rf):
+        endpoint, _ = endpoint
+
+        def other(request):
+            return {}
+
+        other.RATE_LIMIT = '2/m'
+        other = ratelimit_api(other)
+
+        endpoint(get(rf))
+        endpoint(get(rf))
+
+        assert other(get(rf)).status_code == 200
+
+    def test_custom_key(self, ratelimit_api, rf):
+        def endpoint(request):
+            return {}
+
+        endpoint.RATE_LIMIT = '1/m'
+        endpoint.RATE_LIMIT_KEY = lambda request: request.GET['tenant']
+        endpoint = ratelimit_api(endpoint)
+
+        assert endpoint(rf.get('/api?tenant=a')).status_code == 200
+        assert endpoint(rf.get('/api?tenant=b')).status_code == 200
+        assert endpoint(rf.get('/api?tenant=a')).status_code == 429
+
+    def test_default_rate(self, ratelimit_api, rf, settings):
+        settings.API_RATE_LIMIT = '1/m'
+
+        def limited(request):
+            return {}
+
+        def unlimited(request):
+            return {}
+
+        unlimited.RATE_LIMIT = None
+        limited = ratelimit_api(limited)
+        unlimited = ratelimit_api(unlimited)
+
+        for _ in range(2):
+            response = unlimited(get(rf))
+            assert response.status_code == 200
+            assert 'RateLimit-Limit' not in response
+
+        limited(get(rf))
+        assert limited(get(rf)).status_code == 429
+
+    def test_inside_common_middleware(self, ratelimit_api, settings, rf):
+        # The API reloads with the new order.
+        settings.API_MIDDLEWARE = [
+            'arcstack_api.middleware.CommonMiddleware',
+            'arcstack_api.middleware.RateLimitMiddleware',
+        ]
+
+        def endpoint(request):
+            return {'ok': True}
+
+        endpoint.RATE_LIMIT = '2/m'
+        response = ratelimit_api(endpoint)(get(rf))
+
+        # The returned dict is not changed, the rendered response has no headers.
+        assert response.content == b'{"ok": true}'
+        assert 'RateLimit-Limit' not in response
+
+    def test_async(self, ratelimit_api, rf, expect_response):
+        async def endpoint(request):
+            return {}
+
+        endpoint.RATE_LIMIT = '1/m'
+        endpoint = ratelimit_api(endpoint)
+
+        async def main():
+            return [await endpoint(get(rf)), await endpoint(get(rf))]
+
+        allowed, limited = asyncio.run(main())
+
+        expect_response(allowed, status=200)
+        assert allowed['RateLimit-Remaining'] == '0'
+        expect_response(limited, status=429)
+        assert limited['Retry-After'] == '60'
@@ -1,10 +1,12 @@
 import logging
+from unittest import mock
 
 import pytest
 from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
 
 from arcstack_api.api import ArcStackAPI
 from arcstack_api.logger import logger
+from arcstack_api.meta import ArcStackRequestMeta
 
 
 def sample_middleware(get_response):
@@ -30,6 +32,20 @@ class MiddlewareWithProcessEndpoint:
         return endpoint(request, *args, **kwargs)
 
 
+class CachedOnlyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def applies_to_endpoint(self, plan):
+        return plan.options.get('CACHED', False)
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        return 'cached'
+
+
 class TestLoadMiddleware:
     def test_middleware_not_used(self, settings, caplog):
         settings.API_MIDDLEWARE = ['tests.test_arcstack_api.sample_middleware']
@@ -154,3 +170,77 @@ class TestProcessException:
         request = rf.get('/')
         response = endpoint(request)
         expect_response(response, status=500)
+
+
+class TestEndpointPlan:
+    def test_plan_is_compiled_once(self, settings, rf):
+        settings.API_MIDDLEWARE = []
+        api = ArcStackAPI()
+
+        with mock.patch('arcstack_api.signature.inspect.signature') as signature:
+
+            @api
+            def endpoint(request):
+                return 'test'
+
+            for _ in range(3):
+                assert endpoint(rf.get('/')) == 'test'
+
+        assert signature.call_count == 1
+        assert endpoint.arcstack_plan.endpoint.__name__ == 'endpoint'
+
+    def test_plan_is_recompiled_after_reload(self, settings, rf):
+        settings.API_MIDDLEWARE = []
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return 'test'
+
+        plan = endpoint.arcstack_plan
+        api.load_middleware()
+        endpoint(rf.get('/'))
+
+        assert endpoint.arcstack_plan is not plan
+        assert endpoint.arcstack_plan.generation == api._generation
+
+    def test_login_policy_is_compiled(self, settings):
+        settings.API_MIDDLEWARE = []
+        settings.API_DEFAULT_LOGIN_REQUIRED = True
+        api = ArcStackAPI()
+
+        def endpoint(request):
+            return 'test'
+
+        endpoint.LOGIN_REQUIRED = False
+
+        assert not api(endpoint).arcstack_plan.login_required
+
+    def test_endpoint_middleware_that_apply(self, settings, rf):
+        settings.API_MIDDLEWARE = ['tests.test_arcstack_api.CachedOnlyMiddleware']
+        api = ArcStackAPI()
+
+        def cached(request):
+            return 'test'
+
+        cached.CACHED = True
+
+        @api
+        def not_cached(request):
+            return 'test'
+
+        cached = api(cached)
+
+        assert len(cached.arcstack_plan.endpoint_middleware) == 1
+        assert not_cached.arcstack_plan.endpoint_middleware == ()
+        assert cached(rf.get('/')) == 'cached'
+        assert not_cached(rf.get('/')) == 'test'
+
+    def test_request_meta_has_slots(self, settings):
+        settings.API_MIDDLEWARE = []
+        api = ArcStackAPI()
+        plan = api.compile_plan(lambda request: 'test')
+        meta = ArcStackRequestMeta(plan, (), {})
+
+        assert not hasattr(meta, '__dict__')
+        assert meta.endpoint is plan.endpoint
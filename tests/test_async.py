@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import ImproperlyConfigured
+
+from arcstack_api import APIError, Endpoint, api_endpoint
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.mixins import MiddlewareMixin
+
+
+THREADS = []
+
+
+class ThreadRecordingMiddleware(MiddlewareMixin):
+    async def aprocess_request(self, request):
+        THREADS.append(threading.current_thread())
+
+
+class SyncOnlyMiddleware:
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return f'{response} (sync)'
+
+
+class IncapableMiddleware:
+    sync_capable = False
+    async_capable = False
+
+
+@pytest.fixture
+def async_api(settings):
+    settings.API_MIDDLEWARE = [
+        'tests.test_async.ThreadRecordingMiddleware',
+        'arcstack_api.middleware.CommonMiddleware',
+    ]
+    THREADS.clear()
+    return ArcStackAPI()
+
+
+class TestAsyncEndpoint:
+    def test_async_function_endpoint(self, async_api, rf, expect_response):
+        @async_api
+        async def endpoint(request):
+            THREADS.append(threading.current_thread())
+            return {'status': 'OK'}
+
+        assert iscoroutinefunction(endpoint)
+
+        response = asyncio.run(endpoint(rf.get('/api')))
+        expect_response(response, status=200, content=b'{"status": "OK"}')
+
+    def test_async_chain_does_not_use_threads(self, async_api, rf):
+        @async_api
+        async def endpoint(request):
+            THREADS.append(threading.current_thread())
+            return 'OK'
+
+        asyncio.run(endpoint(rf.get('/api')))
+
+        assert THREADS == [threading.current_thread()] * 2
+
+    def test_async_class_based_endpoint(self, async_api, rf, expect_response):
+        class AsyncEndpoint(Endpoint):
+            async def get(self, request):
+                return ['item1', 'item2']
+
+        endpoint = async_api(AsyncEndpoint.as_view())
+
+        assert iscoroutinefunction(endpoint)
+
+        response = asyncio.run(endpoint(rf.get('/api')))
+        expect_response(response, status=200, content=b'["item1", "item2"]')
+
+    def test_async_exception(self, async_api, rf, expect_response):
+        @async_api
+        async def endpoint(request):
+            raise APIError('Test error')
+
+        response = asyncio.run(endpoint(rf.get('/api')))
+        expect_response(response, status=400, content=b'{"detail": "Test error"}')
+
+    def test_decorator_keeps_endpoint_async(self):
+        @api_endpoint()
+        async def endpoint(request):
+            return 'OK'
+
+        assert iscoroutinefunction(endpoint)
+
+
+class TestMiddlewareCapabilities:
+    def test_sync_only_middleware_is_adapted(self, settings, rf):
+        settings.API_MIDDLEWARE = ['tests.test_async.SyncOnlyMiddleware']
+        api = ArcStackAPI()
+
+        @api
+        async def async_endpoint(request):
+            return 'async'
+
+        @api
+        def sync_endpoint(request):
+            return 'sync'
+
+        assert asyncio.run(async_endpoint(rf.get('/api'))) == 'async (sync)'
+        assert sync_endpoint(rf.get('/api')) == 'sync (sync)'
+
+    def test_middleware_without_capability(self, settings):
+        settings.API_MIDDLEWARE = ['tests.test_async.IncapableMiddleware']
+
+        with pytest.raises(ImproperlyConfigured):
+            ArcStackAPI()
+
+    def test_mixin_switches_to_async_mode(self):
+        async def get_response(request):
+            return 'OK'
+
+        middleware = ThreadRecordingMiddleware(get_response)
+
+        assert middleware.async_mode
+        assert iscoroutinefunction(middleware)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from django.http import HttpResponse
+from django.urls import path
+
+from arcstack_api import APIError, api_endpoint
+from arcstack_api.batch import AsyncBatchEndpoint, BatchEndpoint
+
+
+THREADS = set()
+
+
+@api_endpoint()
+def item(request, pk):
+    THREADS.add(threading.get_ident())
+    return {'pk': pk, 'q': request.GET.get('q')}
+
+
+@api_endpoint()
+def create_item(request):
+    return {'created': json.loads(request.body)}
+
+
+@api_endpoint()
+def text(request):
+    return 'plain'
+
+
+@api_endpoint()
+def failing(request):
+    raise APIError({'detail': 'Nope'}, status_code=409)
+
+
+@api_endpoint()
+async def async_item(request, pk):
+    return {'pk': pk, 'async': True}
+
+
+def django_view(request):
+    return HttpResponse('not an API endpoint')
+
+
+urlpatterns = [
+    path('api/items/<int:pk>', item),
+    path('api/items', create_item),
+    path('api/text', text),
+    path('api/failing', failing),
+    path('api/async/<int:pk>', async_item),
+    path('view', django_view),
+    path('api/batch', BatchEndpoint.as_endpoint()),
+    path('api/async-batch', AsyncBatchEndpoint.as_endpoint()),
+]
+
+
+def batch(rf, endpoint, *requests):
+    request = rf.post(
+        '/api/batch',
+        data={'requests': list(requests)},
+        content_type='application/json',
+    )
+    return endpoint(request)
+
+
+def results(response):
+    return json.loads(response.content)['responses']
+
+
+@pytest.mark.urls('tests.test_batch')
+class TestBatchEndpoint:
+    @pytest.fixture
+    def endpoint(self, common_middleware):
+        return BatchEndpoint.as_endpoint()
+
+    @pytest.fixture
+    def common_middleware(self, set_middleware):
+        set_middleware(['arcstack_api.middleware.CommonMiddleware'])
+
+    def test_sub_requests(self, endpoint, rf):
+        response = batch(
+            rf,
+            endpoint,
+            {'path': '/api/items/1?q=a'},
+            {'method': 'POST', 'path': '/api/items', 'body': {'name': 'Book'}},
+            {'path': '/api/text'},
+            {'path': '/api/failing'},
+        )
+
+        assert response.status_code == 200
+        assert [result['status'] for result in results(response)] == [
+            200,
+            200,
+            200,
+            409,
+        ]
+        assert [result['body'] for result in results(response)] == [
+            {'pk': 1, 'q': 'a'},
+            {'created': {'name': 'Book'}},
+            'plain',
+            {'detail': 'Nope'},
+        ]
+
+    def test_safe_requests_run_concurrently(self, endpoint, rf):
+        THREADS.clear()
+
+        batch(rf, endpoint, *({'path': f'/api/items/{pk}'} for pk in range(6)))
+
+        assert threading.get_ident() not in THREADS
+
+    def test_groups(self, rf):
+        view = BatchEndpoint()
+        request = rf.post(
+            '/api/batch',
+            data={
+                'requests': [
+                    {'path': '/a'},
+                    {'path': '/b'},
+                    {'method': 'POST', 'path': '/c'},
+                    {'path': '/d'},
+                ]
+            },
+            content_type='application/json',
+        )
+
+        assert view.get_groups(view.parse_batch(request)) == [[0, 1], [2], [3]]
+
+    def test_invalid_sub_requests(self, endpoint, rf):
+        response = batch(
+            rf,
+            endpoint,
+            {'path': '/view'},
+            {'path': '/missing'},
+            {'path': 'relative'},
+            {'method': 'TRACE', 'path': '/api/text'},
+            {'path': '/api/batch'},
+        )
+
+        assert [result['status'] for result in results(response)] == [
+            404,
+            404,
+            400,
+            400,
+            400,
+        ]
+
+    def test_batch_size_limit(self, settings, endpoint, rf, expect_response):
+        settings.API_BATCH_MAX_SIZE = 2
+
+        response = batch(rf, endpoint, *({'path': '/api/text'} for _ in range(3)))
+
+        expect_response(response, status=413)
+
+    def test_timeout(self, settings, endpoint, rf):
+        settings.API_BATCH_TIMEOUT = 0
+
+        response = batch(rf, endpoint, {'path': '/api/text'})
+
+        assert results(response)[0]['status'] == 504
+
+
+@pytest.mark.urls('tests.test_batch')
+class TestAsyncBatchEndpoint:
+    def test_sync_and_async_sub_requests(self, set_middleware, rf):
+        set_middleware(['arcstack_api.middleware.CommonMiddleware'])
+        endpoint = AsyncBatchEndpoint.as_endpoint()
+
+        response = asyncio.run(
+            batch(
+                rf,
+                endpoint,
+                {'path': '/api/async/1'},
+                {'path': '/api/items/2'},
+                {'path': '/api/failing'},
+            )
+        )
+
+        assert [result['body'] for result in results(response)] == [
+            {'pk': 1, 'async': True},
+            {'pk': 2, 'q': None},
+            {'detail': 'Nope'},
+        ]
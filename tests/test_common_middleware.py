@@ -1,3 +1,5 @@
+import asyncio
+import json
 from collections import namedtuple
 
 import pytest
@@ -61,7 +63,10 @@ class TestCommonMiddlewareExceptionTransform:
         request = rf.get('/api/exception')
         response = endpoint(request)
         expect_response(
-            response, status=400, content_type='text/plain', content=b'Test error'
+            response,
+            status=400,
+            content_type='application/json',
+            content=b'{"detail": "Test error"}',
         )
 
 
@@ -120,3 +125,70 @@ class TestCommonMiddlewareLoginRequired:
         request.user = django_user_model.objects.create_user(username='testuser')
         response = endpoint(request)
         expect_response(response, status=200, content=b'Hello, World!')
+
+
+class TestCommonMiddlewareStreaming:
+    def test_generator(self, settings, common_middleware, rf):
+        settings.API_STREAM_CHUNK_SIZE = 2
+
+        @api_endpoint()
+        def endpoint(request):
+            return ({'id': i} for i in range(5))
+
+        response = endpoint(rf.get('/api/stream'))
+        chunks = list(response.streaming_content)
+
+        assert response.streaming
+        assert response.headers['Content-Type'] == 'application/json'
+        assert len(chunks) == 4
+        assert json.loads(b''.join(chunks)) == [{'id': i} for i in range(5)]
+
+    def test_empty_iterator(self, common_middleware, rf):
+        @api_endpoint()
+        def endpoint(request):
+            return iter([])
+
+        response = endpoint(rf.get('/api/stream'))
+
+        assert b''.join(response.streaming_content) == b'[]'
+
+    def test_unsupported_item(self, settings, common_middleware, rf):
+        settings.DEBUG = True
+
+        @api_endpoint()
+        def endpoint(request):
+            return iter([object()])
+
+        with pytest.raises(ValueError):
+            endpoint(rf.get('/api/stream'))
+
+    @pytest.mark.django_db
+    def test_queryset(self, common_middleware, rf, django_user_model):
+        for username in ['user1', 'user2']:
+            django_user_model.objects.create_user(username=username)
+
+        @api_endpoint()
+        def endpoint(request):
+            return django_user_model.objects.order_by('username').values('username')
+
+        response = endpoint(rf.get('/api/stream'))
+
+        assert json.loads(b''.join(response.streaming_content)) == [
+            {'username': 'user1'},
+            {'username': 'user2'},
+        ]
+
+    def test_async_generator(self, common_middleware, rf):
+        @api_endpoint()
+        async def endpoint(request):
+            async def items():
+                for i in range(3):
+                    yield i
+
+            return items()
+
+        async def consume():
+            response = await endpoint(rf.get('/api/stream'))
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        assert asyncio.run(consume()) == b'[0, 1, 2]'
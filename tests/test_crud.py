@@ -0,0 +1,275 @@
+import io
+import json
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.crud import ModelDetailEndpoint, ModelListEndpoint
+from arcstack_api.parsers import JsonStreamReader
+
+
+class Groups(ModelListEndpoint):
+    model = Group
+    fields = ('id', 'name')
+    chunk_size = 2
+
+
+class Permissions(ModelListEndpoint):
+    model = Permission
+    fields = ('id', 'name', 'codename', 'content_type')
+
+
+class GroupDetail(ModelDetailEndpoint):
+    model = Group
+    fields = ('id', 'name')
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+@pytest.fixture
+def groups(db):
+    return [Group.objects.create(name=f'group{i}') for i in range(3)]
+
+
+def send(rf, endpoint, method, data, **kwargs):
+    request = getattr(rf, method)(
+        '/api/groups', data=json.dumps(data), content_type='application/json'
+    )
+    return endpoint(request, **kwargs)
+
+
+@pytest.mark.django_db
+def test_default_fields(api, rf, django_user_model, expect_response):
+    class Users(ModelListEndpoint):
+        model = django_user_model
+
+    django_user_model.objects.create_user(username='user', password='secret')
+    endpoint = api(Users.as_view())
+
+    [user] = json.loads(b''.join(endpoint(rf.get('/api/users')).streaming_content))
+    response = send(rf, endpoint, 'post', {'username': 'other', 'password': 'x'})
+
+    assert user['username'] == 'user'
+    assert 'password' not in user
+    expect_response(response, status=422)
+
+
+@pytest.mark.django_db
+class TestModelListEndpoint:
+    @pytest.fixture
+    def endpoint(self, api):
+        return api(Groups.as_view())
+
+    def test_list(self, endpoint, rf, groups):
+        response = endpoint(rf.get('/api/groups?fields=name'))
+
+        assert json.loads(b''.join(response.streaming_content)) == [
+            {'name': 'group0'},
+            {'name': 'group1'},
+            {'name': 'group2'},
+        ]
+
+    def test_create_one(self, endpoint, rf, expect_response):
+        response = send(rf, endpoint, 'post', {'name': 'admins'})
+
+        expect_response(response, status=201)
+        assert json.loads(response.content)['name'] == 'admins'
+
+    def test_bulk_create_in_chunks(self, endpoint, rf, expect_response):
+        data = [{'name': f'group{i}'} for i in range(5)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = send(rf, endpoint, 'post', data)
+
+        expect_response(response, status=201)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        assert len(inserts) == 3
+        assert json.loads(response.content)['created'] == 5
+        assert Group.objects.count() == 5
+
+    def test_bulk_create_reports_every_invalid_item(
+        self, endpoint, rf, expect_response
+    ):
+        data = [{'name': 'ok'}, {'name': ''}, 'group', {'name': 'x' * 200}, {'id': 1}]
+
+        response = send(rf, endpoint, 'post', data)
+
+        expect_response(response, status=422)
+        assert [error['loc'] for error in json.loads(response.content)['detail']] == [
+            ['body', 1, 'name'],
+            ['body', 2],
+            ['body', 3, 'name'],
+            ['body', 4, 'id'],
+        ]
+        assert not Group.objects.exists()
+
+    def test_create_one_conflict(self, endpoint, rf, groups, expect_response):
+        response = send(rf, endpoint, 'post', {'name': 'group0'})
+
+        expect_response(response, status=422)
+        assert json.loads(response.content)['detail'] == [
+            {
+                'loc': ['body'],
+                'msg': 'Violates a database constraint',
+                'type': 'integrity_error',
+            }
+        ]
+
+    def test_bulk_create_conflicts(self, endpoint, rf, groups, expect_response):
+        # The first chunk is written, the second conflicts with it and a group.
+        data = [{'name': 'new'}, {'name': 'other'}, {'name': 'group1'}, {'name': 'new'}]
+
+        response = send(rf, endpoint, 'post', data)
+
+        expect_response(response, status=422)
+        assert [error['loc'] for error in json.loads(response.content)['detail']] == [
+            ['body', 2],
+            ['body', 3],
+        ]
+        assert Group.objects.count() == 3
+
+    def test_bulk_update_conflicts(self, endpoint, rf, groups, expect_response):
+        data = [
+            {'id': groups[0].id, 'name': 'renamed'},
+            {'id': groups[1].id, 'name': 'group2'},
+        ]
+
+        response = send(rf, endpoint, 'patch', data)
+
+        expect_response(response, status=422)
+        assert json.loads(response.content)['detail'][0]['loc'] == ['body', 1]
+        assert not Group.objects.filter(name='renamed').exists()
+
+    def test_foreign_key_by_name(self, api, rf, expect_response):
+        endpoint = api(Permissions.as_view())
+        data = {'name': 'Can x', 'codename': 'x', 'content_type': 1}
+
+        response = send(rf, endpoint, 'post', [data])
+
+        expect_response(response, status=422)
+        assert json.loads(response.content)['detail'][0]['loc'] == [
+            'body',
+            0,
+            'content_type',
+        ]
+
+    def test_bulk_update(self, endpoint, rf, groups):
+        data = [{'id': group.id, 'name': f'renamed{group.id}'} for group in groups]
+
+        response = send(rf, endpoint, 'patch', data)
+
+        assert json.loads(response.content) == {'updated': 3}
+        assert sorted(Group.objects.values_list('name', flat=True)) == sorted(
+            f'renamed{group.id}' for group in groups
+        )
+
+    def test_bulk_update_missing_rows(self, endpoint, rf, groups, expect_response):
+        data = [{'id': groups[0].id, 'name': 'renamed'}, {'id': 999, 'name': 'x'}]
+
+        response = send(rf, endpoint, 'patch', data)
+
+        expect_response(response, status=422)
+        assert json.loads(response.content)['detail'][0]['loc'] == ['body', 1]
+        assert not Group.objects.filter(name='renamed').exists()
+
+    def test_bulk_delete(self, endpoint, rf, groups):
+        response = send(rf, endpoint, 'delete', [groups[0].id, groups[2].id])
+
+        assert json.loads(response.content) == {'deleted': 2}
+        assert list(Group.objects.all()) == [groups[1]]
+
+
+@pytest.mark.django_db
+class TestModelDetailEndpoint:
+    @pytest.fixture
+    def endpoint(self, api):
+        return api(GroupDetail.as_view())
+
+    def test_retrieve(self, endpoint, rf, groups):
+        response = endpoint(rf.get('/api/groups/1'), pk=groups[1].id)
+
+        assert json.loads(response.content) == {'id': groups[1].id, 'name': 'group1'}
+
+    def test_not_found(self, endpoint, rf, expect_response):
+        expect_response(endpoint(rf.get('/api/groups/1'), pk=1), status=404)
+
+    def test_partial_update(self, endpoint, rf, groups):
+        response = send(rf, endpoint, 'patch', {'name': 'renamed'}, pk=groups[0].id)
+
+        assert json.loads(response.content)['name'] == 'renamed'
+        groups[0].refresh_from_db()
+        assert groups[0].name == 'renamed'
+
+    def test_update_conflict(self, endpoint, rf, groups, expect_response):
+        response = send(rf, endpoint, 'put', {'name': 'group1'}, pk=groups[0].id)
+
+        expect_response(response, status=422)
+        groups[0].refresh_from_db()
+        assert groups[0].name == 'group0'
+
+    def test_delete(self, endpoint, rf, groups, expect_response):
+        response = endpoint(rf.delete('/api/groups/1'), pk=groups[0].id)
+
+        expect_response(response, status=204)
+        assert Group.objects.count() == 2
+
+
+class TestJsonStreamReader:
+    def test_reads_array_items_in_small_chunks(self):
+        stream = io.BytesIO(b' [1, 23.5, {"a": [1, 2]}, "\xc3\xa9", null] ')
+        reader = JsonStreamReader(stream, read_size=3)
+
+        assert reader.is_array
+        assert list(reader) == [1, 23.5, {'a': [1, 2]}, 'é', None]
+
+    def test_values_split_between_chunks(self):
+        items = [-2500.5, 'a\\"]}{[', {'a': ['x]', {'b': '\\'}]}, [[], {}], True]
+        body = json.dumps(items).encode()
+
+        for read_size in (1, 2, 3):
+            reader = JsonStreamReader(io.BytesIO(body), read_size=read_size)
+            assert list(reader) == items
+
+    def test_item_is_decoded_once_complete(self):
+        item = {'name': 'x' * 1000, 'tags': [str(i) for i in range(100)]}
+        body = json.dumps([item, item]).encode()
+        reader = JsonStreamReader(io.BytesIO(body), read_size=16)
+
+        with mock.patch.object(
+            reader._decoder, 'raw_decode', wraps=reader._decoder.raw_decode
+        ) as raw_decode:
+            assert list(reader) == [item, item]
+
+        assert raw_decode.call_count == 2
+
+    def test_object_is_decoded_once(self):
+        body = json.dumps({'items': list(range(1000))}).encode()
+        reader = JsonStreamReader(io.BytesIO(body), read_size=16)
+
+        with mock.patch('arcstack_api.parsers.json.loads', wraps=json.loads) as loads:
+            assert reader.read_value() == {'items': list(range(1000))}
+
+        assert loads.call_count == 1
+
+    def test_empty_array(self):
+        assert list(JsonStreamReader(io.BytesIO(b'[ ]'))) == []
+
+    def test_object(self):
+        reader = JsonStreamReader(io.BytesIO(b'{"a": 1}'), read_size=2)
+
+        assert not reader.is_array
+        assert reader.read_value() == {'a': 1}
+
+    @pytest.mark.parametrize('body', [b'[1 2]', b'[1,', b'', b'{"a": 1} x'])
+    def test_invalid(self, body):
+        with pytest.raises(ValueError):
+            reader = JsonStreamReader(io.BytesIO(body))
+            list(reader) if reader.is_array else reader.read_value()
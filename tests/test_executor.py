@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.executor import FlatMiddlewareExecutor
+from arcstack_api.mixins import MiddlewareMixin
+
+
+CALLS = []
+
+
+class RecordingMiddleware(MiddlewareMixin):
+    name = None
+    short_circuit = False
+
+    def process_request(self, request):
+        CALLS.append(f'{self.name}.request')
+        if self.short_circuit:
+            return f'{self.name} short-circuit'
+
+    def process_response(self, request, response):
+        CALLS.append(f'{self.name}.response')
+        return response
+
+
+class FirstMiddleware(RecordingMiddleware):
+    name = 'first'
+
+
+class SecondMiddleware(RecordingMiddleware):
+    name = 'second'
+    short_circuit = True
+
+
+class ThirdMiddleware(RecordingMiddleware):
+    name = 'third'
+
+
+class ResponseOnlyMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        CALLS.append('response_only.response')
+        return response
+
+
+class CustomCallMiddleware(MiddlewareMixin):
+    def __call__(self, request):
+        CALLS.append('custom.call')
+        return self.get_response(request)
+
+
+MIDDLEWARE_CASES = [
+    [
+        'tests.test_executor.FirstMiddleware',
+        'tests.test_executor.ResponseOnlyMiddleware',
+        'tests.test_executor.ThirdMiddleware',
+    ],
+    [
+        'tests.test_executor.FirstMiddleware',
+        'tests.test_executor.SecondMiddleware',
+        'tests.test_executor.ThirdMiddleware',
+    ],
+    [
+        'tests.test_executor.FirstMiddleware',
+        'tests.test_executor.CustomCallMiddleware',
+        'tests.test_executor.ResponseOnlyMiddleware',
+    ],
+]
+
+
+def run_endpoint(settings, rf, executor, middleware, is_async=False):
+    settings.API_MIDDLEWARE = middleware
+    settings.API_MIDDLEWARE_EXECUTOR = executor
+    api = ArcStackAPI()
+
+    if is_async:
+
+        @api
+        async def endpoint(request):
+            CALLS.append('endpoint')
+            return 'endpoint'
+
+        response = asyncio.run(endpoint(rf.get('/')))
+    else:
+
+        @api
+        def endpoint(request):
+            CALLS.append('endpoint')
+            return 'endpoint'
+
+        response = endpoint(rf.get('/'))
+
+    calls = list(CALLS)
+    CALLS.clear()
+    return response, calls, api
+
+
+class TestFlatMiddlewareExecutor:
+    @pytest.mark.parametrize('is_async', [False, True])
+    @pytest.mark.parametrize('middleware', MIDDLEWARE_CASES)
+    def test_same_as_nested_chain(self, settings, rf, middleware, is_async):
+        nested = run_endpoint(settings, rf, 'nested', middleware, is_async)
+        flat = run_endpoint(settings, rf, 'flat', middleware, is_async)
+
+        assert flat[:2] == nested[:2]
+
+    def test_hooks_are_collected_into_one_executor(self, settings, rf):
+        _, _, api = run_endpoint(settings, rf, 'flat', MIDDLEWARE_CASES[1])
+
+        executor = api._middleware_chain
+        assert isinstance(executor, FlatMiddlewareExecutor)
+        assert len(executor.middleware) == 3
+        assert executor.get_response == api._get_response
+
+    def test_custom_call_is_not_flattened(self, settings, rf):
+        _, _, api = run_endpoint(settings, rf, 'flat', MIDDLEWARE_CASES[2])
+
+        executor = api._middleware_chain
+        assert len(executor.middleware) == 1
+        assert isinstance(executor.get_response, CustomCallMiddleware)
+        assert isinstance(executor.get_response.get_response, FlatMiddlewareExecutor)
+
+    def test_unknown_executor(self, settings):
+        settings.API_MIDDLEWARE_EXECUTOR = 'unknown'
+
+        with pytest.raises(ImproperlyConfigured):
+            ArcStackAPI()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.fieldsets import get_requested_fields
+from arcstack_api.pagination import CursorPaginator
+
+
+USER_FIELDS = ('id', 'username', 'email', 'first_name')
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+@pytest.fixture
+def users(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            username=f'user{i}', email=f'user{i}@example.com'
+        )
+        for i in range(3)
+    ]
+
+
+def with_fields(api, endpoint, fields=USER_FIELDS, **options):
+    endpoint.FIELDS = fields
+    for name, value in options.items():
+        setattr(endpoint, name, value)
+    return api(endpoint)
+
+
+class TestFieldSelection:
+    def test_dict_response(self, api, rf):
+        def endpoint(request):
+            return {'id': 1, 'username': 'john', 'email': 'john@example.com'}
+
+        endpoint = with_fields(api, endpoint)
+        response = endpoint(rf.get('/api?fields=username,id'))
+
+        assert json.loads(response.content) == {'username': 'john', 'id': 1}
+
+    def test_all_fields_without_selection(self, api, rf):
+        def endpoint(request):
+            return [{'id': 1, 'username': 'john'}]
+
+        endpoint = with_fields(api, endpoint)
+
+        assert json.loads(endpoint(rf.get('/api')).content) == [
+            {'id': 1, 'username': 'john'}
+        ]
+
+    def test_blank_names_are_ignored(self, api, rf):
+        def endpoint(request):
+            return {'id': 1, 'username': 'john', 'email': 'john@example.com'}
+
+        endpoint = with_fields(api, endpoint)
+        response = endpoint(rf.get('/api', {'fields': 'id, ,username,'}))
+
+        assert json.loads(response.content) == {'id': 1, 'username': 'john'}
+
+    def test_blank_selection_selects_all_fields(self, api, rf):
+        def endpoint(request):
+            return {'id': 1, 'username': 'john'}
+
+        endpoint = with_fields(api, endpoint)
+        response = endpoint(rf.get('/api', {'fields': ' , '}))
+
+        assert json.loads(response.content) == {'id': 1, 'username': 'john'}
+
+    def test_unknown_field(self, api, rf, expect_response):
+        calls = []
+
+        def endpoint(request):
+            calls.append(request)
+
+        endpoint = with_fields(api, endpoint)
+        response = endpoint(rf.get('/api?fields=username,password'))
+
+        expect_response(response, status=422)
+        assert json.loads(response.content)['detail'][0]['msg'] == (
+            'Unknown fields: password'
+        )
+        assert calls == []
+
+    def test_endpoint_can_read_the_selection(self, api, rf):
+        def endpoint(request):
+            return {'fields': get_requested_fields(request)}
+
+        endpoint = with_fields(api, endpoint, fields=('id', 'fields'))
+        response = endpoint(rf.get('/api?fields=fields,fields'))
+
+        assert json.loads(response.content) == {'fields': ['fields']}
+
+    def test_iterator_response(self, api, rf):
+        def endpoint(request):
+            return iter([{'id': 1, 'username': 'john'}])
+
+        endpoint = with_fields(api, endpoint)
+        response = endpoint(rf.get('/api?fields=id'))
+
+        assert b''.join(response.streaming_content) == b'[{"id": 1}]'
+
+
+@pytest.mark.django_db
+class TestQuerySetProjection:
+    def test_only_selected_columns_are_fetched(
+        self, api, rf, users, django_user_model
+    ):
+        def endpoint(request):
+            return django_user_model.objects.order_by('id')
+
+        endpoint = with_fields(api, endpoint)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = endpoint(rf.get('/api?fields=username'))
+            content = b''.join(response.streaming_content)
+
+        assert json.loads(content) == [
+            {'username': 'user0'},
+            {'username': 'user1'},
+            {'username': 'user2'},
+        ]
+        assert 'email' not in queries[0]['sql']
+
+    def test_blank_selection_selects_all_fields(
+        self, api, rf, users, django_user_model
+    ):
+        def endpoint(request):
+            return django_user_model.objects.order_by('id').values(*USER_FIELDS)
+
+        endpoint = with_fields(api, endpoint)
+        response = endpoint(rf.get('/api?fields=,'))
+        rows = json.loads(b''.join(response.streaming_content))
+
+        assert list(rows[0]) == list(USER_FIELDS)
+
+    def test_paginated_queryset(self, api, rf, users, django_user_model):
+        def endpoint(request):
+            return django_user_model.objects.values(*USER_FIELDS)
+
+        endpoint = with_fields(
+            api,
+            endpoint,
+            PAGINATION=CursorPaginator(ordering=('id',), page_size=2),
+        )
+        data = json.loads(endpoint(rf.get('/api?fields=email')).content)
+
+        assert data['results'] == [
+            {'email': 'user0@example.com'},
+            {'email': 'user1@example.com'},
+        ]
+        assert data['next'] is not None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_queryset(api, rf, users, django_user_model):
+    async def endpoint(request):
+        return django_user_model.objects.order_by('id')
+
+    endpoint = with_fields(api, endpoint)
+
+    async def consume():
+        response = await endpoint(rf.get('/api?fields=id'))
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    assert json.loads(asyncio.run(consume())) == [
+        {'id': user.id} for user in users
+    ]
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+
+from arcstack_api import APIError, Endpoint, api_endpoint, arcstack_api, get_api
+from arcstack_api.api import ArcStackAPI
+
+
+class NoopMiddleware:
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+
+@pytest.fixture
+def groups(settings, monkeypatch):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    settings.API_GROUPS = {
+        'internal': {
+            'MIDDLEWARE': ['tests.test_groups.NoopMiddleware'],
+            'VALIDATE_INPUT': False,
+            'MAX_BODY_SIZE': 10,
+        },
+        'public': {},
+    }
+    monkeypatch.setattr('arcstack_api.api._groups', {})
+
+
+@pytest.mark.usefixtures('groups')
+class TestGroups:
+    def test_default_group(self):
+        assert get_api() is arcstack_api
+        assert get_api('default') is arcstack_api
+
+    def test_group_is_created_once(self):
+        api = get_api('internal')
+
+        assert api is not arcstack_api
+        assert api.group == 'internal'
+        assert get_api('internal') is api
+
+    def test_unknown_group(self):
+        with pytest.raises(ImproperlyConfigured, match='not declared'):
+            get_api('unknown')
+
+    def test_unknown_group_setting(self, settings):
+        settings.API_GROUPS = {'internal': {'TIMING': True, 'CACHE_TIMEOUT': 10}}
+
+        with pytest.raises(ImproperlyConfigured, match='can not override CACHE_TIMEOUT'):
+            get_api('internal')
+
+    def test_group_middleware(self, rf):
+        @api_endpoint(group='internal')
+        def health(request):
+            return HttpResponse('ok')
+
+        @api_endpoint(group='internal')
+        def not_rendered(request):
+            return {'ok': True}
+
+        response = health(rf.get('/health'))
+        assert response.content == b'ok'
+
+        # Without `CommonMiddleware`, the return values are not rendered.
+        assert not_rendered(rf.get('/health')) == {'ok': True}
+        assert health.arcstack_plan.endpoint_middleware == ()
+
+    def test_group_settings(self, rf):
+        api = get_api('internal')
+
+        assert api.get_setting('MIDDLEWARE') == ['tests.test_groups.NoopMiddleware']
+        # Not overridden by the group.
+        assert api.get_setting('MIDDLEWARE_EXECUTOR') == 'nested'
+
+        @api_endpoint(group='internal')
+        def endpoint(request, value: int):
+            return HttpResponse(repr(value))
+
+        assert endpoint.arcstack_plan.validator is None
+        assert endpoint.arcstack_plan.max_body_size == 10
+        assert endpoint(rf.get('/'), value='1').content == b"'1'"
+
+    def test_endpoint_class(self, rf):
+        class Health(Endpoint):
+            API_GROUP = 'internal'
+
+            def get(self, request):
+                return HttpResponse('ok')
+
+        class Products(Endpoint):
+            def get(self, request):
+                return {'products': []}
+
+        assert Health.as_endpoint()(rf.get('/')).content == b'ok'
+        response = Products.as_endpoint()(rf.get('/'))
+        assert json.loads(response.content) == {'products': []}
+
+    def test_group_exception_handlers(self, rf):
+        api = get_api('public')
+
+        @api.exception_handler(KeyError)
+        def handle_key_error(exception, request):
+            return HttpResponse('missing', status=404)
+
+        @api_endpoint(group='public')
+        def public(request):
+            raise KeyError('key')
+
+        @api_endpoint()
+        def default(request):
+            raise KeyError('key')
+
+        @api_endpoint(group='public')
+        def api_error(request):
+            raise APIError('bad')
+
+        response = public(rf.get('/'))
+        assert (response.status_code, response.content) == (404, b'missing')
+
+        # The handlers of a group do not apply to the other groups.
+        assert default(rf.get('/')).status_code == 500
+
+        # The other exceptions are still handled by the middleware.
+        response = api_error(rf.get('/'))
+        assert (response.status_code, response.content) == (
+            400,
+            b'{"detail": "bad"}',
+        )
+
+    def test_instances_are_independent(self):
+        api = ArcStackAPI('internal')
+
+        assert api._middleware_chain is not arcstack_api._middleware_chain
+        assert get_api('internal') is not api
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+from django.http import Http404, HttpResponse
+
+from arcstack_api import UnauthorizedError, ValidationError
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.handlers import ExceptionHandlerRegistry, exception_handlers
+
+
+class PaymentError(Exception):
+    pass
+
+
+class CardDeclined(PaymentError):
+    pass
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+@pytest.fixture
+def payment_handler():
+    @exception_handlers.register(PaymentError)
+    def handler(exception, request):
+        return HttpResponse(status=402)
+
+    yield handler
+
+    exception_handlers.unregister(PaymentError)
+
+
+class TestExceptionHandlerRegistry:
+    def test_resolved_through_mro(self):
+        registry = ExceptionHandlerRegistry()
+        registry.register(PaymentError, 'payment')
+
+        assert registry.get_handler(CardDeclined) == 'payment'
+        assert registry.get_handler(ValueError) is None
+
+    def test_resolution_is_cached(self):
+        registry = ExceptionHandlerRegistry()
+        registry.register(PaymentError, 'payment')
+        registry.get_handler(CardDeclined)
+
+        assert registry._resolved == {CardDeclined: 'payment'}
+
+    def test_register_resets_the_cache(self):
+        registry = ExceptionHandlerRegistry()
+        registry.register(PaymentError, 'payment')
+        registry.get_handler(CardDeclined)
+        registry.register(CardDeclined, 'declined')
+
+        assert registry.get_handler(CardDeclined) == 'declined'
+
+
+class TestBuiltinHandlers:
+    def test_custom_handler(self, api, rf, payment_handler, expect_response):
+        @api
+        def endpoint(request):
+            raise CardDeclined()
+
+        expect_response(endpoint(rf.get('/api')), status=402)
+
+    def test_validation_error_envelope(self, api, rf, expect_response):
+        @api
+        def endpoint(request):
+            raise ValidationError('Invalid input')
+
+        response = endpoint(rf.get('/api'))
+
+        expect_response(response, status=422, content_type='application/json')
+        assert json.loads(response.content) == {'detail': 'Invalid input'}
+
+    def test_static_error_bodies(self, api, rf, expect_response):
+        @api
+        def endpoint(request):
+            raise UnauthorizedError()
+
+        response = endpoint(rf.get('/api'))
+
+        expect_response(
+            response,
+            status=401,
+            content_type='application/json',
+            content=b'{"detail": "Unauthorized"}',
+        )
+
+    def test_http_404(self, api, rf, expect_response):
+        @api
+        def endpoint(request):
+            raise Http404()
+
+        expect_response(
+            endpoint(rf.get('/api')), status=404, content=b'{"detail": "Not found"}'
+        )
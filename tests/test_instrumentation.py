@@ -0,0 +1,149 @@
+import asyncio
+import logging
+
+import pytest
+
+from arcstack_api import APIError
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.instrumentation import InMemorySink, LoggingSink, RequestTimer
+from arcstack_api.logger import logger
+from arcstack_api.mixins import MiddlewareMixin
+
+
+class NoopMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        return response
+
+
+@pytest.fixture
+def timed_api(settings):
+    settings.API_MIDDLEWARE = [
+        'arcstack_api.middleware.CommonMiddleware',
+        'tests.test_instrumentation.NoopMiddleware',
+    ]
+    settings.API_TIMING = True
+    settings.API_TIMING_SINKS = ['arcstack_api.instrumentation.InMemorySink']
+    return ArcStackAPI()
+
+
+def server_timing_phases(response):
+    return [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+
+
+class TestInstrumentation:
+    def test_server_timing_header(self, timed_api, rf):
+        @timed_api
+        def endpoint(request):
+            return {'status': 'OK'}
+
+        response = endpoint(rf.get('/api'))
+
+        assert server_timing_phases(response) == [
+            'endpoint',
+            'NoopMiddleware',
+            'CommonMiddleware',
+            'serialize',
+            'total',
+        ]
+
+    def test_exception_phase(self, timed_api, rf):
+        @timed_api
+        def endpoint(request):
+            raise APIError('Bad request')
+
+        response = endpoint(rf.get('/api'))
+
+        assert response.status_code == 400
+        assert 'exception' in server_timing_phases(response)
+
+    def test_async_endpoint(self, timed_api, rf):
+        @timed_api
+        async def endpoint(request):
+            return 'OK'
+
+        response = asyncio.run(endpoint(rf.get('/api')))
+
+        assert server_timing_phases(response)[:3] == [
+            'endpoint',
+            'NoopMiddleware',
+            'CommonMiddleware',
+        ]
+
+    def test_in_memory_sink(self, timed_api, rf):
+        @timed_api
+        def endpoint(request):
+            return 'OK'
+
+        for _ in range(3):
+            endpoint(rf.get('/api'))
+
+        sink = timed_api._instrumentation.sinks[0]
+        [(name, snapshot)] = sink.snapshot().items()
+
+        assert isinstance(sink, InMemorySink)
+        assert name.startswith('tests.test_instrumentation.')
+        assert snapshot['total']['count'] == 3
+        assert sum(snapshot['endpoint']['buckets'].values()) == 3
+
+    def test_header_can_be_disabled(self, settings, timed_api, rf):
+        settings.API_TIMING_HEADER = False
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return 'OK'
+
+        assert 'Server-Timing' not in endpoint(rf.get('/api'))
+
+    def test_disabled_by_default(self, settings, rf):
+        settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return 'OK'
+
+        assert api._instrumentation is None
+        assert 'Server-Timing' not in endpoint(rf.get('/api'))
+
+
+class TestRequestTimer:
+    def test_collect_exclusive_durations(self):
+        timer = RequestTimer()
+        timer.layers = [('endpoint', 10, 0), ('inner', 15, 0), ('outer', 30, 0)]
+        timer.add('serialize', 3)
+
+        assert timer.collect() == {
+            'endpoint': 10,
+            'inner': 5,
+            'outer': 15,
+            'serialize': 3,
+        }
+
+    def test_phases_are_subtracted_from_their_layer(self):
+        timer = RequestTimer()
+        timer.add('db', 4)
+        timer.layers.append(('endpoint', 10, timer.phases_total))
+        timer.add('serialize', 3)
+        timer.layers.append(('CommonMiddleware', 15, timer.phases_total))
+        timer.add('compress', 1)
+        timer.layers.append(('CompressionMiddleware', 18, timer.phases_total))
+
+        assert timer.collect() == {
+            'endpoint': 10,
+            'CommonMiddleware': 2,
+            'CompressionMiddleware': 2,
+            'db': 4,
+            'serialize': 3,
+            'compress': 1,
+        }
+
+
+class TestLoggingSink:
+    def test_logs_timings(self, caplog):
+        logger.propagate = True
+
+        with caplog.at_level(logging.INFO, logger='arcstack_api'):
+            LoggingSink().record('app.endpoint', {'endpoint': 2_000_000}, 3_000_000)
+
+        assert 'app.endpoint total=3.000ms endpoint=2.000ms' in caplog.text
@@ -0,0 +1,312 @@
+import asyncio
+import json
+
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.modelserializer import (
+    freeze_spec,
+    get_model_serializer,
+    is_model_queryset,
+)
+from arcstack_api.pagination import CursorPaginator
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+@pytest.fixture
+def users(django_user_model):
+    admins = Group.objects.create(name='admins')
+    staff = Group.objects.create(name='staff')
+
+    users = [
+        django_user_model.objects.create_user(
+            username=f'user{i}', email=f'user{i}@example.com'
+        )
+        for i in range(3)
+    ]
+    users[0].groups.add(admins, staff)
+    users[1].groups.add(staff)
+    return users
+
+
+def serializer(model, *spec):
+    return get_model_serializer(model, freeze_spec(spec))
+
+
+def read(response) -> list:
+    return json.loads(b''.join(response.streaming_content))
+
+
+def test_freeze_spec():
+    assert freeze_spec(['id', {'groups': ['name'], 'user_permissions': 'id'}]) == (
+        'id',
+        ('groups', ('name',)),
+        ('user_permissions', ('id',)),
+    )
+    assert get_model_serializer(Group, ('id',)) is get_model_serializer(Group, ('id',))
+
+    with pytest.raises(ImproperlyConfigured):
+        freeze_spec(['id', 1])
+
+
+def test_relation_without_spec():
+    with pytest.raises(ImproperlyConfigured, match='ContentType.model is not'):
+        serializer(ContentType, 'id', {'model': ['id']})
+
+
+def test_unknown_field():
+    with pytest.raises(ImproperlyConfigured, match='Group.title is not a field'):
+        serializer(Group, 'id', 'title')
+
+    with pytest.raises(ImproperlyConfigured, match='Group.title is not a field'):
+        serializer(Group, 'id', 'name').select(['name', 'title'])
+
+
+@pytest.mark.django_db
+class TestModelSerializer:
+    def test_values_path(self, users, django_user_model, django_assert_num_queries):
+        user_serializer = serializer(django_user_model, 'username', 'email')
+        assert user_serializer.uses_values
+
+        with django_assert_num_queries(1) as queries:
+            rows = list(
+                user_serializer.iterator(django_user_model.objects.order_by('id'), 2)
+            )
+
+        assert rows[0] == {'username': 'user0', 'email': 'user0@example.com'}
+        assert len(rows) == 3
+        assert 'password' not in queries[0]['sql']
+
+    def test_forward_relation(self, django_assert_num_queries):
+        permission_serializer = serializer(
+            Permission, 'codename', {'content_type': ['app_label', 'model']}
+        )
+        assert permission_serializer.uses_values
+        queryset = Permission.objects.filter(codename='add_group')
+
+        with django_assert_num_queries(1):
+            rows = list(permission_serializer.iterator(queryset, 100))
+
+        assert rows == [
+            {
+                'codename': 'add_group',
+                'content_type': {'app_label': 'auth', 'model': 'group'},
+            }
+        ]
+
+    def test_lookup_field(self, users, django_assert_num_queries):
+        queryset = Permission.objects.filter(codename='add_group')
+        rows = list(serializer(Permission, 'content_type__model').iterator(queryset, 1))
+        assert rows == [{'content_type__model': 'group'}]
+
+        Group.objects.get(name='admins').permissions.add(queryset.get())
+        permission_serializer = serializer(
+            Permission, 'content_type__model', {'group_set': ['name']}
+        )
+
+        # The permission with its content type, and its groups.
+        with django_assert_num_queries(2):
+            rows = list(permission_serializer.iterator(queryset, 100))
+
+        assert rows == [
+            {'content_type__model': 'group', 'group_set': [{'name': 'admins'}]}
+        ]
+
+    def test_many_relation(self, users, django_user_model, django_assert_num_queries):
+        user_serializer = serializer(
+            django_user_model, 'username', {'groups': ['name']}, 'user_permissions'
+        )
+        assert not user_serializer.uses_values
+        queryset = django_user_model.objects.order_by('id')
+
+        # The users, their groups and their permissions.
+        with django_assert_num_queries(3):
+            rows = list(user_serializer.iterator(queryset, 100))
+
+        assert rows == [
+            {
+                'username': 'user0',
+                'groups': [{'name': 'admins'}, {'name': 'staff'}],
+                'user_permissions': [],
+            },
+            {
+                'username': 'user1',
+                'groups': [{'name': 'staff'}],
+                'user_permissions': [],
+            },
+            {'username': 'user2', 'groups': [], 'user_permissions': []},
+        ]
+
+    def test_reverse_relation(self, users, django_assert_num_queries):
+        group_serializer = serializer(Group, 'name', 'user_set')
+
+        with django_assert_num_queries(2):
+            rows = list(group_serializer.iterator(Group.objects.order_by('name'), 100))
+
+        assert rows == [
+            {'name': 'admins', 'user_set': [users[0].pk]},
+            {'name': 'staff', 'user_set': [users[0].pk, users[1].pk]},
+        ]
+
+    def test_attributes(self, users, django_user_model, django_assert_num_queries):
+        user_serializer = serializer(django_user_model, 'username', 'is_authenticated')
+        assert user_serializer.has_attributes
+
+        with django_assert_num_queries(1):
+            rows = list(
+                user_serializer.iterator(django_user_model.objects.order_by('id'), 2)
+            )
+
+        assert rows[0] == {'username': 'user0', 'is_authenticated': True}
+
+    def test_default_spec(self, users, django_user_model):
+        data = get_model_serializer(django_user_model).serialize(users[0])
+
+        assert data['username'] == 'user0'
+        assert 'password' not in data
+
+    def test_api_fields(self, monkeypatch):
+        get_model_serializer.cache_clear()
+        monkeypatch.setattr(Group, 'API_FIELDS', ('name',), raising=False)
+
+        try:
+            data = get_model_serializer(Group).serialize(Group(name='admins'))
+        finally:
+            get_model_serializer.cache_clear()
+
+        assert data == {'name': 'admins'}
+
+    def test_select(self, django_user_model):
+        user_serializer = serializer(django_user_model, 'id', {'groups': ['name']})
+
+        assert user_serializer.select(['groups', 'email']).spec == (
+            ('groups', ('name',)),
+            'email',
+        )
+
+    def test_is_model_queryset(self, django_user_model):
+        assert is_model_queryset(django_user_model.objects.all())
+        assert not is_model_queryset(django_user_model.objects.values('id'))
+        assert not is_model_queryset(django_user_model.objects.values_list('id'))
+
+
+@pytest.mark.django_db
+class TestCommonMiddleware:
+    def test_queryset(self, api, rf, users, django_user_model):
+        @api
+        def endpoint(request):
+            return django_user_model.objects.order_by('id')
+
+        rows = read(endpoint(rf.get('/api')))
+
+        assert [row['username'] for row in rows] == ['user0', 'user1', 'user2']
+        assert rows[0]['id'] == users[0].pk
+
+    def test_model_fields(self, api, rf, users, django_user_model):
+        def endpoint(request):
+            return django_user_model.objects.order_by('id')
+
+        endpoint.MODEL_FIELDS = ['username', {'groups': ['name']}]
+        endpoint = api(endpoint)
+
+        assert read(endpoint(rf.get('/api')))[0] == {
+            'username': 'user0',
+            'groups': [{'name': 'admins'}, {'name': 'staff'}],
+        }
+
+    def test_sparse_fields(self, api, rf, users, django_user_model):
+        def endpoint(request):
+            return django_user_model.objects.order_by('id')
+
+        endpoint.MODEL_FIELDS = ['id', 'username', {'groups': ['name']}]
+        endpoint.FIELDS = ('id', 'username', 'groups')
+        endpoint = api(endpoint)
+
+        assert read(endpoint(rf.get('/api?fields=groups')))[1] == {
+            'groups': [{'name': 'staff'}]
+        }
+
+    def test_instance(self, api, rf, users, django_user_model):
+        def endpoint(request):
+            return django_user_model.objects.get(username='user1')
+
+        endpoint.MODEL_FIELDS = ['username', {'groups': ['name']}]
+        endpoint = api(endpoint)
+        response = endpoint(rf.get('/api'))
+
+        assert response['Content-Type'] == 'application/json'
+        assert json.loads(response.content) == {
+            'username': 'user1',
+            'groups': [{'name': 'staff'}],
+        }
+
+    def test_paginated(
+        self, api, rf, users, django_user_model, django_assert_num_queries
+    ):
+        def endpoint(request):
+            return django_user_model.objects.all()
+
+        endpoint.MODEL_FIELDS = ['username', {'groups': ['name']}]
+        endpoint.PAGINATION = CursorPaginator(ordering=('id',), page_size=2)
+        endpoint = api(endpoint)
+
+        # The page and the groups of its users.
+        with django_assert_num_queries(2):
+            data = json.loads(endpoint(rf.get('/api')).content)
+
+        assert data['results'] == [
+            {'username': 'user0', 'groups': [{'name': 'admins'}, {'name': 'staff'}]},
+            {'username': 'user1', 'groups': [{'name': 'staff'}]},
+        ]
+
+        data = json.loads(endpoint(rf.get(data['next'])).content)
+        assert data['results'] == [{'username': 'user2', 'groups': []}]
+
+    def test_values_are_not_changed(self, api, rf, users, django_user_model):
+        @api
+        def endpoint(request):
+            return django_user_model.objects.order_by('id').values('username')
+
+        assert read(endpoint(rf.get('/api')))[0] == {'username': 'user0'}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async(api, rf, users, django_user_model):
+    async def values(request):
+        return django_user_model.objects.order_by('id')
+
+    async def nested(request):
+        return django_user_model.objects.order_by('id')
+
+    async def instance(request):
+        return await django_user_model.objects.aget(username='user0')
+
+    values.MODEL_FIELDS = ['username']
+    nested.MODEL_FIELDS = instance.MODEL_FIELDS = ['username', {'groups': ['name']}]
+    endpoints = [api(values), api(nested), api(instance)]
+
+    async def consume(endpoint):
+        response = await endpoint(rf.get('/api'))
+        if response.streaming:
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return response.content
+
+    async def main():
+        return [json.loads(await consume(endpoint)) for endpoint in endpoints]
+
+    values, nested, instance = asyncio.run(main())
+
+    assert values == [{'username': f'user{i}'} for i in range(3)]
+    assert nested[2] == {'username': 'user2', 'groups': []}
+    assert instance == {
+        'username': 'user0',
+        'groups': [{'name': 'admins'}, {'name': 'staff'}],
+    }
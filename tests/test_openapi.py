@@ -0,0 +1,309 @@
+import gzip
+import json
+from typing import Annotated
+
+import pytest
+from django.http import HttpResponse
+from django.urls import include, path, re_path
+
+from arcstack_api import Endpoint, api_endpoint
+from arcstack_api.openapi import SchemaGenerator, get_openapi_path, get_schema_view
+from arcstack_api.params import Body, Header, Query
+from arcstack_api.warmup import warmup
+
+
+pydantic = pytest.importorskip('pydantic')
+
+
+class Product(pydantic.BaseModel):
+    name: str
+    price: float
+
+
+class Products(Endpoint):
+    """Products of the catalog."""
+
+    def get(self, request, page: int = 1, tags: list[str] | None = None):
+        """List the products.
+
+        Paginated with the `page` parameter.
+        """
+        return []
+
+    def post(self, request, product: Product) -> Product:
+        return product
+
+
+class ProductDetail(Endpoint):
+    LOGIN_REQUIRED = True
+    OPENAPI_TAGS = ['products']
+
+    def get(self, request, pk: int) -> Product:
+        return Product(name='product', price=1)
+
+    def delete(self, request, pk):
+        return HttpResponse(status=204)
+
+
+@api_endpoint()
+def search(
+    request,
+    q: Annotated[str, Query(alias='query')],
+    accept_language: Annotated[str | None, Header()] = None,
+) -> list[Product]:
+    return []
+
+
+@api_endpoint()
+def transfer(
+    request,
+    source: Annotated[int, Body()],
+    target: Annotated[int, Body()],
+    note: Annotated[str, Body()] = '',
+):
+    return {}
+
+
+@api_endpoint(OPENAPI=False)
+def hidden(request):
+    return {}
+
+
+@api_endpoint(OPENAPI_METHODS=['GET', 'PUT'])
+def settings_endpoint(request):
+    return {}
+
+
+def plain_view(request):
+    return HttpResponse('plain')
+
+
+schema_view = get_schema_view(urlconf='tests.test_openapi', info={'title': 'Catalog'})
+
+products_urls = [
+    path('products', Products.as_endpoint()),
+    path('products/<int:pk>', ProductDetail.as_endpoint()),
+]
+
+urlpatterns = [
+    path('api/', include(products_urls)),
+    path('search', search),
+    path('transfer', transfer),
+    path('hidden', hidden),
+    path('settings', settings_endpoint),
+    re_path(r'^legacy/(?P<slug>[\w-]+)/$', search),
+    path('plain', plain_view),
+    path('openapi.json', schema_view),
+]
+
+
+@pytest.fixture
+def schema():
+    return SchemaGenerator('tests.test_openapi').get_schema()
+
+
+class TestOpenAPIPath:
+    def test_route(self):
+        pattern = path('products/<int:pk>/<slug:slug>', plain_view).pattern
+
+        assert get_openapi_path([pattern]) == (
+            '/products/{pk}/{slug}',
+            {'pk': {'type': 'integer', 'minimum': 0}, 'slug': {'type': 'string'}},
+        )
+
+    def test_regex(self):
+        pattern = re_path(r'^items/(?P<code>(a|b)\d+)\.json$', plain_view).pattern
+
+        assert get_openapi_path([pattern]) == (
+            '/items/{code}.json',
+            {'code': {'type': 'string'}},
+        )
+
+
+class TestSchemaGenerator:
+    def test_document(self, schema):
+        assert schema['openapi'] == '3.1.0'
+        assert schema['info'] == {'title': 'API', 'version': '1.0.0'}
+        assert list(schema['paths']) == [
+            '/api/products',
+            '/api/products/{pk}',
+            '/search',
+            '/transfer',
+            '/settings',
+            '/legacy/{slug}/',
+        ]
+
+    def test_class_based(self, schema):
+        operations = schema['paths']['/api/products']
+
+        assert list(operations) == ['get', 'post']
+        get = operations['get']
+        assert get['operationId'] == 'Products_get'
+        assert get['summary'] == 'List the products.'
+        assert get['description'] == 'Paginated with the `page` parameter.'
+        assert get['parameters'] == [
+            {
+                'name': 'page',
+                'in': 'query',
+                'required': False,
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': 'tags',
+                'in': 'query',
+                'required': False,
+                'schema': {
+                    'anyOf': [
+                        {'type': 'array', 'items': {'type': 'string'}},
+                        {'type': 'null'},
+                    ],
+                },
+                'explode': True,
+            },
+        ]
+        assert set(get['responses']) == {'200', '422'}
+
+        post = operations['post']
+        assert post['summary'] == 'Products of the catalog.'
+        assert post['requestBody'] == {
+            'required': True,
+            'content': {
+                'application/json': {
+                    'schema': {'$ref': '#/components/schemas/Product'}
+                }
+            },
+        }
+        assert post['responses']['200']['content'] == {
+            'application/json': {'schema': {'$ref': '#/components/schemas/Product'}}
+        }
+        assert set(schema['components']['schemas']['Product']['properties']) == {
+            'name',
+            'price',
+        }
+
+    def test_path_parameters(self, schema):
+        operations = schema['paths']['/api/products/{pk}']
+
+        assert operations['get']['parameters'] == [
+            {
+                'name': 'pk',
+                'in': 'path',
+                'required': True,
+                'schema': {'type': 'integer'},
+            }
+        ]
+        # Not annotated, described by the converter.
+        assert operations['delete']['parameters'] == [
+            {
+                'name': 'pk',
+                'in': 'path',
+                'required': True,
+                'schema': {'type': 'integer', 'minimum': 0},
+            }
+        ]
+        assert '422' not in operations['delete']['responses']
+
+    def test_login_required(self, schema):
+        operation = schema['paths']['/api/products/{pk}']['get']
+
+        assert operation['tags'] == ['products']
+        assert operation['security'] == [{'Basic': []}]
+        assert '401' in operation['responses']
+        assert schema['components']['securitySchemes'] == {
+            'Basic': {'type': 'http', 'scheme': 'basic'}
+        }
+        assert 'security' not in schema['paths']['/search']['get']
+
+    def test_function_endpoint(self, schema):
+        operation = schema['paths']['/search']['get']
+
+        assert operation['operationId'] == 'search_get'
+        assert [
+            (param['name'], param['in'], param['required'])
+            for param in operation['parameters']
+        ] == [('query', 'query', True), ('accept-language', 'header', False)]
+        assert operation['responses']['200']['content']['application/json'] == {
+            'schema': {
+                'type': 'array',
+                'items': {'$ref': '#/components/schemas/Product'},
+            }
+        }
+
+    def test_embedded_body(self, schema):
+        operation = schema['paths']['/transfer']['post']
+
+        body = operation['requestBody']['content']['application/json']
+        assert body['schema'] == {
+            'type': 'object',
+            'properties': {
+                'source': {'type': 'integer'},
+                'target': {'type': 'integer'},
+                'note': {'type': 'string'},
+            },
+            'required': ['source', 'target'],
+        }
+
+    def test_methods_option(self, schema):
+        assert list(schema['paths']['/settings']) == ['get', 'put']
+
+    def test_routed_twice(self, schema):
+        operation = schema['paths']['/legacy/{slug}/']['get']
+
+        assert operation['operationId'] == 'search_get_2'
+        assert operation['parameters'][0] == {
+            'name': 'slug',
+            'in': 'path',
+            'required': True,
+            'schema': {'type': 'string'},
+        }
+
+
+class TestSchemaView:
+    @pytest.fixture(autouse=True)
+    def reset(self):
+        schema_view.reset()
+
+    def test_serve(self, rf):
+        response = schema_view(rf.get('/openapi.json'))
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/json'
+        assert response['ETag'].startswith('"')
+        assert json.loads(response.content)['info']['title'] == 'Catalog'
+
+    def test_generated_once(self, rf):
+        document = schema_view.get_document()
+
+        schema_view(rf.get('/openapi.json'))
+
+        assert schema_view.get_document() is document
+        response = schema_view(rf.get('/openapi.json'))
+        assert response.content is document.identity.content
+
+    def test_compressed(self, rf):
+        identity = schema_view(rf.get('/openapi.json'))
+        response = schema_view(
+            rf.get('/openapi.json', headers={'Accept-Encoding': 'gzip, deflate'})
+        )
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(response.content) == identity.content
+        assert response['ETag'] != identity['ETag']
+
+    def test_not_modified(self, rf):
+        etag = schema_view(rf.get('/openapi.json'))['ETag']
+
+        response = schema_view(
+            rf.get('/openapi.json', headers={'If-None-Match': etag})
+        )
+
+        assert response.status_code == 304
+
+    def test_method_not_allowed(self, rf):
+        assert schema_view(rf.post('/openapi.json')).status_code == 405
+
+    def test_warmup(self):
+        warmup('tests.test_openapi')
+
+        assert schema_view._document is not None
@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from arcstack_api import APIError
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.pagination import CursorPaginator
+
+
+def get_cursor(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+@pytest.fixture
+def users(django_user_model):
+    return [
+        django_user_model.objects.create_user(username=f'user{i:02}')
+        for i in range(7)
+    ]
+
+
+@pytest.mark.django_db
+class TestCursorPaginator:
+    def get_page(self, rf, paginator, queryset, **params):
+        return paginator.paginate(rf.get('/api/users', params), queryset)
+
+    def test_walk_forward_and_back(self, rf, users, django_user_model):
+        paginator = CursorPaginator(ordering=('-username',), page_size=3)
+        queryset = django_user_model.objects.values('id', 'username')
+
+        first = self.get_page(rf, paginator, queryset)
+        second = self.get_page(
+            rf, paginator, queryset, cursor=get_cursor(first['next'])
+        )
+        third = self.get_page(
+            rf, paginator, queryset, cursor=get_cursor(second['next'])
+        )
+        back = self.get_page(
+            rf, paginator, queryset, cursor=get_cursor(third['previous'])
+        )
+
+        assert [row['username'] for row in first['results']] == [
+            'user06',
+            'user05',
+            'user04',
+        ]
+        assert first['previous'] is None
+        assert [row['username'] for row in third['results']] == ['user00']
+        assert third['next'] is None
+        assert back['results'] == second['results']
+        assert back['next'] is not None
+
+    def test_fetches_one_extra_row_without_count(self, rf, users, django_user_model):
+        paginator = CursorPaginator(ordering=('username',), page_size=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(rf, paginator, django_user_model.objects.all())
+
+        assert len(queries) == 1
+        assert 'COUNT' not in queries[0]['sql']
+        assert 'LIMIT 4' in queries[0]['sql']
+        assert 'OFFSET' not in queries[0]['sql']
+
+    def test_page_size_is_capped(self, rf, users, django_user_model):
+        paginator = CursorPaginator(ordering=('id',), page_size=2, max_page_size=4)
+
+        page = self.get_page(
+            rf, paginator, django_user_model.objects.values('id'), page_size=100
+        )
+
+        assert len(page['results']) == 4
+
+    def test_ties_are_broken_by_primary_key(self, rf, users, django_user_model):
+        paginator = CursorPaginator(ordering=('is_staff',), page_size=4)
+        queryset = django_user_model.objects.values('id', 'is_staff')
+
+        first = self.get_page(rf, paginator, queryset)
+        second = self.get_page(
+            rf, paginator, queryset, cursor=get_cursor(first['next'])
+        )
+
+        ids = [row['id'] for row in first['results'] + second['results']]
+        assert ids == [user.id for user in users]
+
+    def test_tampered_cursor(self, rf, users, django_user_model):
+        paginator = CursorPaginator(ordering=('id',), page_size=2)
+        cursor = signing.dumps([[0], False], salt='other')
+
+        with pytest.raises(APIError):
+            self.get_page(rf, paginator, django_user_model.objects.all(), cursor=cursor)
+
+    def test_microsecond_positions(self, rf, django_user_model):
+        joined = datetime.datetime(2024, 1, 1, 12, 0, 0, tzinfo=datetime.timezone.utc)
+        for i in range(4):
+            django_user_model.objects.create_user(
+                username=f'user{i}',
+                date_joined=joined + datetime.timedelta(microseconds=i * 10),
+            )
+        paginator = CursorPaginator(ordering=('date_joined',), page_size=1)
+        queryset = django_user_model.objects.values('id', 'username', 'date_joined')
+
+        usernames = []
+        page = self.get_page(rf, paginator, queryset)
+        # Bounded, a cut position repeats the same rows forever.
+        for _ in range(5):
+            usernames.extend(row['username'] for row in page['results'])
+            if page['next'] is None:
+                break
+            cursor = get_cursor(page['next'])
+            page = self.get_page(rf, paginator, queryset, cursor=cursor)
+
+        assert usernames == ['user0', 'user1', 'user2', 'user3']
+
+    def test_nullable_ordering_field(self, rf, django_user_model):
+        paginator = CursorPaginator(ordering=('last_login',))
+
+        with pytest.raises(ImproperlyConfigured, match='nullable'):
+            self.get_page(rf, paginator, django_user_model.objects.all())
+
+    def test_unknown_ordering_field(self, rf, django_user_model):
+        paginator = CursorPaginator(ordering=('groups__name',))
+
+        with pytest.raises(ImproperlyConfigured):
+            self.get_page(rf, paginator, django_user_model.objects.all())
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPaginationOption:
+    @pytest.fixture
+    def api(self, settings):
+        settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+        return ArcStackAPI()
+
+    def test_returned_queryset_is_paginated(self, api, rf, users, django_user_model):
+        def endpoint(request):
+            return django_user_model.objects.values('pk', 'username')
+
+        endpoint.PAGINATION = CursorPaginator(ordering=('username', 'pk'), page_size=2)
+        endpoint = api(endpoint)
+
+        data = json.loads(endpoint(rf.get('/api/users')).content)
+
+        assert [row['username'] for row in data['results']] == ['user00', 'user01']
+        assert data['next'].startswith('http://testserver/api/users?cursor=')
+
+    def test_async_endpoint(self, api, rf, users, django_user_model):
+        async def endpoint(request):
+            return django_user_model.objects.values('pk', 'username')
+
+        endpoint.PAGINATION = CursorPaginator(ordering=('-username', 'pk'), page_size=1)
+        endpoint = api(endpoint)
+
+        data = json.loads(asyncio.run(endpoint(rf.get('/api/users'))).content)
+
+        assert [row['username'] for row in data['results']] == ['user06']
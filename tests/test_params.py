@@ -0,0 +1,58 @@
+from typing import Annotated
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import path
+
+from arcstack_api import api_endpoint
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.openapi import SchemaGenerator
+from arcstack_api.params import Query
+
+
+@api_endpoint()
+def product(request, pk: int, page: int = 1):
+    return {}
+
+
+urlpatterns = [path('products/<int:pk>', product)]
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+class TestWithoutPydantic:
+    @pytest.fixture(autouse=True)
+    def no_pydantic(self, monkeypatch):
+        monkeypatch.setattr('arcstack_api.validation.pydantic', None)
+        monkeypatch.setattr('arcstack_api.openapi.pydantic', None)
+
+    def test_marker_requires_pydantic(self, api):
+        def endpoint(request, page: Annotated[int, Query()] = 1):
+            return {'page': page}
+
+        with pytest.raises(ImproperlyConfigured, match='pydantic is not installed'):
+            api(endpoint)
+
+    def test_annotations_are_not_validated(self, api, rf):
+        @api
+        def endpoint(request, pk: int):
+            return {'pk': pk}
+
+        assert endpoint.arcstack_plan.validator is None
+        assert endpoint(rf.get('/api/a'), pk='a').content == b'{"pk": "a"}'
+
+    def test_openapi_without_schemas(self):
+        schema = SchemaGenerator('tests.test_params').get_schema()
+        operation = schema['paths']['/products/{pk}']['get']
+
+        # The parameters are documented, without their schemas.
+        assert [param['name'] for param in operation['parameters']] == ['pk', 'page']
+        assert 'components' not in schema
+
+
+def test_repr():
+    assert repr(Query(alias='page-size')) == "Query(alias='page-size')"
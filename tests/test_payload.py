@@ -0,0 +1,170 @@
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import Group
+
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.crud import ModelListEndpoint
+from arcstack_api.errors import PayloadTooLargeError, ValidationError
+from arcstack_api.payload import LimitedStream, RequestPayload, get_payload
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+def chunked_request(rf, body: bytes):
+    """A request streaming its body without a `Content-Length` header."""
+    request = rf.post('/', content_type='application/json')
+    request.META.pop('CONTENT_LENGTH', None)
+    request._stream = io.BytesIO(body)
+    return request
+
+
+class TestLimitedStream:
+    def test_read_within_limit(self):
+        stream = LimitedStream(io.BytesIO(b'abcdef'), max_size=6)
+
+        assert stream.read(4) == b'abcd'
+        assert stream.read() == b'ef'
+        assert stream.read() == b''
+
+    def test_read_over_limit(self):
+        stream = LimitedStream(io.BytesIO(b'abcdef'), max_size=5)
+
+        assert stream.read(4) == b'abcd'
+        with pytest.raises(PayloadTooLargeError):
+            stream.read(4)
+
+    def test_no_limit(self):
+        stream = LimitedStream(io.BytesIO(b'abcdef'), max_size=None)
+
+        assert stream.read() == b'abcdef'
+
+
+class TestRequestPayload:
+    def test_json_is_parsed_once(self, rf):
+        request = rf.post('/', data={'a': 1}, content_type='application/json')
+        payload = RequestPayload(request, max_size=100)
+
+        data = payload.data
+        assert data == {'a': 1}
+        assert payload.json() is data
+        # The body is still available to Django.
+        assert request.body == b'{"a": 1}'
+
+    def test_empty_body(self, rf):
+        request = rf.post('/', data=b'', content_type='application/json')
+
+        assert RequestPayload(request, max_size=100).data is None
+
+    def test_invalid_json(self, rf):
+        request = rf.post('/', data=b'{', content_type='application/json')
+
+        with pytest.raises(ValidationError) as e:
+            RequestPayload(request, max_size=100).json()
+        assert e.value.errors[0]['type'] == 'json_invalid'
+
+    def test_form_data(self, rf):
+        request = rf.post('/', data={'name': 'admins'})
+
+        assert RequestPayload(request, max_size=None).data['name'] == 'admins'
+
+    def test_other_content_types_are_bytes(self, rf):
+        request = rf.post('/', data=b'hello', content_type='text/plain')
+
+        assert RequestPayload(request, max_size=100).data == b'hello'
+
+    def test_content_length_over_limit(self, rf):
+        request = rf.post('/', data=b'x' * 11, content_type='application/json')
+
+        with pytest.raises(PayloadTooLargeError):
+            RequestPayload(request, max_size=10).raw
+        # Nothing was read from the request.
+        assert not hasattr(request, '_body')
+
+    def test_streamed_body_over_limit(self, rf):
+        request = chunked_request(rf, b'[' + b'1,' * 100 + b'1]')
+
+        with pytest.raises(PayloadTooLargeError):
+            RequestPayload(request, max_size=10).raw
+
+    def test_streamed_body_within_limit(self, rf):
+        request = chunked_request(rf, b'[1, 2]')
+
+        assert RequestPayload(request, max_size=10).json() == [1, 2]
+
+    def test_get_payload_default_limit(self, rf, settings):
+        settings.API_MAX_BODY_SIZE = 5
+        request = rf.post('/', data=b'[1, 2]', content_type='application/json')
+
+        payload = get_payload(request)
+        assert payload.max_size == 5
+        assert get_payload(request) is payload
+
+
+class TestEndpointPayload:
+    def test_payload_is_attached(self, api, rf):
+        @api
+        def endpoint(request):
+            return request.payload.data
+
+        request = rf.post('/', data={'a': 1}, content_type='application/json')
+        response = endpoint(request)
+
+        assert json.loads(response.content) == {'a': 1}
+
+    def test_default_max_body_size(self, api, rf, settings, expect_response):
+        settings.API_MAX_BODY_SIZE = 10
+
+        @api
+        def endpoint(request):
+            return request.payload.data
+
+        request = rf.post('/', data={'a': 'x' * 10}, content_type='application/json')
+
+        expect_response(
+            endpoint(request),
+            status=413,
+            content_type='application/json',
+            content=b'{"detail": "Payload too large"}',
+        )
+
+    def test_endpoint_max_body_size(self, api, rf, expect_response):
+        def unlimited(request):
+            return request.payload.data
+
+        def limited(request):
+            return request.payload.data
+
+        unlimited.MAX_BODY_SIZE = None
+        limited.MAX_BODY_SIZE = 10
+        unlimited = api(unlimited)
+        limited = api(limited)
+
+        data = {'a': 'x' * 100}
+        expect_response(
+            unlimited(rf.post('/', data=data, content_type='application/json')),
+            status=200,
+        )
+        expect_response(
+            limited(rf.post('/', data=data, content_type='application/json')),
+            status=413,
+        )
+
+    @pytest.mark.django_db
+    def test_bulk_create_over_limit(self, api, rf, expect_response):
+        class Groups(ModelListEndpoint):
+            model = Group
+            fields = ('id', 'name')
+            MAX_BODY_SIZE = 64
+
+        endpoint = api(Groups.as_view())
+        data = [{'name': f'group{i}'} for i in range(10)]
+        request = chunked_request(rf, json.dumps(data).encode())
+
+        expect_response(endpoint(request), status=413)
+        assert not Group.objects.exists()
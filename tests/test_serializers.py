@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import json
+import uuid
+from unittest import mock
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+
+from arcstack_api import serializers
+from arcstack_api.serializers import (
+    JsonSerializer,
+    MsgspecBackend,
+    OrjsonBackend,
+    StdlibJsonBackend,
+    get_json_backend,
+)
+
+
+SPECIAL_TYPES = {
+    'decimal': decimal.Decimal('12.50'),
+    'datetime': datetime.datetime(
+        2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc
+    ),
+    'date': datetime.date(2024, 1, 2),
+    'time': datetime.time(3, 4, 5, 678901),
+    'timedelta': datetime.timedelta(days=1, hours=2, microseconds=5),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+}
+
+
+class TestJsonBackend:
+    def test_encoder_is_resolved_once(self, settings):
+        settings.API_JSON_ENCODER = 'tests.test_serializers.CountingEncoder'
+        serializers._backends.clear()
+
+        with mock.patch(
+            'arcstack_api.serializers.import_string',
+            wraps=serializers.import_string,
+        ) as import_string:
+            for _ in range(3):
+                JsonSerializer.encode({'key': 'value'})
+
+        assert import_string.call_count == 2  # the backend and the encoder
+
+    def test_encode_returns_bytes(self):
+        assert JsonSerializer.encode({'key': 'value'}) == b'{"key": "value"}'
+
+    def test_encode_raises_type_error(self):
+        with pytest.raises(TypeError):
+            JsonSerializer.encode(object())
+
+    def test_stdlib_backend_matches_django_encoder(self):
+        backend = StdlibJsonBackend(DjangoJSONEncoder)
+        expected = json.dumps(SPECIAL_TYPES, cls=DjangoJSONEncoder).encode()
+        assert backend.dumps(SPECIAL_TYPES) == expected
+
+    def test_orjson_backend_matches_django_encoder(self):
+        pytest.importorskip('orjson')
+
+        backend = OrjsonBackend(DjangoJSONEncoder)
+        expected = json.loads(json.dumps(SPECIAL_TYPES, cls=DjangoJSONEncoder))
+        assert json.loads(backend.dumps(SPECIAL_TYPES)) == expected
+
+    def test_msgspec_backend(self):
+        pytest.importorskip('msgspec')
+
+        backend = MsgspecBackend(DjangoJSONEncoder)
+        expected = json.loads(json.dumps(SPECIAL_TYPES, cls=DjangoJSONEncoder))
+        # `msgspec` keeps the microseconds and writes the durations in seconds.
+        expected.update(
+            datetime='2024-01-02T03:04:05.678901Z',
+            time='03:04:05.678901',
+            timedelta='P1DT7200.000005S',
+        )
+
+        assert json.loads(backend.dumps(SPECIAL_TYPES)) == expected
+        assert json.loads(backend.dumps([{SPECIAL_TYPES['date']}])) == [
+            ['2024-01-02']
+        ]
+
+    def test_missing_backend_falls_back_to_stdlib(self, settings):
+        settings.API_JSON_BACKEND = 'tests.test_serializers.MissingLibraryBackend'
+
+        assert isinstance(get_json_backend(), StdlibJsonBackend)
+
+
+class CountingEncoder(DjangoJSONEncoder):
+    pass
+
+
+class MissingLibraryBackend(StdlibJsonBackend):
+    def __init__(self, encoder):
+        raise ImportError('No module named missing_library')
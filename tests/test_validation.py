@@ -0,0 +1,176 @@
+import json
+from typing import Annotated
+from unittest import mock
+
+import pytest
+
+from arcstack_api import Endpoint
+from arcstack_api.api import ArcStackAPI
+from arcstack_api.params import Body, Header, Query
+
+
+pydantic = pytest.importorskip('pydantic')
+
+
+class Item(pydantic.BaseModel):
+    name: str
+    price: float
+
+
+@pytest.fixture
+def api(settings):
+    settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+    return ArcStackAPI()
+
+
+class TestInputValidation:
+    def test_path_and_query_params(self, api, rf):
+        @api
+        def endpoint(request, pk: int, page: int = 1, tags: list[str] | None = None):
+            return {'pk': pk, 'page': page, 'tags': tags}
+
+        response = endpoint(rf.get('/api/1?page=2&tags=a&tags=b'), pk='1')
+
+        assert json.loads(response.content) == {'pk': 1, 'page': 2, 'tags': ['a', 'b']}
+
+    def test_positional_path_params(self, api, rf, expect_response):
+        @api
+        def endpoint(request, pk: int, *args, page: int = 1):
+            return {'pk': pk, 'args': args, 'page': page}
+
+        response = endpoint(rf.get('/api/1/x?pk=2&page=3'), '1', 'x')
+
+        assert json.loads(response.content) == {'pk': 1, 'args': ['x'], 'page': 3}
+
+        response = endpoint(rf.get('/api/a'), 'a')
+
+        expect_response(response, status=422)
+        assert json.loads(response.content)['detail'][0]['loc'] == ['path', 'pk']
+
+    def test_unsupported_type(self, api, rf):
+        class Marker:
+            pass
+
+        @api
+        def endpoint(request, marker: Marker, page: int = 1):
+            return {'marker': isinstance(marker, Marker), 'page': page}
+
+        response = endpoint(rf.get('/api?page=2'), marker=Marker())
+
+        assert json.loads(response.content) == {'marker': True, 'page': 2}
+
+    def test_defaults_are_kept(self, api, rf):
+        @api
+        def endpoint(request, page: int = 1):
+            return {'page': page}
+
+        response = endpoint(rf.get('/api'))
+
+        assert json.loads(response.content) == {'page': 1}
+
+    def test_header_and_alias(self, api, rf):
+        @api
+        def endpoint(
+            request,
+            x_request_id: Annotated[str, Header()],
+            size: Annotated[int, Query(alias='page-size'), pydantic.Field(le=50)],
+        ):
+            return {'id': x_request_id, 'size': size}
+
+        request = rf.get('/api?page-size=20', HTTP_X_REQUEST_ID='abc')
+        response = endpoint(request)
+
+        assert json.loads(response.content) == {'id': 'abc', 'size': 20}
+
+    def test_body_model(self, api, rf):
+        class ItemEndpoint(Endpoint):
+            def post(self, request, item: Item):
+                return item.model_dump()
+
+        endpoint = api(ItemEndpoint.as_view())
+        request = rf.post(
+            '/api',
+            data={'name': 'Book', 'price': '9.5'},
+            content_type='application/json',
+        )
+        response = endpoint(request)
+
+        assert json.loads(response.content) == {'name': 'Book', 'price': 9.5}
+
+    def test_embedded_body_params(self, api, rf):
+        @api
+        def endpoint(request, item: Item, quantity: Annotated[int, Body()]):
+            return {'name': item.name, 'quantity': quantity}
+
+        request = rf.post(
+            '/api',
+            data={'item': {'name': 'Book', 'price': 1}, 'quantity': 3},
+            content_type='application/json',
+        )
+        response = endpoint(request)
+
+        assert json.loads(response.content) == {'name': 'Book', 'quantity': 3}
+
+    def test_invalid_input_returns_422(self, api, rf, expect_response):
+        @api
+        def endpoint(request, pk: int, page: Annotated[int, pydantic.Field(gt=0)]):
+            return 'OK'
+
+        response = endpoint(rf.get('/api/a?page=0'), pk='a')
+
+        expect_response(response, status=422)
+        assert json.loads(response.content) == {
+            'detail': [
+                {
+                    'loc': ['path', 'pk'],
+                    'msg': 'Input should be a valid integer, unable to parse '
+                    'string as an integer',
+                    'type': 'int_parsing',
+                },
+                {
+                    'loc': ['query', 'page'],
+                    'msg': 'Input should be greater than 0',
+                    'type': 'greater_than',
+                },
+            ]
+        }
+
+    def test_invalid_json_body(self, api, rf, expect_response):
+        @api
+        def endpoint(request, item: Item):
+            return 'OK'
+
+        request = rf.post('/api', data='{', content_type='application/json')
+
+        expect_response(endpoint(request), status=422)
+
+    def test_validator_is_compiled_once(self, api, rf):
+        with mock.patch(
+            'arcstack_api.validation.pydantic.TypeAdapter',
+            wraps=pydantic.TypeAdapter,
+        ) as type_adapter:
+
+            @api
+            def endpoint(request, page: int = 1):
+                return 'OK'
+
+            for _ in range(3):
+                endpoint(rf.get('/api?page=2'))
+
+        assert type_adapter.call_count == 1
+
+    def test_endpoint_without_annotations(self, api):
+        @api
+        def endpoint(request, pk):
+            return 'OK'
+
+        assert endpoint.arcstack_plan.validator is None
+
+    def test_validation_can_be_disabled(self, settings, api, rf):
+        settings.API_VALIDATE_INPUT = False
+
+        @api
+        def endpoint(request, pk: int):
+            return {'pk': pk}
+
+        assert endpoint(rf.get('/api/a'), pk='a').content == b'{"pk": "a"}'
@@ -0,0 +1,151 @@
+import io
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.urls import include, path
+
+from arcstack_api import Endpoint, api_endpoint, arcstack_api
+from arcstack_api.api import PENDING_GENERATION, ArcStackAPI
+from arcstack_api.warmup import iter_endpoints, warmup
+
+
+loaded = []
+
+
+class CountingMiddleware:
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        loaded.append(self)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_endpoint(self, request, endpoint, *args, **kwargs):
+        return None
+
+
+@api_endpoint()
+def health(request):
+    return HttpResponse('ok')
+
+
+class Products(Endpoint):
+    def get(self, request):
+        return HttpResponse('[]')
+
+
+def plain_view(request):
+    return HttpResponse('plain')
+
+
+products = Products.as_endpoint()
+
+urlpatterns = [
+    path('health', health),
+    path('plain', plain_view),
+    path('api/', include([path('products', products), path('items', products)])),
+]
+
+
+@pytest.fixture
+def counting(settings):
+    settings.API_MIDDLEWARE = ['tests.test_warmup.CountingMiddleware']
+    loaded.clear()
+
+
+class TestLazyAPI:
+    def test_middleware_are_loaded_on_first_request(self, counting, rf):
+        api = ArcStackAPI(lazy=True)
+
+        @api
+        def endpoint(request):
+            return 'test'
+
+        assert loaded == []
+        assert endpoint.arcstack_plan.generation == PENDING_GENERATION
+
+        assert endpoint(rf.get('/')) == 'test'
+        # One instance for the sync chain and one for the async chain.
+        assert len(loaded) == 2
+        assert endpoint.arcstack_plan.generation == api._generation
+        assert len(endpoint.arcstack_plan.endpoint_middleware) == 1
+
+        endpoint(rf.get('/'))
+        assert len(loaded) == 2
+
+    def test_reloaded_when_settings_change(self, counting, settings, rf):
+        api = ArcStackAPI()
+
+        @api
+        def endpoint(request):
+            return 'test'
+
+        endpoint(rf.get('/'))
+        settings.API_MIDDLEWARE = []
+
+        assert len(loaded) == 2
+        assert endpoint(rf.get('/')) == 'test'
+        assert endpoint.arcstack_plan.endpoint_middleware == ()
+
+    def test_other_settings_do_not_reload(self, counting, settings):
+        api = ArcStackAPI()
+        generation = api._generation
+
+        settings.USE_TZ = not settings.USE_TZ
+
+        assert api._generation == generation
+
+    def test_default_login_required_is_not_frozen(self, settings, rf):
+        settings.API_MIDDLEWARE = ['arcstack_api.middleware.CommonMiddleware']
+
+        @api_endpoint()
+        def endpoint(request):
+            return 'test'
+
+        assert not hasattr(endpoint, 'LOGIN_REQUIRED')
+
+        settings.API_DEFAULT_LOGIN_REQUIRED = True
+        request = rf.get('/')
+        request.user = type('User', (), {'is_authenticated': False})()
+
+        assert endpoint(request).status_code == 401
+        assert endpoint.arcstack_plan.login_required
+
+
+class TestWarmup:
+    def test_iter_endpoints(self):
+        assert list(iter_endpoints('tests.test_warmup')) == [
+            health,
+            products,
+            products,
+        ]
+
+    def test_warmup(self, counting):
+        plans = warmup('tests.test_warmup')
+
+        assert len(plans) == 2
+        assert [plan.generation for plan in plans] == [arcstack_api._generation] * 2
+        assert all(len(plan.endpoint_middleware) == 1 for plan in plans)
+        assert health.arcstack_plan is plans[0]
+
+    def test_command(self, counting):
+        stdout = io.StringIO()
+
+        call_command('api_warmup', urlconf='tests.test_warmup', stdout=stdout)
+
+        assert 'Compiled 2 endpoints' in stdout.getvalue()
+        assert products.arcstack_plan.generation == arcstack_api._generation
+
+    def test_app_ready(self, counting, settings):
+        settings.API_WARMUP = True
+        settings.ROOT_URLCONF = 'tests.test_warmup'
+
+        apps.get_app_config('arcstack_api').ready()
+
+        assert health.arcstack_plan.generation == arcstack_api._generation
+        assert len(loaded) == 2